@@ -18,10 +18,6 @@ import asyncio
 from typing import Optional, Any
 
 import httpx
-try:
-    import aioredis
-except ImportError:
-    aioredis = None
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -32,6 +28,7 @@ from config.config import settings
 from data.models.mapping import Mapping, UpiBackup
 from data.models.models import Property
 from data.database.database import get_read_db
+from data.services.shared_cache import redis_client as _redis_client
 from api.routes.external_routes import get_title_data
 
 logger = logging.getLogger(__name__)
@@ -66,11 +63,6 @@ _CHAT_CONCURRENT_REQUESTS = 0
 _CHAT_CONCURRENCY_LIMIT_FOR_DYNAMIC_SQL = 8
 _LAST_QUERY_PLAN: dict[str, Any] = {}
 
-# Optional Redis client for shared caches
-_redis_client = None
-if aioredis and settings.REDIS_URL:
-    _redis_client = aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
-
 # ---------------------------------------------------------------------------
 # Pattern helpers
 # ---------------------------------------------------------------------------
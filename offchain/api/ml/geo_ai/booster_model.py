@@ -0,0 +1,40 @@
+"""
+Thin sklearn-style wrapper around a trained `lightgbm.Booster`
+
+train_all_models trains with `lgb.train` on shared, pre-binned Datasets
+(the sklearn estimators build their own Dataset per fit). This wrapper keeps
+the interface the service and scoring code already use: `predict`,
+`predict_proba` for binary models, and `feature_importances_` (split counts,
+the LGBMModel default).
+"""
+
+import lightgbm as lgb
+import numpy as np
+
+
+class BoosterModel:
+    def __init__(self, booster: lgb.Booster, binary: bool = False):
+        self.booster = booster
+        self.binary = binary
+
+    @property
+    def best_iteration(self) -> int:
+        return self.booster.best_iteration or self.booster.current_iteration()
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        return self.booster.feature_importance(importance_type='split')
+
+    def _raw(self, X) -> np.ndarray:
+        return self.booster.predict(X, num_iteration=self.best_iteration)
+
+    def predict(self, X) -> np.ndarray:
+        if self.binary:
+            return (self._raw(X) >= 0.5).astype(int)
+        return self._raw(X)
+
+    def predict_proba(self, X) -> np.ndarray:
+        if not self.binary:
+            raise AttributeError('predict_proba is only available for binary models')
+        p = self._raw(X)
+        return np.column_stack([1 - p, p])
@@ -0,0 +1,77 @@
+"""
+Fitted categorical encoder persisted with each GeoAI model
+
+Replaces `pd.get_dummies` for new models: every categorical column becomes
+one integer-coded column from a vocabulary fixed at training time, and the
+models treat those columns as LightGBM native categoricals. The feature set
+no longer depends on which rows happen to be loaded, a single row encodes
+with dictionary lookups, and the matrix width stays at
+len(numeric) + len(categorical) whatever the cardinality.
+
+Values not in the vocabulary encode as NaN, which LightGBM treats as missing.
+
+The encoder is stored in the model payload as plain data (`to_dict`) so a
+payload never depends on this class's pickled layout:
+
+    {'model': ..., 'features': encoder.feature_names, 'encoder': encoder.to_dict()}
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .features import CATEGORICAL_COLS
+
+
+class CategoricalEncoder:
+    def __init__(self, numeric: Optional[List[str]] = None, vocabularies: Optional[Dict[str, List[str]]] = None):
+        self.numeric = list(numeric or [])
+        self.vocabularies = {col: list(values) for col, values in (vocabularies or {}).items()}
+        self._codes = {col: {value: i for i, value in enumerate(values)} for col, values in self.vocabularies.items()}
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, numeric: List[str], categorical: List[str] = CATEGORICAL_COLS) -> 'CategoricalEncoder':
+        vocabularies = {
+            col: sorted(df[col].dropna().astype(str).unique().tolist())
+            for col in categorical if col in df.columns
+        }
+        return cls(numeric=numeric, vocabularies=vocabularies)
+
+    @property
+    def categorical(self) -> List[str]:
+        return list(self.vocabularies)
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.numeric + self.categorical
+
+    def _codes_for(self, col: str, values: pd.Series) -> np.ndarray:
+        codes = self._codes[col]
+        return np.array([codes.get(str(v), np.nan) if pd.notna(v) else np.nan for v in values], dtype=np.float64)
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """(len(df), len(feature_names)) float matrix; missing numeric columns are 0."""
+        out = np.zeros((len(df), len(self.feature_names)), dtype=np.float64)
+        if df.empty:
+            return out
+        for j, col in enumerate(self.numeric):
+            if col in df.columns:
+                out[:, j] = pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        offset = len(self.numeric)
+        for j, col in enumerate(self.categorical):
+            if col in df.columns:
+                out[:, offset + j] = self._codes_for(col, df[col])
+            else:
+                out[:, offset + j] = np.nan
+        return out
+
+    def transform_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(self.transform(df), columns=self.feature_names, index=df.index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'numeric': self.numeric, 'vocabularies': self.vocabularies}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CategoricalEncoder':
+        return cls(numeric=data.get('numeric'), vocabularies=data.get('vocabularies'))
@@ -0,0 +1,277 @@
+"""
+In-process GeoAI feature store
+
+Keeps the engineered (pre-encoding) feature rows of every mapping in memory,
+indexed by UPI, plus one encoded feature matrix per model aligned to that
+model's training columns. Single-parcel predictions then read one matrix row
+by index instead of re-running `build_training_dataframe` over the whole
+table.
+
+A full build starts from the latest columnar snapshot (see snapshot.py) and
+then catches up. The snapshot frame is used as read: numeric columns stay
+views on the read-only mapping (a column is copied only when a synced row
+first writes to it) and dictionary columns stay categorical, gaining
+categories with `add_categories` as synced rows bring new values.
+
+Freshness: at most every FEATURE_STORE_SYNC_SECONDS a read triggers an
+incremental sync that loads only mappings with `updated_at` at or after the
+watermark (minus a small lag, so rows committed by slower transactions are
+not missed; re-reading a row is idempotent). A row-count check falls back to
+a full rebuild when mappings were deleted.
+
+Encoding matches training: models with a persisted CategoricalEncoder use it
+(see encoder.py); older models trained on `get_dummies` columns get a dummy
+column "<col>_<value>" set to 1 when the row's category equals <value>, and
+categories they have no column for encode as all zeros, exactly as
+`_align_features` filled missing columns.
+
+Usage:
+    await FeatureStore.ensure_fresh(session)
+    row = FeatureStore.row(upi)                    # engineered features (Series)
+    X = FeatureStore.vector(upi, 'valuation')      # (1, n_features) ndarray
+"""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from .features import CATEGORICAL_COLS, load_feature_frame
+from .model_registry import ModelBundle, ModelRegistry
+from .snapshot import release_loaded, snapshot_frame
+
+logger = logging.getLogger(__name__)
+
+# Re-read this far behind the watermark to catch late-committing writers
+WATERMARK_LAG = timedelta(seconds=60)
+
+
+def _column_getter(base: pd.DataFrame, col: str) -> np.ndarray:
+    if col in base.columns:
+        return pd.to_numeric(base[col], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    for cat in CATEGORICAL_COLS:
+        prefix = cat + '_'
+        if col.startswith(prefix) and cat in base.columns:
+            return (base[cat].astype(str) == col[len(prefix):]).to_numpy(dtype=np.float64)
+    return np.zeros(len(base), dtype=np.float64)
+
+
+def encode_for_columns(base: pd.DataFrame, cols: List[str]) -> np.ndarray:
+    """Encoded matrix for `base` rows with exactly `cols`, in order."""
+    if base.empty:
+        return np.zeros((0, len(cols)), dtype=np.float64)
+    return np.column_stack([_column_getter(base, c) for c in cols]) if cols else np.zeros((len(base), 0))
+
+
+def encode_for_model(base: pd.DataFrame, model_name: str, bundle: ModelBundle) -> np.ndarray:
+    """Encode with the model's fitted encoder, or its get_dummies columns for older models."""
+    encoder = bundle.get_encoder(model_name)
+    if encoder is not None:
+        return encoder.transform(base)
+    return encode_for_columns(base, bundle.get_features(model_name))
+
+
+def _matrix_key(model_name: str, bundle: ModelBundle) -> Tuple:
+    return bundle.version, tuple(bundle.get_features(model_name))
+
+
+class FeatureStore:
+    _base: pd.DataFrame = pd.DataFrame()
+    _positions: Dict[str, int] = {}
+    # model name -> ((model version, feature columns), encoded matrix with one row per _base row)
+    _matrices: Dict[str, Tuple[Tuple, np.ndarray]] = {}
+    _watermark = None
+    _last_sync: float = 0.0
+    # UPIs changed since the last drain_changed(); None after a full build
+    _changed: Optional[Set[str]] = None
+    _lock = asyncio.Lock()
+    _stats: Dict[str, int] = {"full_builds": 0, "incremental_syncs": 0, "rows_updated": 0}
+
+    @classmethod
+    def stats(cls) -> Dict[str, object]:
+        return {
+            **cls._stats,
+            "rows": len(cls._base),
+            "watermark": cls._watermark.isoformat() if cls._watermark is not None else None,
+            "matrices": {name: list(matrix.shape) for name, (_, matrix) in cls._matrices.items()},
+        }
+
+    @classmethod
+    def _set_base(cls, base: pd.DataFrame) -> None:
+        # Kept as read: numeric columns stay views on the memory-mapped snapshot
+        # and dictionary columns stay categorical (see _conform for updates)
+        cls._base = base.reset_index(drop=True)
+        cls._positions = {upi: i for i, upi in enumerate(cls._base['upi'])} if not base.empty else {}
+        cls._matrices = {}
+
+    @classmethod
+    def _conform(cls, changed: pd.DataFrame) -> pd.DataFrame:
+        """
+        Give `changed` the base frame's categorical dtypes, first adding any
+        categories the base has not seen, so updates and concat keep the
+        columns categorical instead of falling back to object.
+        """
+        dtypes = {}
+        for col in cls._base.select_dtypes(include=['category']).columns:
+            if col not in changed.columns:
+                continue
+            known = cls._base[col].cat.categories
+            new = pd.Index(changed[col].dropna().unique()).difference(known)
+            if len(new):
+                cls._base[col] = cls._base[col].cat.add_categories(new)
+            dtypes[col] = cls._base[col].dtype
+        return changed.astype(dtypes) if dtypes else changed
+
+    @classmethod
+    def _writable(cls, j: int) -> None:
+        """Copy column j out of the read-only snapshot mapping before its first in-place write."""
+        values = cls._base.iloc[:, j].array
+        if isinstance(values, pd.arrays.NumpyExtensionArray):
+            values = values.to_numpy()
+        if isinstance(values, np.ndarray) and not values.flags.writeable:
+            cls._base[cls._base.columns[j]] = values.copy()
+
+    @classmethod
+    def _advance_watermark(cls, df: pd.DataFrame) -> None:
+        if 'updated_at' in df.columns and df['updated_at'].notna().any():
+            latest = df['updated_at'].max()
+            if cls._watermark is None or latest > cls._watermark:
+                cls._watermark = latest
+
+    @classmethod
+    async def _full_build(cls, session: AsyncSession, from_snapshot: bool = True) -> None:
+        df = await snapshot_frame(session) if from_snapshot else await load_feature_frame(session)
+        cls._set_base(df)
+        # The store owns the frame now; do not keep a second reference in snapshot.py
+        release_loaded()
+        cls._changed = None
+        cls._watermark = None
+        cls._advance_watermark(df)
+        cls._stats["full_builds"] += 1
+        logger.info(f"GeoAI feature store built with {len(df)} parcel(s)")
+
+    @classmethod
+    def _apply_updates(cls, changed: pd.DataFrame) -> None:
+        """Upsert changed rows into the base frame and every cached matrix in place."""
+        changed = cls._conform(changed.drop_duplicates('upi', keep='last'))
+        existing = [upi in cls._positions for upi in changed['upi']]
+        updates = changed[existing]
+        inserts = changed[[not e for e in existing]]
+
+        bundle = ModelRegistry.current()
+        if not updates.empty:
+            rows = [cls._positions[upi] for upi in updates['upi']]
+            # Column by column, so each keeps its dtype
+            for j, col in enumerate(cls._base.columns):
+                if col in updates.columns:
+                    cls._writable(j)
+                    cls._base.iloc[rows, j] = updates[col].to_numpy()
+            for name, (key, matrix) in list(cls._matrices.items()):
+                if key != _matrix_key(name, bundle):
+                    # Model swapped since the matrix was built; rebuilt on next read
+                    del cls._matrices[name]
+                    continue
+                matrix[rows] = encode_for_model(updates, name, bundle)
+
+        if not inserts.empty:
+            start = len(cls._base)
+            cls._base = pd.concat([cls._base, inserts], ignore_index=True)
+            for offset, upi in enumerate(inserts['upi']):
+                cls._positions[upi] = start + offset
+            for name, (key, matrix) in list(cls._matrices.items()):
+                if key != _matrix_key(name, bundle):
+                    del cls._matrices[name]
+                    continue
+                cls._matrices[name] = (key, np.vstack([matrix, encode_for_model(inserts, name, bundle)]))
+
+        if cls._changed is not None:
+            cls._changed.update(changed['upi'])
+        cls._stats["rows_updated"] += len(changed)
+
+    @classmethod
+    async def ensure_fresh(cls, session: AsyncSession, force: bool = False) -> None:
+        if not force and time.monotonic() - cls._last_sync < settings.FEATURE_STORE_SYNC_SECONDS and not cls._base.empty:
+            return
+        async with cls._lock:
+            if not force and time.monotonic() - cls._last_sync < settings.FEATURE_STORE_SYNC_SECONDS and not cls._base.empty:
+                return
+            if cls._base.empty or cls._watermark is None:
+                await cls._full_build(session)
+            if cls._watermark is not None:
+                total = (await session.execute(text("SELECT COUNT(*) FROM mappings"))).scalar() or 0
+                if total < len(cls._base):
+                    # Rows were deleted; the watermark cannot see that
+                    await cls._full_build(session, from_snapshot=False)
+                else:
+                    changed = await load_feature_frame(session, updated_since=cls._watermark - WATERMARK_LAG)
+                    if not changed.empty:
+                        cls._apply_updates(changed)
+                        cls._advance_watermark(changed)
+                    cls._stats["incremental_syncs"] += 1
+            cls._last_sync = time.monotonic()
+
+    @classmethod
+    def drain_changed(cls) -> Optional[Set[str]]:
+        """UPIs synced since the previous call, or None when everything may have changed."""
+        changed, cls._changed = cls._changed, set()
+        return changed
+
+    @classmethod
+    def requeue_changed(cls, changed: Optional[Set[str]]) -> None:
+        """Give back a drained set whose processing failed."""
+        if changed is None:
+            cls._changed = None
+        elif cls._changed is not None:
+            cls._changed.update(changed)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Force the next read to sync (e.g. after a bulk import)."""
+        cls._last_sync = 0.0
+
+    @classmethod
+    def _matrix(cls, model_name: str, bundle: Optional[ModelBundle] = None) -> Tuple[Tuple, np.ndarray]:
+        bundle = bundle or ModelRegistry.current()
+        key = _matrix_key(model_name, bundle)
+        cached = cls._matrices.get(model_name)
+        if cached is None or cached[0] != key:
+            cached = (key, encode_for_model(cls._base, model_name, bundle))
+            # Only the current bundle's matrix is kept; an older in-flight bundle gets a throwaway one
+            if bundle is ModelRegistry.current():
+                cls._matrices[model_name] = cached
+        return cached
+
+    @classmethod
+    def frame(cls) -> pd.DataFrame:
+        """Engineered features of every parcel (shared; do not mutate)."""
+        return cls._base
+
+    @classmethod
+    def row(cls, upi: str) -> Optional[pd.Series]:
+        pos = cls._positions.get(upi)
+        return None if pos is None else cls._base.iloc[pos]
+
+    @classmethod
+    def vector(cls, upi: str, model_name: str, bundle: Optional[ModelBundle] = None) -> Optional[np.ndarray]:
+        pos = cls._positions.get(upi)
+        if pos is None:
+            return None
+        bundle = bundle or ModelRegistry.current()
+        if bundle is not ModelRegistry.current():
+            # Bundle swapped mid-request: encode just this row with the one the caller holds
+            return encode_for_model(cls._base.iloc[pos:pos + 1], model_name, bundle)
+        _, matrix = cls._matrix(model_name, bundle)
+        return matrix[pos:pos + 1]
+
+    @classmethod
+    def matrix(cls, model_name: str, bundle: Optional[ModelBundle] = None) -> pd.DataFrame:
+        """Encoded features of every parcel for a model, row-aligned with frame()."""
+        (_, cols), matrix = cls._matrix(model_name, bundle)
+        return pd.DataFrame(matrix, columns=list(cols))
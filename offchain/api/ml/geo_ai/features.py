@@ -11,28 +11,42 @@ NON_FEATURE_COLS = [
     'created_at', 'updated_at',
 ]
 
-async def build_training_dataframe(session: AsyncSession) -> pd.DataFrame:
+# Categorical model inputs: integer-coded by CategoricalEncoder (encoder.py);
+# models trained before it used get_dummies columns "<col>_<value>"
+CATEGORICAL_COLS = ['location_encoding', 'land_use_type', 'planned_land_use', 'tenure_type']
+
+_MAPPING_FEATURES_SQL = """
+    SELECT
+        id, upi, parcel_area_sqm,
+        province, district, sector, cell, village,
+        land_use_type, planned_land_use,
+        is_developed, has_infrastructure, has_building, building_floors,
+        tenure_type, lease_term_years, remaining_lease_term,
+        under_mortgage, has_caveat, in_transaction,
+        year_of_record,
+        EXTRACT(YEAR FROM CURRENT_DATE)::int
+            - COALESCE(year_of_record, EXTRACT(YEAR FROM CURRENT_DATE)::int) AS property_age,
+        updated_at
+    FROM mappings
+"""
+
+
+async def load_feature_frame(session: AsyncSession, updated_since=None) -> pd.DataFrame:
     """
-    Loads mapping data from DB using actual schema, performs feature engineering,
-    and returns a pandas DataFrame ready for training or inference.
+    Loads mapping rows (optionally only those updated at/after `updated_since`)
+    and adds the engineered features, without one-hot encoding. Keeps
+    `updated_at` so callers can track a watermark.
     """
-    result = await session.execute(text("""
-        SELECT
-            id, upi, parcel_area_sqm,
-            province, district, sector, cell, village,
-            land_use_type, planned_land_use,
-            is_developed, has_infrastructure, has_building, building_floors,
-            tenure_type, lease_term_years, remaining_lease_term,
-            under_mortgage, has_caveat, in_transaction,
-            year_of_record,
-            EXTRACT(YEAR FROM CURRENT_DATE)::int
-                - COALESCE(year_of_record, EXTRACT(YEAR FROM CURRENT_DATE)::int) AS property_age
-        FROM mappings
-    """))
+    sql = _MAPPING_FEATURES_SQL
+    params = {}
+    if updated_since is not None:
+        sql += " WHERE updated_at >= :since"
+        params['since'] = updated_since
+    result = await session.execute(text(sql), params)
     mappings = result.fetchall()
     if not mappings:
         return pd.DataFrame()
-    df = pd.DataFrame([dict(row._mapping) for row in mappings])
+    df = pd.DataFrame.from_records(mappings, columns=list(result.keys()))
 
     # Handle nulls with real column names
     df.fillna({
@@ -71,17 +85,38 @@ async def build_training_dataframe(session: AsyncSession) -> pd.DataFrame:
         df['district'].astype(str) + '_' + df['sector'].astype(str)
     )
 
+    # Proxy price (target) — parcel_area_sqm × development_score
+    df['price'] = df['parcel_area_sqm'] * df['development_score'].replace(0, 1)
+
+    return df
+
+
+def encode_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """One-hot encode an engineered frame the way pre-encoder models were trained."""
+    if df.empty:
+        return df
+    df = df.drop(columns=['updated_at'], errors='ignore')
+    # Feature store frames keep categorical dtypes; dummies must only cover
+    # observed values, as they did when these models were trained
+    df = df.astype({col: object for col in CATEGORICAL_COLS
+                    if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)})
+
     # Encode categorical fields
     df = pd.get_dummies(
         df,
-        columns=['location_encoding', 'land_use_type', 'planned_land_use', 'tenure_type'],
+        columns=CATEGORICAL_COLS,
         drop_first=True
     )
 
     # Drop string/non-numeric location columns after encoding
     df.drop(columns=['province', 'cell', 'village'], errors='ignore', inplace=True)
 
-    # Proxy price (target) — parcel_area_sqm × development_score
-    df['price'] = df['parcel_area_sqm'] * df['development_score'].replace(0, 1)
-
     return df
+
+
+async def build_training_dataframe(session: AsyncSession) -> pd.DataFrame:
+    """
+    Loads mapping data from DB using actual schema, performs feature engineering,
+    and returns a pandas DataFrame ready for training or inference.
+    """
+    return encode_feature_frame(await load_feature_frame(session))
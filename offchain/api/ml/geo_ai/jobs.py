@@ -0,0 +1,152 @@
+"""
+GeoAI training jobs: recorded in `training_jobs`, run out of process
+
+`submit` inserts a queued job and launches scripts/train_geoai.py for it
+as a child process, so LightGBM's CPU work never runs on an API worker's
+event loop. The script trains from the latest feature snapshot (rebuilt
+from SQL only when missing or stale, see snapshot.py), re-scores the
+parcels and records status, duration, metrics and the produced model
+version on the job row. The partial unique index on training_jobs allows
+only one queued/running job, so a second submit returns the active job
+instead of starting a duplicate run.
+
+The launching API worker supervises the child. When the child exits it
+swaps in the new models right away (other workers notice latest.json
+changing, see model_registry.py); on a non-zero exit or after
+GEOAI_TRAINING_TIMEOUT_SECONDS it marks the job failed (killing the child on
+timeout). Active jobs older than the timeout, e.g. left behind by a restart,
+are failed on the next submit.
+
+Usage:
+    job, created = await TrainingJobs.submit(db)
+    job = await TrainingJobs.get(db, job_id)
+"""
+
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from data.database.database import AsyncSessionLocal
+from data.models.geoai import ACTIVE_JOB_STATES, JOB_FAILED, JOB_QUEUED, TrainingJob
+from .model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+OFFCHAIN_ROOT = Path(__file__).resolve().parents[3]
+WORKER_SCRIPT = OFFCHAIN_ROOT / "scripts" / "train_geoai.py"
+
+
+async def fail_job(db: AsyncSession, job_id: int, error: str, only_active: bool = True) -> None:
+    stmt = update(TrainingJob).where(TrainingJob.id == job_id)
+    if only_active:
+        stmt = stmt.where(TrainingJob.status.in_(ACTIVE_JOB_STATES))
+    await db.execute(stmt.values(status=JOB_FAILED, error=error, finished_at=datetime.now(timezone.utc)))
+    await db.commit()
+
+
+class TrainingJobs:
+    # Keeps supervisor tasks referenced until they finish
+    _supervisors: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def to_dict(job: TrainingJob) -> Dict[str, Any]:
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "requested_at": job.requested_at.isoformat() if job.requested_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            "duration_seconds": job.duration_seconds,
+            "metrics": job.metrics,
+            "model_version": job.model_version,
+            "error": job.error,
+        }
+
+    @classmethod
+    async def get(cls, db: AsyncSession, job_id: int) -> Optional[TrainingJob]:
+        return await db.get(TrainingJob, job_id)
+
+    @classmethod
+    async def active(cls, db: AsyncSession) -> Optional[TrainingJob]:
+        result = await db.execute(
+            select(TrainingJob).where(TrainingJob.status.in_(ACTIVE_JOB_STATES)).limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def _expire_stale(cls, db: AsyncSession) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.GEOAI_TRAINING_TIMEOUT_SECONDS)
+        await db.execute(
+            update(TrainingJob)
+            .where(TrainingJob.status.in_(ACTIVE_JOB_STATES), TrainingJob.requested_at < cutoff)
+            .values(status=JOB_FAILED, error="Abandoned (exceeded training timeout)",
+                    finished_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+
+    @classmethod
+    async def create(cls, db: AsyncSession) -> Tuple[TrainingJob, bool]:
+        """Insert a queued job. Returns (job, True), or (active job, False) when one is already running."""
+        await cls._expire_stale(db)
+        job = TrainingJob(status=JOB_QUEUED)
+        db.add(job)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            active = await cls.active(db)
+            if active is None:
+                raise
+            return active, False
+        await db.refresh(job)
+        return job, True
+
+    @classmethod
+    async def submit(cls, db: AsyncSession) -> Tuple[TrainingJob, bool]:
+        """Create a job and start its worker process; see create() for the return value."""
+        job, created = await cls.create(db)
+        if created:
+            task = asyncio.create_task(cls._supervise(job.id))
+            cls._supervisors.add(task)
+            task.add_done_callback(cls._supervisors.discard)
+        return job, created
+
+    @classmethod
+    async def _supervise(cls, job_id: int) -> None:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, str(WORKER_SCRIPT), "--job-id", str(job_id), cwd=str(OFFCHAIN_ROOT),
+            )
+        except OSError as e:
+            logger.error(f"Could not start GeoAI training job {job_id}: {e}")
+            async with AsyncSessionLocal() as db:
+                await fail_job(db, job_id, f"Worker failed to start: {e}")
+            return
+
+        try:
+            code = await asyncio.wait_for(proc.wait(), timeout=settings.GEOAI_TRAINING_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            logger.error(f"GeoAI training job {job_id} timed out and was killed")
+            async with AsyncSessionLocal() as db:
+                await fail_job(db, job_id, "Timed out")
+            return
+
+        if code != 0:
+            # The worker records its own failures; this covers crashes before it could
+            async with AsyncSessionLocal() as db:
+                await fail_job(db, job_id, f"Worker exited with code {code}")
+            return
+
+        # Swap now in this worker; the others pick latest.json up on their next watch check
+        bundle = await asyncio.to_thread(ModelRegistry.reload_models)
+        logger.info(f"GeoAI training job {job_id} finished; models reloaded ({bundle.version})")
@@ -1,48 +1,185 @@
+"""
+GeoAI model registry: lazily loaded, hot-swapped immutable bundles
+
+Everything produced by one training run (models, feature lists, encoders,
+version) lives in a frozen `ModelBundle`. The registry holds a single
+reference to the current bundle. Swapping it is one attribute assignment,
+so readers never take a lock and never see half a retrain.
+
+- Nothing loads at import; the first `current()` call loads latest.json.
+  The app lifespan makes that call in a thread before serving, so request
+  handlers never load models on the event loop.
+- Afterwards, at most every GEOAI_MODEL_WATCH_SECONDS, a read stats
+  models/latest.json. When the file changed, a background thread loads the
+  new bundle and swaps it in. Requests keep using the old bundle meanwhile,
+  and a failed load keeps it too.
+- `reload_models()` loads and swaps synchronously (training worker, job
+  supervisor).
+
+Callers take one bundle per request, so every model they use and the
+version they report come from the same training run:
+
+    bundle = ModelRegistry.current()
+    model = bundle.get_model('risk')
+    ... {'model_version': bundle.version}
+"""
+
 import os
 import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, List, Mapping, Optional, Tuple
+
 import joblib
-from threading import Lock
+
+from config.config import settings
+from .encoder import CategoricalEncoder
 
 MODELS_DIR = os.path.join(os.path.dirname(__file__), '../../../models')
 LATEST_PATH = os.path.join(MODELS_DIR, 'latest.json')
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    version: Optional[str] = None     # "v<timestamp>" of the training run
+    models: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    features: Mapping[str, List[str]] = field(default_factory=lambda: MappingProxyType({}))
+    encoders: Mapping[str, CategoricalEncoder] = field(default_factory=lambda: MappingProxyType({}))
+
+    def get_model(self, name):
+        return self.models.get(name)
+
+    def get_features(self, name) -> List[str]:
+        return self.features.get(name, [])
+
+    def get_encoder(self, name) -> Optional[CategoricalEncoder]:
+        return self.encoders.get(name)
+
+
+EMPTY_BUNDLE = ModelBundle()
+
+
+def _latest_signature() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(LATEST_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_bundle() -> ModelBundle:
+    """Read latest.json and every payload it names into a new bundle."""
+    if not os.path.exists(LATEST_PATH):
+        return EMPTY_BUNDLE
+    with open(LATEST_PATH, 'r') as f:
+        latest = json.load(f)
+
+    models, features, encoders = {}, {}, {}
+    for key, fname in latest.items():
+        path = os.path.join(MODELS_DIR, fname)
+        if not os.path.exists(path):
+            continue
+        payload = joblib.load(path)
+        if isinstance(payload, dict):
+            models[key] = payload['model']
+            features[key] = list(payload.get('features', []))
+            if payload.get('encoder'):
+                encoders[key] = CategoricalEncoder.from_dict(payload['encoder'])
+        else:
+            # Legacy: plain model
+            models[key] = payload
+            features[key] = []
+
+    # Files are named <model>_model_v<timestamp>.pkl by train_all_models
+    stamps = [os.path.splitext(fname)[0].rsplit('_v', 1)[-1] for fname in latest.values()]
+    return ModelBundle(
+        version=f'v{max(stamps)}' if stamps else None,
+        models=MappingProxyType(models),
+        features=MappingProxyType(features),
+        encoders=MappingProxyType(encoders),
+    )
+
+
 class ModelRegistry:
-    _models = {}     # name -> sklearn/lgbm model object
-    _features = {}   # name -> list of feature column names
-    _lock = Lock()
+    _bundle: Optional[ModelBundle] = None   # None until first use
+    _signature = None                       # latest.json (mtime, size) the bundle came from
+    _checked_at: float = 0.0
+    _loading = False
+    _lock = threading.Lock()                # serializes loads; readers never take it
+
+    @classmethod
+    def current(cls) -> ModelBundle:
+        bundle = cls._bundle
+        if bundle is None:
+            with cls._lock:
+                if cls._bundle is None:
+                    cls._swap_locked()
+                return cls._bundle
+        cls._watch()
+        return bundle
+
+    @classmethod
+    def _swap_locked(cls) -> None:
+        # Signature first: a write during the load is picked up by the next check
+        signature = _latest_signature()
+        try:
+            bundle = load_bundle()
+        except Exception as e:
+            logger.error(f'Could not load GeoAI models from {LATEST_PATH}: {e}')
+            if cls._bundle is None:
+                cls._bundle = EMPTY_BUNDLE
+            return
+        cls._bundle = bundle
+        cls._signature = signature
+        logger.info(f'GeoAI models loaded ({bundle.version or "none"})')
+
+    @classmethod
+    def _watch(cls) -> None:
+        now = time.monotonic()
+        if now - cls._checked_at < settings.GEOAI_MODEL_WATCH_SECONDS:
+            return
+        cls._checked_at = now
+        if cls._loading or _latest_signature() == cls._signature:
+            return
+        cls._loading = True
+        threading.Thread(target=cls._swap_in_background, name='geoai-model-swap', daemon=True).start()
+
+    @classmethod
+    def _swap_in_background(cls) -> None:
+        try:
+            with cls._lock:
+                cls._swap_locked()
+        finally:
+            cls._loading = False
 
     @classmethod
-    def load_models(cls):
+    def reload_models(cls) -> ModelBundle:
+        """Load latest.json now and swap it in (blocks the caller, not readers)."""
         with cls._lock:
-            if not os.path.exists(LATEST_PATH):
-                cls._models = {}
-                cls._features = {}
-                return
-            with open(LATEST_PATH, 'r') as f:
-                latest = json.load(f)
-            for key, fname in latest.items():
-                path = os.path.join(MODELS_DIR, fname)
-                if os.path.exists(path):
-                    payload = joblib.load(path)
-                    if isinstance(payload, dict):
-                        cls._models[key] = payload['model']
-                        cls._features[key] = payload.get('features', [])
-                    else:
-                        # Legacy: plain model
-                        cls._models[key] = payload
-                        cls._features[key] = []
+            cls._swap_locked()
+            return cls._bundle
+
+    load_models = reload_models
+
+    # Shorthands on the current bundle; use current() when several values must match
 
     @classmethod
     def get_model(cls, name):
-        return cls._models.get(name)
+        return cls.current().get_model(name)
 
     @classmethod
     def get_features(cls, name):
-        return cls._features.get(name, [])
+        return cls.current().get_features(name)
 
     @classmethod
-    def reload_models(cls):
-        cls.load_models()
+    def get_encoder(cls, name):
+        return cls.current().get_encoder(name)
 
-# Load models at startup
-ModelRegistry.load_models()
+    @classmethod
+    def version(cls):
+        return cls.current().version
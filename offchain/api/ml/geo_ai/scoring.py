@@ -0,0 +1,198 @@
+"""
+Batch scoring into `geoai_scores`
+
+`score_parcels` runs every model over the feature store and upserts one row
+per parcel (value, investment, risk, growth and bank scores, tagged with the
+model version), so the top-k endpoints become indexed reads instead of
+scoring the whole population per request.
+
+It runs after every retrain, and `GeoAIScoreRefresher` re-scores parcels
+changed since its last tick (or everything, after a full feature store
+rebuild or a model version change). A session-level Postgres advisory lock,
+held on its own autocommit connection, keeps it to one worker per tick; the
+scoring itself commits in short transactions, so no transaction stays open
+across the feature sync and prediction. A worker whose models are older
+than the newest version in the table skips the tick, so it never overwrites
+newer scores; it catches up once its registry swaps in the new bundle.
+
+Usage (app lifespan):
+    GeoAIScoreRefresher.start()
+    ...
+    await GeoAIScoreRefresher.stop()
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from data.database.bulk import bulk_upsert
+from data.database.database import AsyncSessionLocal
+from data.database.locks import GEOAI_SCORE_REFRESH_LOCK, session_advisory_lock
+from data.models.geoai import GeoAIScore
+from .feature_store import FeatureStore
+from .model_registry import ModelRegistry
+from .service import _get_population_features
+
+logger = logging.getLogger(__name__)
+
+SCORE_MODELS = ('valuation', 'investment', 'risk', 'growth')
+
+
+def _optional(value) -> Optional[str]:
+    return None if value is None or (isinstance(value, float) and np.isnan(value)) else str(value)
+
+
+def _predict(bundle, X_val, X_inv, X_risk, X_growth):
+    return (
+        bundle.get_model('valuation').predict(X_val),
+        bundle.get_model('investment').predict_proba(X_inv)[:, 1],
+        bundle.get_model('risk').predict_proba(X_risk)[:, 1],
+        bundle.get_model('growth').predict(X_growth),
+    )
+
+
+async def score_parcels(session: AsyncSession, upis: Optional[Iterable[str]] = None, commit: bool = True) -> int:
+    """
+    Score all parcels (or only `upis`) with the loaded models and upsert the
+    results. Returns the number of rows written; 0 when models are missing.
+    """
+    bundle = ModelRegistry.current()
+    version = bundle.version
+    if version is None or any(bundle.get_model(name) is None for name in SCORE_MODELS):
+        return 0
+
+    df, (X_val, X_inv, X_risk, X_growth) = await _get_population_features(session, *SCORE_MODELS, bundle=bundle)
+    if df.empty:
+        return 0
+    if upis is not None:
+        mask = df['upi'].isin(set(upis)).to_numpy()
+        if not mask.any():
+            return 0
+        df, X_val, X_inv, X_risk, X_growth = df[mask], X_val[mask], X_inv[mask], X_risk[mask], X_growth[mask]
+
+    if commit:
+        # End the read transaction; do not hold it open through prediction
+        await session.commit()
+
+    # LightGBM releases the GIL; keep a full re-score off the event loop
+    value, investment, risk, growth = await asyncio.to_thread(
+        _predict, bundle, X_val, X_inv, X_risk, X_growth
+    )
+    bank = investment - risk
+
+    computed_at = datetime.now(timezone.utc)
+    rows = [
+        {
+            'upi': upi,
+            'model_version': version,
+            'district': _optional(district),
+            'sector': _optional(sector),
+            'predicted_value': float(value[i]),
+            'investment_probability': float(investment[i]),
+            'risk_probability': float(risk[i]),
+            'growth_score': float(growth[i]),
+            'bank_score': float(bank[i]),
+            'computed_at': computed_at,
+        }
+        for i, (upi, district, sector) in enumerate(zip(df['upi'], df['district'], df['sector']))
+    ]
+    await bulk_upsert(session, GeoAIScore, rows, index_elements=('upi',))
+    if commit:
+        await session.commit()
+    logger.info(f'GeoAI scores written for {len(rows)} parcel(s) (model {version})')
+    return len(rows)
+
+
+async def scored_version_range(session: AsyncSession) -> Tuple[Optional[str], Optional[str]]:
+    """(oldest, newest) model_version in geoai_scores; (None, None) when empty."""
+    # Versions are "v<unix seconds>", so string order is training order
+    row = await session.execute(select(func.min(GeoAIScore.model_version), func.max(GeoAIScore.model_version)))
+    oldest, newest = row.one()
+    return oldest, newest
+
+
+class GeoAIScoreRefresher:
+    _task: Optional[asyncio.Task] = None
+    _stats: Dict[str, int] = {
+        "ticks": 0, "skipped_locked": 0, "skipped_stale_models": 0, "full_runs": 0, "rows_scored": 0,
+    }
+
+    @classmethod
+    def stats(cls) -> Dict[str, object]:
+        return {
+            **cls._stats,
+            "running": cls._task is not None and not cls._task.done(),
+            "interval_seconds": settings.GEOAI_SCORE_REFRESH_INTERVAL_SECONDS,
+            "model_version": ModelRegistry.version(),
+        }
+
+    @classmethod
+    async def tick(cls) -> int:
+        """One scoring round. Returns the number of rows written."""
+        cls._stats["ticks"] += 1
+        # First use loads the models; keep that off the event loop
+        bundle = await asyncio.to_thread(ModelRegistry.current)
+        if bundle.version is None:
+            return 0
+        async with session_advisory_lock(GEOAI_SCORE_REFRESH_LOCK) as locked:
+            if not locked:
+                cls._stats["skipped_locked"] += 1
+                return 0
+            async with AsyncSessionLocal() as db:
+                oldest, newest = await scored_version_range(db)
+                if newest is not None and bundle.version < newest:
+                    # This worker has not swapped in the newer models yet
+                    cls._stats["skipped_stale_models"] += 1
+                    return 0
+                await FeatureStore.ensure_fresh(db, force=True)
+                await db.commit()
+                changed = FeatureStore.drain_changed()
+                try:
+                    outdated = oldest is not None and oldest != bundle.version
+                    if changed is None or outdated:
+                        cls._stats["full_runs"] += 1
+                        written = await score_parcels(db)
+                    elif changed:
+                        written = await score_parcels(db, changed)
+                    else:
+                        written = 0
+                except Exception:
+                    FeatureStore.requeue_changed(changed)
+                    raise
+        cls._stats["rows_scored"] += written
+        return written
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            try:
+                await cls.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"GeoAI score refresh tick failed: {e}")
+            await asyncio.sleep(settings.GEOAI_SCORE_REFRESH_INTERVAL_SECONDS)
+
+    @classmethod
+    def start(cls) -> None:
+        if not settings.GEOAI_SCORE_REFRESH_ENABLED or (cls._task and not cls._task.done()):
+            return
+        cls._task = asyncio.create_task(cls._run())
+        logger.info(f"GeoAI score refresher started (every {settings.GEOAI_SCORE_REFRESH_INTERVAL_SECONDS}s)")
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
@@ -1,10 +1,13 @@
 import logging
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from .features import build_training_dataframe
-from .model_registry import ModelRegistry
+from data.models.geoai import GeoAIScore
+from .features import encode_feature_frame
+from .feature_store import FeatureStore
+from .model_registry import ModelBundle, ModelRegistry
 import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 BASE_DROP = ['upi', 'id', 'district', 'sector', 'price', 'property_age',
              'risk_score', 'development_score']
@@ -44,8 +47,8 @@ def _safe_records(df, cols):
     ]
 
 
-def _align_features(row_or_df, model_name):
-    cols = ModelRegistry.get_features(model_name)
+def _align_features(row_or_df, model_name, bundle: ModelBundle):
+    cols = bundle.get_features(model_name)
     if not cols:
         if isinstance(row_or_df, pd.Series):
             return row_or_df.drop(BASE_DROP, errors='ignore') \
@@ -63,29 +66,46 @@ def _align_features(row_or_df, model_name):
     return row_or_df[cols]
 
 
-async def _get_features_for_upi(session: AsyncSession, upi: str):
-    df = await build_training_dataframe(session)
-    row = df[df['upi'] == upi]
-    if row.empty:
+async def _get_features_for_upi(session: AsyncSession, upi: str, model_name: str, bundle: ModelBundle):
+    """Engineered feature row and the model-aligned vector for one parcel."""
+    await FeatureStore.ensure_fresh(session)
+    row = FeatureStore.row(upi)
+    if row is None:
         raise ValueError(f'No data found for UPI: {upi}')
-    return row.iloc[0], df
+    if bundle.get_features(model_name):
+        return row, FeatureStore.vector(upi, model_name, bundle)
+    # Models saved without a feature list: align against the encoded frame
+    df = encode_feature_frame(FeatureStore.frame())
+    return row, _align_features(df[df['upi'] == upi].iloc[0], model_name, bundle)
+
+
+async def _get_population_features(session: AsyncSession, *model_names, bundle: Optional[ModelBundle] = None):
+    """Parcel identifiers plus one aligned feature frame per model, row for row."""
+    bundle = bundle or ModelRegistry.current()
+    await FeatureStore.ensure_fresh(session)
+    if all(bundle.get_features(name) for name in model_names):
+        df = FeatureStore.frame().reindex(columns=['upi', 'district', 'sector'])
+        return df, [FeatureStore.matrix(name, bundle) for name in model_names]
+    df = encode_feature_frame(FeatureStore.frame())
+    return df, [_align_features(df, name, bundle) for name in model_names]
 
 
 async def predict_land_value(session: AsyncSession, upi: str) -> Dict[str, Any]:
     try:
-        features, _ = await _get_features_for_upi(session, upi)
-        model = ModelRegistry.get_model('valuation')
+        bundle = ModelRegistry.current()
+        model = bundle.get_model('valuation')
         if model is None:
             raise RuntimeError('Valuation model not loaded. Run POST /api/geoai/retrain first.')
-        X = _align_features(features, 'valuation')
+        features, X = await _get_features_for_upi(session, upi, 'valuation', bundle)
         pred = float(model.predict(X)[0])
         return _to_python({
             'upi': upi,
             'predicted_land_value': pred,
             'confidence': round(pred * 0.05, 4),
+            'model_version': bundle.version,
             'explainability': {
                 'feature_importance': _feature_importance(
-                    model, ModelRegistry.get_features('valuation'))
+                    model, bundle.get_features('valuation'))
             }
         })
     except Exception as e:
@@ -95,11 +115,11 @@ async def predict_land_value(session: AsyncSession, upi: str) -> Dict[str, Any]:
 
 async def predict_investment_score(session: AsyncSession, upi: str) -> Dict[str, Any]:
     try:
-        features, _ = await _get_features_for_upi(session, upi)
-        model = ModelRegistry.get_model('investment')
+        bundle = ModelRegistry.current()
+        model = bundle.get_model('investment')
         if model is None:
             raise RuntimeError('Investment model not loaded. Run POST /api/geoai/retrain first.')
-        X = _align_features(features, 'investment')
+        features, X = await _get_features_for_upi(session, upi, 'investment', bundle)
         proba = model.predict_proba(X)[0]
         pred = float(proba[1])
         proxy_value = float(features.get('parcel_area_sqm', 1) or 1) * \
@@ -109,9 +129,10 @@ async def predict_investment_score(session: AsyncSession, upi: str) -> Dict[str,
             'investment_probability': pred,
             'investment_score': pred / proxy_value,
             'confidence': float(np.max(proba) - np.min(proba)),
+            'model_version': bundle.version,
             'explainability': {
                 'feature_importance': _feature_importance(
-                    model, ModelRegistry.get_features('investment'))
+                    model, bundle.get_features('investment'))
             }
         })
     except Exception as e:
@@ -121,11 +142,11 @@ async def predict_investment_score(session: AsyncSession, upi: str) -> Dict[str,
 
 async def predict_risk(session: AsyncSession, upi: str) -> Dict[str, Any]:
     try:
-        features, _ = await _get_features_for_upi(session, upi)
-        model = ModelRegistry.get_model('risk')
+        bundle = ModelRegistry.current()
+        model = bundle.get_model('risk')
         if model is None:
             raise RuntimeError('Risk model not loaded. Run POST /api/geoai/retrain first.')
-        X = _align_features(features, 'risk')
+        features, X = await _get_features_for_upi(session, upi, 'risk', bundle)
         proba = model.predict_proba(X)[0]
         pred = float(proba[1])
         return _to_python({
@@ -133,6 +154,7 @@ async def predict_risk(session: AsyncSession, upi: str) -> Dict[str, Any]:
             'risk_probability': pred,
             'risk_label': 'HIGH' if pred > 0.5 else 'LOW',
             'confidence': float(np.max(proba) - np.min(proba)),
+            'model_version': bundle.version,
             'explainability': {
                 'risk_factors': {
                     'under_mortgage': int(features.get('under_mortgage', 0)),
@@ -140,7 +162,7 @@ async def predict_risk(session: AsyncSession, upi: str) -> Dict[str, Any]:
                     'in_transaction': int(features.get('in_transaction', 0)),
                 },
                 'feature_importance': _feature_importance(
-                    model, ModelRegistry.get_features('risk'))
+                    model, bundle.get_features('risk'))
             }
         })
     except Exception as e:
@@ -148,79 +170,165 @@ async def predict_risk(session: AsyncSession, upi: str) -> Dict[str, Any]:
         return {'error': str(e)}
 
 
-async def get_risky_parcels(session: AsyncSession) -> Dict[str, Any]:
+def _score_filters(version: str, district: Optional[str], sector: Optional[str]) -> List[Any]:
+    filters = [GeoAIScore.model_version == version]
+    if district:
+        filters.append(GeoAIScore.district == district)
+    if sector:
+        filters.append(GeoAIScore.sector == sector)
+    return filters
+
+
+def _filter_frame(df: pd.DataFrame, district: Optional[str], sector: Optional[str]) -> pd.DataFrame:
+    if district:
+        df = df[df['district'] == district]
+    if sector:
+        df = df[df['sector'] == sector]
+    return df
+
+
+async def _has_stored_scores(session: AsyncSession, version: Optional[str]) -> bool:
+    """True once geoai_scores holds rows for the given model version."""
+    if version is None:
+        return False
+    row = await session.execute(
+        select(GeoAIScore.upi).where(GeoAIScore.model_version == version).limit(1)
+    )
+    return row.first() is not None
+
+
+async def _stored_top(session: AsyncSession, column, filters, limit: int):
+    result = await session.execute(
+        select(GeoAIScore.upi, GeoAIScore.district, GeoAIScore.sector, column)
+        .where(*filters)
+        .order_by(column.desc())
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def get_risky_parcels(session: AsyncSession, district: Optional[str] = None,
+                            sector: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
     try:
-        df = await build_training_dataframe(session)
-        model = ModelRegistry.get_model('risk')
+        bundle = ModelRegistry.current()
+        model = bundle.get_model('risk')
         if model is None:
             raise RuntimeError('Risk model not loaded. Run POST /api/geoai/retrain first.')
-        X = _align_features(df, 'risk')
-        risk_pred = model.predict_proba(X)[:, 1]
-        df['risk_probability'] = risk_pred
+        explainability = {
+            'feature_importance': _feature_importance(
+                model, bundle.get_features('risk'))
+        }
+        if await _has_stored_scores(session, bundle.version):
+            filters = _score_filters(bundle.version, district, sector)
+            risky = GeoAIScore.risk_probability > 0.5
+            total, avg = (await session.execute(
+                select(func.count().filter(risky), func.avg(GeoAIScore.risk_probability)).where(*filters)
+            )).one()
+            return _to_python({
+                'total_risky_parcels': int(total or 0),
+                'risky_parcels': await _stored_top(
+                    session, GeoAIScore.risk_probability, filters + [risky], limit),
+                'avg_risk_score': float(avg) if avg is not None else None,
+                'model_version': bundle.version,
+                'explainability': explainability
+            })
+
+        df, (X,) = await _get_population_features(session, 'risk', bundle=bundle)
+        df['risk_probability'] = model.predict_proba(X)[:, 1]
+        df = _filter_frame(df, district, sector)
         risky = df[df['risk_probability'] > 0.5] \
-                    .sort_values('risk_probability', ascending=False).head(20)
+                    .sort_values('risk_probability', ascending=False)
         return _to_python({
             'total_risky_parcels': int(len(risky)),
-            'risky_parcels': _safe_records(risky, ['upi', 'district', 'sector', 'risk_probability']),
-            'avg_risk_score': float(np.mean(risk_pred)),
-            'explainability': {
-                'feature_importance': _feature_importance(
-                    model, ModelRegistry.get_features('risk'))
-            }
+            'risky_parcels': _safe_records(risky.head(limit), ['upi', 'district', 'sector', 'risk_probability']),
+            'avg_risk_score': float(df['risk_probability'].mean()) if len(df) else None,
+            'model_version': bundle.version,
+            'explainability': explainability
         })
     except Exception as e:
         logging.exception(e)
         return {'error': str(e)}
 
 
-async def get_growth_ranking(session: AsyncSession) -> Dict[str, Any]:
+async def get_growth_ranking(session: AsyncSession, district: Optional[str] = None,
+                             sector: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
     try:
-        df = await build_training_dataframe(session)
-        model = ModelRegistry.get_model('growth')
+        bundle = ModelRegistry.current()
+        model = bundle.get_model('growth')
         if model is None:
             raise RuntimeError('Growth model not loaded. Run POST /api/geoai/retrain first.')
-        X = _align_features(df, 'growth')
-        preds = model.predict(X)
-        df['growth_score'] = preds
-        top = df.sort_values('growth_score', ascending=False).head(10)
+        explainability = {
+            'feature_importance': _feature_importance(
+                model, bundle.get_features('growth'))
+        }
+        if await _has_stored_scores(session, bundle.version):
+            filters = _score_filters(bundle.version, district, sector)
+            spread = (await session.execute(
+                select(func.stddev_pop(GeoAIScore.growth_score)).where(*filters)
+            )).scalar()
+            return _to_python({
+                'top_growth_neighborhoods': await _stored_top(
+                    session, GeoAIScore.growth_score, filters, limit),
+                'confidence': float(spread) if spread is not None else None,
+                'model_version': bundle.version,
+                'explainability': explainability
+            })
+
+        df, (X,) = await _get_population_features(session, 'growth', bundle=bundle)
+        df['growth_score'] = model.predict(X)
+        df = _filter_frame(df, district, sector)
+        top = df.sort_values('growth_score', ascending=False).head(limit)
         return _to_python({
             'top_growth_neighborhoods': _safe_records(
                 top, ['upi', 'district', 'sector', 'growth_score']),
-            'confidence': float(np.std(preds)),
-            'explainability': {
-                'feature_importance': _feature_importance(
-                    model, ModelRegistry.get_features('growth'))
-            }
+            'confidence': float(np.std(df['growth_score'])) if len(df) else None,
+            'model_version': bundle.version,
+            'explainability': explainability
         })
     except Exception as e:
         logging.exception(e)
         return {'error': str(e)}
 
 
-async def get_bank_lending_targets(session: AsyncSession) -> Dict[str, Any]:
+async def get_bank_lending_targets(session: AsyncSession, district: Optional[str] = None,
+                                   sector: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
     try:
-        df = await build_training_dataframe(session)
-        inv_model = ModelRegistry.get_model('investment')
-        risk_model = ModelRegistry.get_model('risk')
+        bundle = ModelRegistry.current()
+        inv_model = bundle.get_model('investment')
+        risk_model = bundle.get_model('risk')
         if inv_model is None or risk_model is None:
             raise RuntimeError('Models not loaded. Run POST /api/geoai/retrain first.')
-        X_inv  = _align_features(df, 'investment')
-        X_risk = _align_features(df, 'risk')
+        explainability = {
+            'investment_feature_importance': _feature_importance(
+                inv_model, bundle.get_features('investment')),
+            'risk_feature_importance': _feature_importance(
+                risk_model, bundle.get_features('risk'))
+        }
+        if await _has_stored_scores(session, bundle.version):
+            filters = _score_filters(bundle.version, district, sector)
+            spread = (await session.execute(
+                select(func.stddev_pop(GeoAIScore.bank_score)).where(*filters)
+            )).scalar()
+            return _to_python({
+                'bank_lending_targets': await _stored_top(
+                    session, GeoAIScore.bank_score, filters, limit),
+                'confidence': float(spread) if spread is not None else None,
+                'model_version': bundle.version,
+                'explainability': explainability
+            })
+
+        df, (X_inv, X_risk) = await _get_population_features(session, 'investment', 'risk', bundle=bundle)
         inv_pred  = inv_model.predict_proba(X_inv)[:, 1]
         risk_pred = risk_model.predict_proba(X_risk)[:, 1]
-        bank_score = inv_pred - risk_pred
-        df['bank_score'] = bank_score
-        top = df.sort_values('bank_score', ascending=False).head(10)
+        df['bank_score'] = inv_pred - risk_pred
+        df = _filter_frame(df, district, sector)
+        top = df.sort_values('bank_score', ascending=False).head(limit)
         return _to_python({
             'bank_lending_targets': _safe_records(
                 top, ['upi', 'district', 'sector', 'bank_score']),
-            'confidence': float(np.std(bank_score)),
-            'explainability': {
-                'investment_feature_importance': _feature_importance(
-                    inv_model, ModelRegistry.get_features('investment')),
-                'risk_feature_importance': _feature_importance(
-                    risk_model, ModelRegistry.get_features('risk'))
-            }
+            'confidence': float(np.std(df['bank_score'])) if len(df) else None,
+            'model_version': bundle.version,
+            'explainability': explainability
         })
     except Exception as e:
         logging.exception(e)
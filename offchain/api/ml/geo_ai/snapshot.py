@@ -0,0 +1,154 @@
+"""
+Versioned columnar snapshots of the GeoAI feature frame
+
+The engineered (pre-encoding) frame from `load_feature_frame` is written to
+GEOAI_SNAPSHOT_DIR as an uncompressed Arrow IPC file, with the categorical
+columns stored dictionary-encoded:
+
+    features_v<ms>.arrow        one immutable snapshot
+    latest.json                 pointer to the newest snapshot
+
+Readers memory-map the file read-only, so every worker shares the page cache
+instead of each holding a private copy built from SQL. A snapshot is written
+to a temp file and renamed into place, and the pointer is replaced the same
+way, so readers never see a partial file. The newest GEOAI_SNAPSHOT_KEEP
+snapshots are kept.
+
+Snapshots keep `updated_at`, so the feature store can resume incremental
+syncs from the snapshot's watermark.
+
+Usage:
+    df = await snapshot_frame(session)          # reuses a recent snapshot
+    df = await refresh_snapshot(session)        # always re-reads Postgres
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from .features import CATEGORICAL_COLS, load_feature_frame
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality text columns stored as Arrow dictionaries
+DICTIONARY_COLS = CATEGORICAL_COLS + ['province', 'district', 'sector', 'cell', 'village']
+
+_refresh_lock = asyncio.Lock()
+# version -> frame already read in this process
+_loaded: Dict[str, pd.DataFrame] = {}
+
+
+def _root() -> Path:
+    return Path(settings.GEOAI_SNAPSHOT_DIR)
+
+
+def _pointer_path() -> Path:
+    return _root() / 'latest.json'
+
+
+def _read_pointer() -> Optional[dict]:
+    try:
+        return json.loads(_pointer_path().read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def _prune() -> None:
+    snapshots = sorted(_root().glob('features_v*.arrow'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in snapshots[max(1, settings.GEOAI_SNAPSHOT_KEEP):]:
+        path.unlink(missing_ok=True)
+        _loaded.pop(path.stem, None)
+
+
+def write_snapshot(df: pd.DataFrame) -> str:
+    """Write an engineered frame as a new snapshot and point latest.json at it."""
+    root = _root()
+    root.mkdir(parents=True, exist_ok=True)
+    version = f'features_v{int(time.time() * 1000)}'
+
+    typed = df.astype({col: 'category' for col in DICTIONARY_COLS if col in df.columns})
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+
+    path = root / f'{version}.arrow'
+    tmp = path.with_suffix('.part')
+    # Uncompressed so readers can map the buffers without decoding them
+    with pa.OSFile(str(tmp), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+    pointer = {'version': version, 'rows': len(df), 'created_at': time.time()}
+    tmp_pointer = _pointer_path().with_suffix('.tmp')
+    tmp_pointer.write_text(json.dumps(pointer), encoding='utf-8')
+    os.replace(tmp_pointer, _pointer_path())
+
+    _prune()
+    logger.info(f'GeoAI feature snapshot {version} written ({len(df)} rows)')
+    return version
+
+
+def read_snapshot(version: str) -> pd.DataFrame:
+    """Memory-map a snapshot read-only (cached per process)."""
+    if version in _loaded:
+        return _loaded[version]
+    source = pa.memory_map(str(_root() / f'{version}.arrow'), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks lets numeric columns without nulls stay views on the mapping
+    df = table.to_pandas(split_blocks=True)
+    _loaded.clear()
+    _loaded[version] = df
+    return df
+
+
+def release_loaded() -> None:
+    """Drop this module's frame references once a long-lived owner (the feature store) holds the frame."""
+    _loaded.clear()
+
+
+def latest_snapshot(max_age: Optional[int] = None) -> Optional[Tuple[str, pd.DataFrame]]:
+    """The newest snapshot as (version, frame), or None when missing or older than `max_age` seconds."""
+    pointer = _read_pointer()
+    if pointer is None:
+        return None
+    if max_age is not None and time.time() - pointer.get('created_at', 0) > max_age:
+        return None
+    try:
+        return pointer['version'], read_snapshot(pointer['version'])
+    except (OSError, KeyError, pa.ArrowInvalid) as e:
+        logger.warning(f'Could not read GeoAI feature snapshot: {e}')
+        return None
+
+
+async def refresh_snapshot(session: AsyncSession, max_age: Optional[int] = None) -> pd.DataFrame:
+    """
+    Rebuild the snapshot from Postgres and return the memory-mapped frame.
+    With `max_age`, a snapshot that became fresh enough while waiting for the
+    lock is returned instead of building another.
+    """
+    async with _refresh_lock:
+        if max_age is not None:
+            latest = latest_snapshot(max_age=max_age)
+            if latest is not None:
+                return latest[1]
+        df = await load_feature_frame(session)
+        if df.empty:
+            return df
+        version = write_snapshot(df)
+        return read_snapshot(version)
+
+
+async def snapshot_frame(session: AsyncSession) -> pd.DataFrame:
+    """The latest snapshot, rebuilt first when older than GEOAI_SNAPSHOT_MAX_AGE_SECONDS."""
+    latest = latest_snapshot(max_age=settings.GEOAI_SNAPSHOT_MAX_AGE_SECONDS)
+    if latest is not None:
+        return latest[1]
+    return await refresh_snapshot(session, max_age=settings.GEOAI_SNAPSHOT_MAX_AGE_SECONDS)
@@ -1,17 +1,22 @@
 import os
 import time
 import json
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
-from lightgbm import LGBMRegressor, LGBMClassifier
+import lightgbm as lgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import root_mean_squared_error, accuracy_score, classification_report
 from sklearn.preprocessing import MinMaxScaler
 import joblib
-from .features import build_training_dataframe
+from config.config import settings
+from .booster_model import BoosterModel
+from .encoder import CategoricalEncoder
+from .snapshot import snapshot_frame
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict
+from typing import Dict, Optional
 
 MODELS_DIR = os.path.join(os.path.dirname(__file__), '../../../models')
 LATEST_PATH = os.path.join(MODELS_DIR, 'latest.json')
@@ -101,20 +106,81 @@ def _composite_investment_target(df: pd.DataFrame) -> pd.Series:
     return (score >= threshold).astype(int)
 
 
-async def train_all_models(session: AsyncSession) -> Dict[str, str]:
-    df = await build_training_dataframe(session)
+# Parameters LightGBM fixes when a Dataset is binned; training must repeat them
+DATASET_PARAMS = dict(max_bin=255, min_data_in_leaf=1, feature_pre_filter=False, verbose=-1)
+TRAIN_PARAMS = dict(DATASET_PARAMS, learning_rate=0.05, seed=42)
+MAX_ROUNDS = 300
+
+
+def _train_parallel(X_train: pd.DataFrame, X_valid: Optional[pd.DataFrame], splits, cat_cols) -> Dict[str, tuple]:
+    """
+    Bin the training matrix once, then train every target in its own thread
+    with an equal share of the cores. `splits` maps name -> (y_train, y_valid,
+    binary); X_valid drives early stopping and is None to train MAX_ROUNDS.
+    Returns name -> (BoosterModel, seconds).
+    """
+    # Bin boundaries are computed here once; the per-target Datasets reuse them
+    base = lgb.Dataset(X_train, categorical_feature=cat_cols, params=DATASET_PARAMS,
+                       free_raw_data=False).construct()
+    datasets = {}
+    for name, (y_tr, y_va, _) in splits.items():
+        train_set = lgb.Dataset(X_train, label=y_tr, reference=base,
+                                categorical_feature=cat_cols, params=DATASET_PARAMS).construct()
+        valid_set = None
+        if X_valid is not None:
+            valid_set = lgb.Dataset(X_valid, label=y_va, reference=train_set,
+                                    categorical_feature=cat_cols, params=DATASET_PARAMS).construct()
+        datasets[name] = (train_set, valid_set)
+
+    total_threads = settings.GEOAI_TRAINING_THREADS or os.cpu_count() or 1
+    threads = max(1, total_threads // len(splits))
+
+    def fit(name):
+        binary = splits[name][2]
+        train_set, valid_set = datasets[name]
+        params = dict(TRAIN_PARAMS, objective='binary' if binary else 'regression', num_threads=threads)
+        if valid_set is None:
+            valid_sets, callbacks = [], []
+        else:
+            valid_sets = [valid_set]
+            callbacks = [lgb.early_stopping(settings.GEOAI_EARLY_STOPPING_ROUNDS, verbose=False)]
+        t0 = time.perf_counter()
+        booster = lgb.train(params, train_set, num_boost_round=MAX_ROUNDS,
+                            valid_sets=valid_sets, callbacks=callbacks)
+        return BoosterModel(booster, binary=binary), round(time.perf_counter() - t0, 3)
+
+    # LightGBM releases the GIL while boosting, so threads run in parallel
+    with ThreadPoolExecutor(max_workers=len(splits)) as pool:
+        futures = {name: pool.submit(fit, name) for name in splits}
+        return {name: future.result() for name, future in futures.items()}
+
+
+async def train_all_models(session: AsyncSession, metrics: Optional[Dict[str, float]] = None) -> Dict[str, str]:
+    """
+    Train all models and point latest.json at them. Returns model name ->
+    payload file; when `metrics` is given it is filled with the test scores.
+    """
+    metrics = {} if metrics is None else metrics
+    # Train on the latest snapshot, rebuilt from SQL only when it is missing or
+    # older than GEOAI_SNAPSHOT_MAX_AGE_SECONDS; workers seed their feature stores from it
+    df = await snapshot_frame(session)
     if df.empty:
         raise ValueError('No training data found')
 
     logger.info(f'Training on {len(df)} records with columns: {df.columns.tolist()}')
 
     # ── Feature matrix ────────────────────────────────────────────────────────
+    # Numeric columns as-is plus integer-coded categoricals from a fitted
+    # vocabulary (LightGBM native categoricals), persisted with each model
     BASE_DROP = ['upi', 'id', 'district', 'sector', 'price', 'property_age',
-                 'risk_score', 'development_score']
-    X_base = (df.drop(BASE_DROP, axis=1, errors='ignore')
-                .select_dtypes(include=['number', 'bool', 'uint8'])
-                .fillna(0))
-    feature_cols = X_base.columns.tolist()
+                 'risk_score', 'development_score', 'updated_at']
+    numeric_cols = (df.drop(BASE_DROP, axis=1, errors='ignore')
+                      .select_dtypes(include=['number', 'bool'])
+                      .columns.tolist())
+    encoder = CategoricalEncoder.fit(df, numeric_cols)
+    X_base = encoder.transform_frame(df)
+    feature_cols = encoder.feature_names
+    cat_cols = encoder.categorical
     logger.info(f'Feature columns ({len(feature_cols)}): {feature_cols}')
 
     # ── Targets ───────────────────────────────────────────────────────────────
@@ -140,70 +206,61 @@ async def train_all_models(session: AsyncSession) -> Dict[str, str]:
                 f'risk classes: {y_risk.value_counts().to_dict()}, '
                 f'investment classes: {y_investment.value_counts().to_dict()}')
 
-    # ── Train / test split (handle tiny datasets) ─────────────────────────────
+    # ── Train / validation / test split (handle tiny datasets) ────────────────
+    # Early stopping watches a validation split carved out of the training
+    # rows; the test rows are only used for the reported metrics
     n = len(X_base)
-    test_size = 0.2 if n >= 10 else 0.0   # no split if < 10 records
-    split_kw = dict(test_size=test_size, random_state=42) if test_size > 0 \
-               else dict(test_size=1, random_state=42)    # dummy — ignored below
-
-    if test_size > 0:
-        X_train, X_test, yv_tr, yv_te = train_test_split(X_base, y_value, **split_kw)
-        _, _, yi_tr, yi_te = train_test_split(X_base, y_investment, **split_kw)
-        _, _, yr_tr, yr_te = train_test_split(X_base, y_risk, **split_kw)
-        _, _, yg_tr, yg_te = train_test_split(X_base, y_growth, **split_kw)
+    valid_idx = None
+    if n >= 10:
+        train_idx, test_idx = train_test_split(np.arange(n), test_size=0.2, random_state=42)
+        train_idx, valid_idx = train_test_split(train_idx, test_size=0.2, random_state=42)
     else:
-        X_train = X_test = X_base
-        yv_tr = yv_te = y_value
-        yi_tr = yi_te = y_investment
-        yr_tr = yr_te = y_risk
-        yg_tr = yg_te = y_growth
+        # no split if < 10 records (and no early stopping: there is nothing to validate on)
+        train_idx = test_idx = np.arange(n)
+    X_train, X_test = X_base.iloc[train_idx], X_base.iloc[test_idx]
+    X_valid = X_base.iloc[valid_idx] if valid_idx is not None else None
+    targets = {
+        'valuation': (y_value, False),
+        'investment': (y_investment, True),
+        'risk': (y_risk, True),
+        'growth': (y_growth, False),
+    }
+    splits = {
+        name: (y.iloc[train_idx], y.iloc[valid_idx] if valid_idx is not None else None, binary)
+        for name, (y, binary) in targets.items()
+    }
 
     timestamp = int(time.time())
     models = {}
-
-    lgbm_params = dict(n_estimators=300, learning_rate=0.05,
-                       min_child_samples=1, n_jobs=-1, random_state=42,
-                       verbose=-1)
-
-    # ── Valuation ─────────────────────────────────────────────────────────────
-    val_model = LGBMRegressor(**lgbm_params)
-    val_model.fit(X_train, yv_tr)
-    logger.info(f'Valuation RMSE: {root_mean_squared_error(yv_te, val_model.predict(X_test)):.4f}')
-    val_path = f'valuation_model_v{timestamp}.pkl'
-    joblib.dump({'model': val_model, 'features': feature_cols},
-                os.path.join(MODELS_DIR, val_path))
-    models['valuation'] = val_path
-
-    # ── Investment ────────────────────────────────────────────────────────────
-    inv_model = LGBMClassifier(**lgbm_params)
-    inv_model.fit(X_train, yi_tr)
-    logger.info(f'Investment Accuracy: {accuracy_score(yi_te, inv_model.predict(X_test)):.4f}')
-    logger.info(classification_report(yi_te, inv_model.predict(X_test), zero_division=0))
-    inv_path = f'investment_model_v{timestamp}.pkl'
-    joblib.dump({'model': inv_model, 'features': feature_cols},
-                os.path.join(MODELS_DIR, inv_path))
-    models['investment'] = inv_path
-
-    # ── Risk ──────────────────────────────────────────────────────────────────
-    risk_model = LGBMClassifier(**lgbm_params)
-    risk_model.fit(X_train, yr_tr)
-    logger.info(f'Risk Accuracy: {accuracy_score(yr_te, risk_model.predict(X_test)):.4f}')
-    logger.info(classification_report(yr_te, risk_model.predict(X_test), zero_division=0))
-    risk_path = f'risk_model_v{timestamp}.pkl'
-    joblib.dump({'model': risk_model, 'features': feature_cols},
-                os.path.join(MODELS_DIR, risk_path))
-    models['risk'] = risk_path
-
-    # ── Growth ────────────────────────────────────────────────────────────────
-    growth_model = LGBMRegressor(**lgbm_params)
-    growth_model.fit(X_train, yg_tr)
-    logger.info(f'Growth RMSE: {root_mean_squared_error(yg_te, growth_model.predict(X_test)):.4f}')
-    growth_path = f'growth_model_v{timestamp}.pkl'
-    joblib.dump({'model': growth_model, 'features': feature_cols},
-                os.path.join(MODELS_DIR, growth_path))
-    models['growth'] = growth_path
-
-    # Save latest.json
-    with open(LATEST_PATH, 'w') as f:
+    metrics['records'] = len(df)
+
+    # ── Train all targets concurrently on shared binning ──────────────────────
+    started = time.perf_counter()
+    trained = await asyncio.to_thread(_train_parallel, X_train, X_valid, splits, cat_cols)
+    metrics['train_wall_seconds'] = round(time.perf_counter() - started, 3)
+
+    for name, (model, seconds) in trained.items():
+        y_te, binary = targets[name][0].iloc[test_idx], targets[name][1]
+        metrics[f'{name}_seconds'] = seconds
+        metrics[f'{name}_best_iteration'] = int(model.best_iteration)
+        if binary:
+            metrics[f'{name}_accuracy'] = float(accuracy_score(y_te, model.predict(X_test)))
+            logger.info(f'{name.capitalize()} Accuracy: {metrics[f"{name}_accuracy"]:.4f} '
+                        f'({seconds:.2f}s, {model.best_iteration} trees)')
+            logger.info(classification_report(y_te, model.predict(X_test), zero_division=0))
+        else:
+            metrics[f'{name}_rmse'] = float(root_mean_squared_error(y_te, model.predict(X_test)))
+            logger.info(f'{name.capitalize()} RMSE: {metrics[f"{name}_rmse"]:.4f} '
+                        f'({seconds:.2f}s, {model.best_iteration} trees)')
+        path = f'{name}_model_v{timestamp}.pkl'
+        joblib.dump({'model': model, 'features': feature_cols, 'encoder': encoder.to_dict()},
+                    os.path.join(MODELS_DIR, path))
+        models[name] = path
+    logger.info(f'Trained {len(trained)} models in {metrics["train_wall_seconds"]:.2f}s wall-clock')
+
+    # Save latest.json atomically: API workers watch it and hot-swap on change
+    tmp_path = LATEST_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(models, f)
+    os.replace(tmp_path, LATEST_PATH)
     return models
@@ -0,0 +1,62 @@
+"""
+Geo-referencing for parcel shapes detected on e-title map images.
+
+The title map is treated as a fixed-scale grid anchored in UTM 36S
+(EPSG:32736). Pixel coordinates go through one NumPy affine step and a
+single batched `Transformer.transform` call, instead of a per-vertex
+Python loop.
+
+`pyproj.Transformer` objects are expensive to build and not safe to share
+across threads, so `get_transformer` keeps one per (source, target) CRS
+pair per thread.
+"""
+
+import threading
+from typing import Sequence
+
+import numpy as np
+from pyproj import Transformer
+from shapely.geometry import Polygon
+
+TITLE_MAP_CRS = "epsg:32736"
+WGS84_CRS = "epsg:4326"
+TITLE_MAP_ANCHOR_UTM = (510071.0, 4778635.0)
+TITLE_MAP_METRES_PER_PIXEL = 0.5
+
+_local = threading.local()
+
+
+def get_transformer(src_crs: str, dst_crs: str) -> Transformer:
+    """Cached always_xy transformer for this thread and CRS pair."""
+    cache = getattr(_local, "transformers", None)
+    if cache is None:
+        cache = _local.transformers = {}
+    key = (src_crs.lower(), dst_crs.lower())
+    transformer = cache.get(key)
+    if transformer is None:
+        transformer = Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+        cache[key] = transformer
+    return transformer
+
+
+def pixels_to_lonlat(
+    points,
+    offset: Sequence[float] = (0.0, 0.0),
+    anchor: Sequence[float] = TITLE_MAP_ANCHOR_UTM,
+    metres_per_pixel: float = TITLE_MAP_METRES_PER_PIXEL,
+    src_crs: str = TITLE_MAP_CRS,
+) -> np.ndarray:
+    """
+    Map pixel coordinates (N x 2, or an OpenCV contour of shape N x 1 x 2)
+    to an N x 2 array of (lon, lat). `offset` is added to every pixel first,
+    e.g. to move crop-local coordinates back into the ROI frame.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    x = anchor[0] + (pts[:, 0] + offset[0]) * metres_per_pixel
+    y = anchor[1] - (pts[:, 1] + offset[1]) * metres_per_pixel
+    lon, lat = get_transformer(src_crs, WGS84_CRS).transform(x, y)
+    return np.column_stack((lon, lat))
+
+
+def contour_to_polygon(contour, offset: Sequence[float] = (0.0, 0.0)) -> Polygon:
+    return Polygon(pixels_to_lonlat(contour, offset=offset))
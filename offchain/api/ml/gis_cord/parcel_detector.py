@@ -0,0 +1,361 @@
+"""
+Parcel shape detection on e-title map images.
+
+The parcel map sits in the bottom-right quadrant of the title page. At
+300 dpi that quadrant alone is ~6 MP, and the legacy detectors threshold
+and trace contours over all of it.
+
+The multiscale detector works coarse-to-fine:
+1. the quadrant is downsampled to at most COARSE_MAX_SIDE px and the map
+   frame and the parcel candidate are chosen there;
+2. only a padded box around that candidate is thresholded again at full
+   resolution (capped at REFINE_MAX_PIXELS) to recover precise vertices.
+
+Both stages have a fixed pixel budget, so latency no longer grows with the
+scan resolution. Pixel coordinates stay relative to the quadrant, exactly
+as before, so geo-referencing (api.ml.gis_cord.georef) is unchanged.
+
+`detect_parcel_polygon` picks the detector per purpose from
+settings.PARCEL_DETECTOR_EXTRACT / PARCEL_DETECTOR_VERIFY ("multiscale" |
+"legacy") and falls back to the legacy detector when the multiscale one
+finds nothing. The multiscale search is the verify-style algorithm, so
+extract keeps the legacy detector by default: switching it changes the
+stored document_detected_polygon of every upload, which needs IoU parity on
+scripts/bench_parcel_detector.py first.
+"""
+
+import logging
+from typing import Optional, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+from shapely.geometry import Polygon
+
+from config.config import settings
+from api.ml.gis_cord.georef import contour_to_polygon, pixels_to_lonlat
+
+logger = logging.getLogger(__name__)
+
+COARSE_MAX_SIDE = 1000
+REFINE_MAX_PIXELS = 1_500_000
+REFINE_PADDING = 0.08
+
+ImageLike = Union[np.ndarray, Image.Image]
+
+
+def _to_gray(image: ImageLike) -> np.ndarray:
+    img = np.asarray(image)
+    if img.ndim == 2:
+        return img
+    return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+
+def _map_quadrant(gray: np.ndarray) -> np.ndarray:
+    h, w = gray.shape
+    return gray[int(h * 0.5):, int(w * 0.5):]
+
+
+def _odd(value: float, minimum: int = 3) -> int:
+    value = max(minimum, int(round(value)))
+    return value if value % 2 else value + 1
+
+
+def _find_map_frame(roi: np.ndarray, blur_ksize: int = 5) -> tuple[int, int, int, int]:
+    """Bounding box (x, y, w, h) of the map frame; the whole ROI if none is found."""
+    blurred = cv2.GaussianBlur(roi, (blur_ksize, blur_ksize), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=1)
+    frame_contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    roi_h, roi_w = roi.shape
+    roi_area = float(max(roi_h * roi_w, 1))
+
+    frame = (0, 0, roi_w, roi_h)
+    best_frame_score = -1.0
+
+    for cnt in frame_contours:
+        area = cv2.contourArea(cnt)
+        if area < roi_area * 0.06:
+            continue
+
+        peri = cv2.arcLength(cnt, True)
+        if peri <= 0:
+            continue
+
+        approx = cv2.approxPolyDP(cnt, 0.02 * peri, True)
+        x, y, w_box, h_box = cv2.boundingRect(cnt)
+        if w_box <= 0 or h_box <= 0:
+            continue
+
+        box_area = float(w_box * h_box)
+        extent = area / box_area
+        aspect = w_box / float(h_box)
+
+        # Prefer quadrilateral-like, sizable, document-map-like rectangles
+        quad_bonus = 1.2 if len(approx) in (4, 5) else 1.0
+        aspect_penalty = 1.0 - min(abs(aspect - 1.1), 1.1) * 0.35
+        score = area * extent * quad_bonus * max(0.2, aspect_penalty)
+
+        if score > best_frame_score:
+            best_frame_score = score
+            frame = (x, y, w_box, h_box)
+
+    return frame
+
+
+def _inset_frame(frame: tuple[int, int, int, int], roi_shape: tuple[int, int]) -> tuple[int, int, int, int]:
+    """Crop slightly inside the frame so its border is not taken as the parcel."""
+    frame_x, frame_y, frame_w, frame_h = frame
+    roi_h, roi_w = roi_shape
+    inset_x = max(3, int(frame_w * 0.015))
+    inset_y = max(3, int(frame_h * 0.015))
+    x0 = min(max(frame_x + inset_x, 0), roi_w - 1)
+    y0 = min(max(frame_y + inset_y, 0), roi_h - 1)
+    x1 = min(max(frame_x + frame_w - inset_x, x0 + 1), roi_w)
+    y1 = min(max(frame_y + frame_h - inset_y, y0 + 1), roi_h)
+    return x0, y0, x1, y1
+
+
+def _parcel_contours(map_roi: np.ndarray, block_size: int = 11, blur_ksize: int = 5):
+    map_blurred = cv2.GaussianBlur(map_roi, (blur_ksize, blur_ksize), 0)
+    thresh = cv2.adaptiveThreshold(
+        map_blurred,
+        255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY_INV,
+        block_size,
+        2,
+    )
+    kernel = np.ones((3, 3), np.uint8)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=1)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+
+def _pick_parcel_contour(contours, map_shape: tuple[int, int], min_area: float = 140.0):
+    """Largest solid, central, non-border contour; the largest contour if none qualifies."""
+    map_h, map_w = map_shape
+    map_area = float(max(map_h * map_w, 1))
+    center_x, center_y = map_w / 2.0, map_h / 2.0
+
+    def touches_border(cnt):
+        x, y, cw, ch = cv2.boundingRect(cnt)
+        return x <= 2 or y <= 2 or (x + cw) >= (map_w - 2) or (y + ch) >= (map_h - 2)
+
+    best_contour = None
+    best_score = -1.0
+
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < max(min_area, map_area * 0.001):
+            continue
+        if area > map_area * 0.85:
+            continue
+
+        perimeter = cv2.arcLength(contour, True)
+        if perimeter <= 0:
+            continue
+
+        moments = cv2.moments(contour)
+        if moments["m00"] <= 0:
+            continue
+
+        cx = moments["m10"] / moments["m00"]
+        cy = moments["m01"] / moments["m00"]
+        dist_norm = np.hypot(cx - center_x, cy - center_y) / np.hypot(center_x, center_y)
+
+        hull = cv2.convexHull(contour)
+        hull_area = cv2.contourArea(hull)
+        solidity = area / hull_area if hull_area > 0 else 0
+
+        border_penalty = 0.35 if touches_border(contour) else 0.0
+        score = area * (0.7 + 0.3 * solidity) * max(0.1, 1.0 - 0.45 * dist_norm) * (1.0 - border_penalty)
+
+        if score > best_score:
+            best_score = score
+            best_contour = contour
+
+    if best_contour is None:
+        best_contour = max(contours, key=cv2.contourArea)
+    return best_contour
+
+
+def _simplify(contour):
+    epsilon = 0.0025 * cv2.arcLength(contour, True)
+    approx = cv2.approxPolyDP(contour, epsilon, True)
+    return approx if len(approx) >= 5 else contour
+
+
+def _to_wkt(parcel_contour, offset=(0, 0)) -> Optional[str]:
+    gps_coords = pixels_to_lonlat(parcel_contour, offset=offset)
+    if len(gps_coords) < 4:
+        return None
+    try:
+        polygon = Polygon(gps_coords)
+        if polygon.is_empty:
+            return None
+        if not polygon.is_valid:
+            polygon = polygon.buffer(0)
+        return polygon.wkt if not polygon.is_empty else None
+    except Exception:
+        return None
+
+
+def _box_iou(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Legacy detectors (full-resolution quadrant)
+# ---------------------------------------------------------------------------
+
+def legacy_extract_polygon(image: ImageLike) -> Optional[str]:
+    """Largest external contour of the quadrant, simplified at 1% of its perimeter."""
+    roi = _map_quadrant(_to_gray(image))
+    blurred = cv2.GaussianBlur(roi, (5, 5), 0)
+    thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    parcel_contour = max(contours, key=cv2.contourArea)
+    epsilon = 0.01 * cv2.arcLength(parcel_contour, True)
+    approx = cv2.approxPolyDP(parcel_contour, epsilon, True)
+    return str(contour_to_polygon(approx))
+
+
+def legacy_verify_polygon(image: ImageLike) -> Optional[str]:
+    """Map frame first, then the best-scoring parcel contour inside it."""
+    roi = _map_quadrant(_to_gray(image))
+    x0, y0, x1, y1 = _inset_frame(_find_map_frame(roi), roi.shape)
+
+    map_roi = roi[y0:y1, x0:x1]
+    if map_roi.size == 0:
+        map_roi = roi
+        x0, y0 = 0, 0
+
+    contours = _parcel_contours(map_roi)
+    if not contours:
+        return None
+
+    best_contour = _pick_parcel_contour(contours, map_roi.shape)
+    # Map-ROI pixels are shifted back into quadrant coordinates
+    return _to_wkt(_simplify(best_contour), offset=(x0, y0))
+
+
+# ---------------------------------------------------------------------------
+# Multiscale detector
+# ---------------------------------------------------------------------------
+
+def multiscale_polygon(image: ImageLike) -> Optional[str]:
+    roi = _map_quadrant(_to_gray(image))
+    roi_h, roi_w = roi.shape
+    if roi_h == 0 or roi_w == 0:
+        return None
+
+    # 1) Coarse pass: frame and parcel candidate on a bounded-size copy
+    scale = min(1.0, COARSE_MAX_SIDE / float(max(roi_h, roi_w)))
+    if scale < 1.0:
+        coarse = cv2.resize(roi, (max(1, int(roi_w * scale)), max(1, int(roi_h * scale))), interpolation=cv2.INTER_AREA)
+    else:
+        coarse = roi
+    coarse_h, coarse_w = coarse.shape
+
+    cx0, cy0, cx1, cy1 = _inset_frame(_find_map_frame(coarse, blur_ksize=3), coarse.shape)
+    coarse_map = coarse[cy0:cy1, cx0:cx1]
+    if coarse_map.size == 0:
+        coarse_map = coarse
+        cx0, cy0 = 0, 0
+
+    coarse_contours = _parcel_contours(coarse_map, block_size=_odd(11 * scale), blur_ksize=3)
+    if not coarse_contours:
+        return None
+    coarse_best = _pick_parcel_contour(coarse_contours, coarse_map.shape, min_area=140.0 * scale * scale)
+
+    # Candidate and frame boxes in full-resolution quadrant coordinates
+    bx, by, bw, bh = cv2.boundingRect(coarse_best)
+    candidate = (
+        int((bx + cx0) / scale),
+        int((by + cy0) / scale),
+        max(1, int(bw / scale)),
+        max(1, int(bh / scale)),
+    )
+    fx0, fy0 = int(cx0 / scale), int(cy0 / scale)
+    fx1, fy1 = min(roi_w, int(cx1 / scale)), min(roi_h, int(cy1 / scale))
+
+    # 2) Fine pass: threshold only a padded box around the candidate
+    pad_x = max(6, int(candidate[2] * REFINE_PADDING))
+    pad_y = max(6, int(candidate[3] * REFINE_PADDING))
+    rx0 = max(fx0, candidate[0] - pad_x)
+    ry0 = max(fy0, candidate[1] - pad_y)
+    rx1 = min(fx1, candidate[0] + candidate[2] + pad_x)
+    ry1 = min(fy1, candidate[1] + candidate[3] + pad_y)
+    region = roi[ry0:ry1, rx0:rx1]
+
+    coarse_fallback = (coarse_best.astype(np.float64) / scale).astype(np.int32)
+    coarse_offset = (cx0 / scale, cy0 / scale)
+    if region.size == 0:
+        return _to_wkt(_simplify(coarse_fallback), offset=coarse_offset)
+
+    fine_scale = min(1.0, (REFINE_MAX_PIXELS / float(region.size)) ** 0.5)
+    if fine_scale < 1.0:
+        region = cv2.resize(
+            region,
+            (max(1, int(region.shape[1] * fine_scale)), max(1, int(region.shape[0] * fine_scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    fine_contours = _parcel_contours(region, block_size=_odd(11 * fine_scale))
+    target = (
+        (candidate[0] - rx0) * fine_scale,
+        (candidate[1] - ry0) * fine_scale,
+        candidate[2] * fine_scale,
+        candidate[3] * fine_scale,
+    )
+    best_fine, best_iou = None, 0.0
+    for contour in fine_contours:
+        iou = _box_iou(cv2.boundingRect(contour), target)
+        if iou > best_iou:
+            best_fine, best_iou = contour, iou
+
+    if best_fine is None or best_iou < 0.5:
+        return _to_wkt(_simplify(coarse_fallback), offset=coarse_offset)
+
+    refined = _simplify(best_fine).astype(np.float64) / fine_scale
+    return _to_wkt(refined, offset=(rx0, ry0))
+
+
+_LEGACY = {
+    "extract": legacy_extract_polygon,
+    "verify": legacy_verify_polygon,
+}
+
+_DETECTOR_SETTINGS = {
+    "extract": ("PARCEL_DETECTOR_EXTRACT", "legacy"),
+    "verify": ("PARCEL_DETECTOR_VERIFY", "multiscale"),
+}
+
+
+def _detector_for(purpose: str) -> str:
+    name, default = _DETECTOR_SETTINGS[purpose]
+    return (getattr(settings, name, None) or default).strip().lower()
+
+
+def detect_parcel_polygon(image: ImageLike, purpose: str = "extract") -> Optional[str]:
+    """WKT (EPSG:4326) of the parcel drawn on a title page, or None."""
+    legacy = _LEGACY[purpose]
+    if _detector_for(purpose) == "legacy":
+        return legacy(image)
+    try:
+        detected = multiscale_polygon(image)
+    except Exception as e:
+        logger.warning(f"Multiscale parcel detection failed, using legacy detector: {e}")
+        detected = None
+    return detected if detected is not None else legacy(image)
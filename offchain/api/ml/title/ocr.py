@@ -0,0 +1,194 @@
+"""
+OCR engine for e-title documents.
+
+`pytesseract.image_to_string` forks a `tesseract` process, reloads the
+language data and round-trips the image through temp files on every call.
+When the `tesserocr` binding is installed we keep one `PyTessBaseAPI` alive
+per worker thread and reuse it for every page; pytesseract remains the
+fallback backend (and is used when tesserocr is missing or fails).
+
+Usage:
+    from api.ml.title.ocr import get_ocr_engine
+    text = get_ocr_engine().read_text(gray)             # full page
+    upi_text = get_ocr_engine().read_text(gray, "upi")  # UPI-only profile
+    owners_text = get_ocr_engine().read_text(block, "owners")  # lessee table crop
+"""
+
+import logging
+import threading
+from typing import Optional, Union
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Page segmentation modes (same numbering as `tesseract --psm`)
+PSM_AUTO = 3
+PSM_SINGLE_BLOCK = 6
+PSM_SINGLE_LINE = 7
+PSM_SPARSE_TEXT = 11
+
+# Characters that can legitimately appear in the fields we parse
+UPI_WHITELIST = "0123456789/UPI: "
+OWNER_WHITELIST = (
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+    "0123456789_.,:;()%/- "
+)
+
+# field -> (page segmentation mode, character whitelist)
+FIELD_PROFILES = {
+    "page": (PSM_AUTO, None),
+    "upi": (PSM_SPARSE_TEXT, UPI_WHITELIST),
+    "owners": (PSM_SINGLE_BLOCK, OWNER_WHITELIST),
+}
+
+ImageLike = Union[np.ndarray, Image.Image]
+
+
+def _to_pil(image: ImageLike) -> Image.Image:
+    if isinstance(image, Image.Image):
+        return image
+    return Image.fromarray(image)
+
+
+class PytesseractBackend:
+    """Fallback backend: one `tesseract` subprocess per call."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str, tessdata_path: Optional[str] = None):
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+
+    def image_to_string(self, image: ImageLike, psm: int, whitelist: Optional[str]) -> str:
+        config = f"--psm {psm}"
+        if self.tessdata_path:
+            config += f' --tessdata-dir "{self.tessdata_path}"'
+        if whitelist:
+            config += f' -c tessedit_char_whitelist="{whitelist}"'
+        return pytesseract.image_to_string(image, lang=self.lang, config=config)
+
+    def close(self) -> None:
+        pass
+
+
+class TesserocrBackend:
+    """
+    In-process backend on the tesseract C-API.
+    A PyTessBaseAPI is not thread-safe, so each worker thread gets its own
+    long-lived instance; language data is loaded once per thread.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str, tessdata_path: Optional[str] = None):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self._local = threading.local()
+        self._apis = []
+        self._apis_lock = threading.Lock()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            kwargs = {"lang": self.lang}
+            if self.tessdata_path:
+                kwargs["path"] = self.tessdata_path
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            self._local.api = api
+            with self._apis_lock:
+                self._apis.append(api)
+        return api
+
+    def image_to_string(self, image: ImageLike, psm: int, whitelist: Optional[str]) -> str:
+        api = self._api()
+        api.SetPageSegMode(psm)
+        api.SetVariable("tessedit_char_whitelist", whitelist or "")
+        api.SetImage(_to_pil(image))
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def close(self) -> None:
+        with self._apis_lock:
+            for api in self._apis:
+                try:
+                    api.End()
+                except Exception:
+                    pass
+            self._apis = []
+        self._local = threading.local()
+
+
+class OcrEngine:
+    """Field-aware OCR front-end with automatic fallback to pytesseract."""
+
+    def __init__(self, backend, fallback: Optional[PytesseractBackend] = None):
+        self._backend = backend
+        self._fallback = fallback
+
+    @property
+    def backend_name(self) -> str:
+        return self._backend.name
+
+    def read_text(self, image: ImageLike, field: str = "page") -> str:
+        if field not in FIELD_PROFILES:
+            raise ValueError(f"Unknown OCR field profile: {field}")
+        psm, whitelist = FIELD_PROFILES[field]
+        try:
+            return self._backend.image_to_string(image, psm, whitelist)
+        except Exception as e:
+            if self._fallback is None:
+                raise
+            logger.warning(f"{self._backend.name} OCR failed, falling back to pytesseract: {e}")
+            return self._fallback.image_to_string(image, psm, whitelist)
+
+    def close(self) -> None:
+        self._backend.close()
+
+
+_engine: Optional[OcrEngine] = None
+_engine_lock = threading.Lock()
+
+
+def _build_engine() -> OcrEngine:
+    choice = (settings.OCR_BACKEND or "auto").strip().lower()
+    lang = settings.OCR_LANG or "eng+kin"
+    fallback = PytesseractBackend(lang, settings.TESSDATA_PATH)
+
+    if choice == "pytesseract":
+        return OcrEngine(fallback)
+
+    if tesserocr is None:
+        if choice == "tesserocr":
+            logger.warning("OCR_BACKEND=tesserocr but tesserocr is not installed; using pytesseract")
+        return OcrEngine(fallback)
+
+    try:
+        return OcrEngine(TesserocrBackend(lang, settings.TESSDATA_PATH), fallback=fallback)
+    except Exception as e:
+        logger.warning(f"Could not initialise tesserocr, using pytesseract: {e}")
+        return OcrEngine(fallback)
+
+
+def get_ocr_engine() -> OcrEngine:
+    """Process-wide OCR engine, created on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _build_engine()
+                logger.info(f"OCR engine initialised with backend '{_engine.backend_name}'")
+    return _engine
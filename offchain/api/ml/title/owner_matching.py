@@ -0,0 +1,184 @@
+"""
+Match owners read from a title document against NLA registry owners.
+
+The full OCR x registry similarity matrix is computed in one
+`rapidfuzz.process.cdist` call (multi-threaded) and pairs are chosen with
+an optimal assignment (`scipy.optimize.linear_sum_assignment`) instead of
+a greedy pairwise loop, so results no longer depend on owner order.
+
+Match rules (per pair):
+- identical, non-empty ID                         -> "exact_id_match", score 100
+- both 16-digit national IDs differing in <= 2
+  digits and name similarity > 85                 -> "fuzzy_match_high_confidence"
+- name similarity > 85                            -> "fuzzy_match_name"
+- otherwise                                       -> "no_match"
+
+The assignment first maximises the number of matched owners, then the
+total score.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Hamming
+from scipy.optimize import linear_sum_assignment
+
+NAME_MATCH_THRESHOLD = 85
+MAX_NATIONAL_ID_DIGIT_DIFF = 2
+
+MATCH_TYPES = ("no_match", "exact_id_match", "fuzzy_match_high_confidence", "fuzzy_match_name")
+
+# Any matchable pair outweighs every score difference (scores are <= 100)
+_MATCH_BONUS = 1000.0
+
+
+@lru_cache(maxsize=4096)
+def normalize_name(name: Optional[str]) -> str:
+    """Upper-case and collapse whitespace."""
+    if not name:
+        return ""
+    return " ".join(name.upper().split())
+
+
+def _registry_id_type(id_number: str) -> str:
+    if '_RW' in id_number:
+        return 'government'
+    if len(id_number) == 16 and id_number.isdigit():
+        return 'national_id'
+    if any(c.isalpha() for c in id_number):
+        return 'passport'
+    return 'unknown'
+
+
+def normalize_ocr_owners(ocr_owners: list[dict]) -> list[dict]:
+    return [
+        {
+            "name": normalize_name(o.get("name")),
+            "id_number": o.get("id_number") or "",
+            "id_type": o.get("id_type", "unknown"),
+            "percentage": o.get("percentage"),
+            "is_representative": o.get("is_representative", False),
+            "address": o.get("address"),
+        }
+        for o in ocr_owners
+    ]
+
+
+def registry_owners_from_details(details: dict) -> list[dict]:
+    """Owners (plus the parcel representative, if any) from NLA parcel details."""
+    owners = []
+    for owner in details.get("_owners") or details.get("owners") or []:
+        id_number = (owner.get("idNo") or owner.get("id_number") or "").strip()
+        owners.append({
+            "name": normalize_name(owner.get("fullName") or owner.get("name") or ""),
+            "id_number": id_number,
+            "id_type": _registry_id_type(id_number),
+            "percentage": owner.get("percentage") or owner.get("share"),
+            "address": owner.get("address"),
+        })
+
+    rep = details.get("_parcelRepresentative") or details.get("parcelRepresentative") or {}
+    if rep and rep.get("name"):
+        rep_id = rep.get("idNo") or rep.get("id_number") or ""
+        rep_type = _registry_id_type(rep_id)
+        owners.append({
+            "name": normalize_name(rep.get("name")),
+            "id_number": rep_id,
+            "id_type": rep_type if rep_type != 'unknown' else 'passport',
+            "percentage": None,
+            "address": rep.get("address"),
+            "is_representative": True,
+        })
+    return owners
+
+
+def _is_national_id(id_number: str) -> bool:
+    return len(id_number) == 16 and id_number.isdigit()
+
+
+def _match_matrices(ocr_owners: list[dict], registry_owners: list[dict]):
+    """Return (score, match type code) matrices; codes index MATCH_TYPES."""
+    ocr_names = [o["name"] for o in ocr_owners]
+    reg_names = [o["name"] for o in registry_owners]
+    ocr_ids = [o["id_number"] or "" for o in ocr_owners]
+    reg_ids = [o["id_number"] or "" for o in registry_owners]
+
+    name_scores = process.cdist(
+        ocr_names, reg_names, scorer=fuzz.ratio, dtype=np.float64, workers=-1
+    )
+
+    ocr_id_arr = np.array(ocr_ids, dtype=object)
+    reg_id_arr = np.array(reg_ids, dtype=object)
+    exact_id = (ocr_id_arr[:, None] == reg_id_arr[None, :]) & (ocr_id_arr != "")[:, None]
+
+    ocr_nid = np.array([_is_national_id(i) for i in ocr_ids])
+    reg_nid = np.array([_is_national_id(i) for i in reg_ids])
+    near_nid = np.zeros_like(exact_id)
+    if ocr_nid.any() and reg_nid.any():
+        # Hamming only over the 16-digit subsets, where lengths are equal
+        ocr_idx = np.flatnonzero(ocr_nid)
+        reg_idx = np.flatnonzero(reg_nid)
+        digit_diff = process.cdist(
+            [ocr_ids[i] for i in ocr_idx],
+            [reg_ids[j] for j in reg_idx],
+            scorer=Hamming.distance,
+            workers=-1,
+        )
+        near_nid[np.ix_(ocr_idx, reg_idx)] = digit_diff <= MAX_NATIONAL_ID_DIGIT_DIFF
+
+    name_ok = name_scores > NAME_MATCH_THRESHOLD
+    codes = np.select(
+        [exact_id, near_nid & name_ok, name_ok],
+        [1, 2, 3],
+        default=0,
+    )
+    scores = np.where(exact_id, 100.0, name_scores)
+    return scores, codes
+
+
+def match_owners(ocr_owners: list[dict], registry_owners: list[dict]) -> tuple[list[dict], list[dict], int]:
+    """
+    Pair normalised OCR owners with registry owners.
+
+    Returns (detailed_matches, extra_registry_owners, matched_count).
+    `detailed_matches` has one entry per OCR owner, in input order.
+    """
+    if not ocr_owners:
+        return [], list(registry_owners), 0
+    if not registry_owners:
+        return [
+            {"ocr_owner": o, "registry_owner": None, "match_score": 0, "match_type": "no_match", "matched": False}
+            for o in ocr_owners
+        ], [], 0
+
+    scores, codes = _match_matrices(ocr_owners, registry_owners)
+    matchable = codes > 0
+    weights = np.where(matchable, _MATCH_BONUS + scores, 0.0)
+    rows, cols = linear_sum_assignment(weights, maximize=True)
+
+    assigned = {int(r): int(c) for r, c in zip(rows, cols) if matchable[r, c]}
+    detailed_matches = []
+    for i, ocr_owner in enumerate(ocr_owners):
+        j = assigned.get(i)
+        if j is not None:
+            detailed_matches.append({
+                "ocr_owner": ocr_owner,
+                "registry_owner": registry_owners[j],
+                "match_score": float(scores[i, j]),
+                "match_type": MATCH_TYPES[codes[i, j]],
+                "matched": True,
+            })
+        else:
+            detailed_matches.append({
+                "ocr_owner": ocr_owner,
+                "registry_owner": None,
+                "match_score": float(scores[i].max()),
+                "match_type": "no_match",
+                "matched": False,
+            })
+
+    used = set(assigned.values())
+    extra_registry_owners = [o for j, o in enumerate(registry_owners) if j not in used]
+    return detailed_matches, extra_registry_owners, len(assigned)
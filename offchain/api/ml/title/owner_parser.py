@@ -0,0 +1,347 @@
+"""
+Owner extraction for e-title OCR text.
+
+Handles every e-title layout we have seen:
+- single and multiple owners, numbered "1.", "2.", ...
+- national IDs (16 digits), passports (e.g. AA6957678, 560437110) and
+  government IDs (e.g. 107433062_RW)
+- shares with or without a separator from the ID ("...420650.00")
+- representative "NAME (ID)" and address continuation lines
+- owner names wrapped onto the next line, completed from the representative
+  column when it repeats the same ID
+- HTML/XML fragments left over from the NLA renderer
+
+All patterns are compiled once at import. The text is cleaned in one
+`sub` pass and every line is classified once by `tokenize`; the
+extraction phases below only walk the resulting tokens.
+
+Usage:
+    from api.ml.title.owner_parser import extract_owners
+    owners = extract_owners(ocr_text)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# One alternation for all markup clean-up: entities are dropped, cells
+# become spaces and rows become newlines.
+_MARKUP_RE = re.compile(
+    r'(?P<entity>&#x?[A-Fa-f0-9]+;)'
+    r'|(?P<br><br\s*/?>)'
+    r'|(?P<cell></?td[^>]*>)'
+    r'|(?P<row></?tr[^>]*>)'
+)
+_MARKUP_REPLACEMENTS = {"entity": "", "br": " ", "cell": " ", "row": "\n"}
+
+_TABLE_HEADER_RE = re.compile(
+    r'Names of the lessee\s*\(s\).*?Number of identification document.*?'
+    r'Shares\s*\(%\).*?Names and address of the representative.*?\n',
+    re.DOTALL | re.IGNORECASE,
+)
+
+# ID alternatives are ordered so a 16-digit national ID wins over a longer
+# digit run that would otherwise swallow the leading digits of the share.
+# Passports can be as short as 6 characters but always carry a digit, so a
+# word of the owner's name is never taken for one.
+_PASSPORT = r'(?=[A-Z_]*\d)[A-Z0-9_]{6,20}'
+_ID_SPACED = r'(?P<id>\d{16}|\d+_[A-Z]{2,3}|' + _PASSPORT + r')'
+_ID_JOINED = r'(?P<id>\d{16}|\d+_[A-Z]{2,3}|\d[A-Z0-9_]{9,19})'
+# Shares never exceed 100; a share glued to the ID must carry decimals.
+_SHARE = r'(?P<pct>(?:100|\d{1,2})(?:\.\d+)?)'
+_SHARE_DECIMAL = r'(?P<pct>(?:100|\d{1,2})\.\d+)'
+_REST = r'(?:\s+(?P<rest>.*))?$'
+
+# "1. UWERA PEACE 1197870017174206 50.00 [rest]"
+_ROW_SPACED_RE = re.compile(
+    r'^(?P<num>\d+)\.\s+(?P<name>[A-Z\s]+?)\s+' + _ID_SPACED + r'\s+' + _SHARE + _REST
+)
+# "1. UWERA PEACE119787001717420650.00" / "1. GOVERNMENT OF RWANDA107433062_RW100.00"
+_ROW_JOINED_RE = re.compile(
+    r'^(?P<num>\d+)\.\s+(?P<name>[A-Z][A-Z\s]*?)\s*' + _ID_JOINED + _SHARE_DECIMAL + _REST
+)
+# "1. UWERA PEACE 1197870017174206" (share on another line or missing)
+_ROW_NO_SHARE_RE = re.compile(
+    r'^(?P<num>\d+)\.\s+(?P<name>[A-Z\s]+?)\s+' + _ID_SPACED + r'$'
+)
+_NUMBERED_RE = re.compile(r'^\d+\.')
+
+_REPRESENTATIVE_RE = re.compile(r'([A-Z\s]+)\s*\((' + _PASSPORT + r')\)')
+_BARE_NAME_RE = re.compile(r'^[A-Z][A-Z\s]*$')
+_NATIONAL_ID_RE = re.compile(r'\b(\d{16})\b')
+_UNDERSCORE_ID_RE = re.compile(r'\b([A-Z0-9]+_[A-Z0-9]+)\b')
+_UPPER_RUN_RE = re.compile(r'\b[A-Z\s]+\b')
+_LEADING_NUMBER_RE = re.compile(r'^\d+\.')
+_LEADING_DIGITS_RE = re.compile(r'(\d+\.?\d*)')
+_LESSEE_REPRESENTATIVE_RE = re.compile(r'Lessee representative\s*([A-Z\s]+)', re.IGNORECASE)
+
+_ADDRESS_HINTS = (',', 'City', 'Province')
+
+
+@dataclass
+class Token:
+    """One OCR line, classified once."""
+    raw: str
+    text: str
+    row: Optional[dict] = None
+
+    @property
+    def blank(self) -> bool:
+        return not self.text
+
+    @property
+    def numbered(self) -> bool:
+        return bool(_NUMBERED_RE.match(self.text))
+
+
+def classify_id(id_number: Optional[str]) -> str:
+    if not id_number:
+        return 'unknown'
+    if '_RW' in id_number:
+        return 'government'
+    if id_number.isdigit() and len(id_number) == 16:
+        return 'national_id'
+    return 'passport'
+
+
+def clean_text(text: str) -> str:
+    return _MARKUP_RE.sub(lambda m: _MARKUP_REPLACEMENTS[m.lastgroup], text or '')
+
+
+def _parse_row(line: str) -> Optional[dict]:
+    match = (
+        _ROW_SPACED_RE.match(line)
+        or _ROW_JOINED_RE.match(line)
+        or _ROW_NO_SHARE_RE.match(line)
+    )
+    if not match:
+        return None
+    groups = match.groupdict()
+    id_number = groups['id']
+    return {
+        'name': groups['name'].strip(),
+        'id_number': id_number,
+        'id_type': classify_id(id_number),
+        'percentage': groups.get('pct'),
+        'number': groups['num'],
+        'rest': (groups.get('rest') or '').strip(),
+    }
+
+
+def tokenize(text: str) -> list[Token]:
+    tokens = []
+    for raw in text.split('\n'):
+        line = raw.strip()
+        tokens.append(Token(raw=raw, text=line, row=_parse_row(line) if line else None))
+    return tokens
+
+
+def _parse_representative(text: str) -> tuple[Optional[dict], Optional[str]]:
+    """Return (representative, leftover address text) for a continuation fragment."""
+    match = _REPRESENTATIVE_RE.search(text)
+    if not match:
+        return None, None
+    rep_name, rep_id = match.groups()
+    representative = {
+        'name': rep_name.strip(),
+        'id_number': rep_id,
+        'id_type': classify_id(rep_id),
+    }
+    leftover = text.replace(match.group(0), '').strip()
+    return representative, leftover or None
+
+
+def _looks_like_address(text: str) -> bool:
+    return any(hint in text for hint in _ADDRESS_HINTS)
+
+
+def _owner_from_row(row: dict) -> dict:
+    owner = {key: row[key] for key in ('name', 'id_number', 'id_type', 'percentage', 'number')}
+    owner['representative'] = None
+    owner['address'] = None
+    if row['rest']:
+        representative, leftover = _parse_representative(row['rest'])
+        if representative:
+            owner['representative'] = representative
+            owner['address'] = leftover
+        elif _looks_like_address(row['rest']):
+            owner['address'] = row['rest']
+    return owner
+
+
+def _table_region(cleaned: str, tokens: list[Token]) -> Optional[list[Token]]:
+    """Tokens of the owners table: header line excluded, stops at a blank
+    line or at a line that starts with a capital letter (unless it is a
+    wrapped "NAME (ID)" representative fragment)."""
+    header = _TABLE_HEADER_RE.search(cleaned)
+    if not header:
+        return None
+    start = cleaned.count('\n', 0, header.end())
+    end = start + 1
+    while end < len(tokens) and tokens[end].text and (
+        not tokens[end].raw[:1].isupper() or _REPRESENTATIVE_RE.search(tokens[end].text)
+    ):
+        end += 1
+    return tokens[start:end]
+
+
+def _collect_rows(tokens: list[Token], lookahead: int, strict_address: bool) -> list[dict]:
+    """
+    Build owners from numbered rows. Up to `lookahead` following
+    non-numbered lines are read for the representative and address; with
+    `strict_address` a line is only taken as an address if it looks like
+    one, otherwise any continuation line is.
+    """
+    owners = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.row is None or (not strict_address and token.row['percentage'] is None):
+            i += 1
+            continue
+
+        owner = _owner_from_row(token.row)
+        j = i + 1
+        rest = token.row['rest']
+        # A bare name in the row is a representative whose "(ID)" wrapped below
+        if strict_address or not rest or _BARE_NAME_RE.match(rest):
+            while j < len(tokens) and j <= i + lookahead:
+                follower = tokens[j]
+                if follower.blank or follower.numbered:
+                    break
+                representative, leftover = _parse_representative(follower.text)
+                if representative:
+                    if rest and _BARE_NAME_RE.match(rest) and _words(rest).endswith(_words(representative['name'])):
+                        # Both columns wrapped: the row holds the full
+                        # representative name, this line only its tail
+                        representative['name'] = rest
+                    owner['representative'] = representative
+                    if leftover:
+                        owner['address'] = leftover
+                elif not strict_address or _looks_like_address(follower.text):
+                    owner['address'] = follower.text
+                j += 1
+        owners.append(owner)
+        i = j
+    return owners
+
+
+def _collect_loose_ids(tokens: list[Token], known_ids: set) -> list[dict]:
+    """Pick up IDs outside numbered rows (OCR often breaks the table)."""
+    owners = []
+    for token in tokens:
+        line = token.text
+        if not line:
+            continue
+
+        for id_match in _NATIONAL_ID_RE.finditer(line):
+            id_number = id_match.group(1)
+            if id_number in known_ids:
+                continue
+            name_parts = []
+            for part in line[:id_match.start()].split():
+                cleaned = _LEADING_NUMBER_RE.sub('', part).strip()
+                if cleaned and cleaned.isalpha() and (cleaned.isupper() or cleaned.istitle()):
+                    name_parts.append(cleaned)
+            if not name_parts:
+                continue
+            after_id = line[id_match.end():].strip()
+            share = _LEADING_DIGITS_RE.match(after_id) if after_id[:1].isdigit() else None
+            known_ids.add(id_number)
+            owners.append({
+                'name': ' '.join(name_parts),
+                'id_number': id_number,
+                'id_type': 'national_id',
+                'percentage': share.group(1) if share else None,
+                'raw_line': line,
+            })
+
+        for id_match in _UNDERSCORE_ID_RE.finditer(line):
+            id_number = id_match.group(1)
+            # A share glued to a row's ID ("107433062_RW100") is the same ID
+            if any(known in id_number for known in known_ids):
+                continue
+            name_parts = _UPPER_RUN_RE.findall(line[:id_match.start()].strip())
+            if not name_parts:
+                continue
+            known_ids.add(id_number)
+            owners.append({
+                'name': name_parts[-1].strip(),
+                'id_number': id_number,
+                'id_type': classify_id(id_number),
+                'percentage': '100.00',
+                'raw_line': line,
+            })
+    return owners
+
+
+def _words(text: str) -> str:
+    return ' '.join(text.split())
+
+
+def _complete_wrapped_names(owners: list[dict]) -> None:
+    """
+    An owner name wrapped onto the next line is cut short in its row. When a
+    representative entry carries the same ID and extends that name, use the
+    representative's full name.
+    """
+    full_names = {}
+    for owner in owners:
+        representative = owner.get('representative')
+        if representative and representative.get('id_number'):
+            full_names[representative['id_number']] = _words(representative['name'])
+    for owner in owners:
+        full = full_names.get(owner.get('id_number'))
+        name = _words(owner.get('name') or '')
+        if full and name and full.startswith(name + ' '):
+            owner['name'] = full
+
+
+def _dedupe_by_id(owners: list[dict]) -> list[dict]:
+    seen_ids = set()
+    unique = []
+    for owner in owners:
+        id_number = owner.get('id_number')
+        if not id_number:
+            unique.append(owner)
+        elif id_number not in seen_ids:
+            seen_ids.add(id_number)
+            unique.append(owner)
+    return unique
+
+
+def extract_owners(text: str) -> list[dict]:
+    """
+    Extract owners from e-title OCR text.
+
+    Each owner is a dict with name, id_number, id_type ('national_id' |
+    'passport' | 'government' | 'representative'), percentage and, where
+    found, number, representative, address, raw_line and is_representative.
+    """
+    cleaned = clean_text(text)
+    tokens = tokenize(cleaned)
+
+    owners = []
+    table = _table_region(cleaned, tokens)
+    if table:
+        owners = _collect_rows(table, lookahead=2, strict_address=True)
+    if not owners:
+        owners = _collect_rows(tokens, lookahead=1, strict_address=False)
+    _complete_wrapped_names(owners)
+
+    known_ids = {o['id_number'] for o in owners if o.get('id_number')}
+    owners.extend(_collect_loose_ids(tokens, known_ids))
+
+    rep_section = _LESSEE_REPRESENTATIVE_RE.search(cleaned)
+    if rep_section:
+        rep_name = rep_section.group(1).strip()
+        if not any(o.get('name') == rep_name for o in owners):
+            owners.append({
+                'name': rep_name,
+                'id_number': None,
+                'id_type': 'representative',
+                'percentage': None,
+                'is_representative': True,
+            })
+
+    return _dedupe_by_id(owners)
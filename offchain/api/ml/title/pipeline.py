@@ -0,0 +1,163 @@
+"""
+Title document scan pipeline: rasterise -> OCR -> UPI -> parcel shape.
+
+All CPU-bound work (pdf2image, OpenCV, tesseract) runs on a bounded thread
+pool so request handlers never block the event loop and batch uploads are
+processed in parallel. Pool threads are long-lived, which also keeps the
+per-thread tesserocr engines from api.ml.title.ocr warm.
+"""
+
+import asyncio
+import io
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+from pdf2image import convert_from_bytes
+from PIL import Image
+
+from config.config import settings
+from api.ml.title.ocr import get_ocr_engine
+from api.ml.title.owner_parser import extract_owners
+
+UPI_RE = re.compile(r'UPI:?\s*(\d+/\d+/\d+/\d+/\d+)')
+
+# Wider net used by /verify-pdf, tried in order
+UPI_LENIENT_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'UPI:?\s*([\d\s/]+)',
+    r'UPI\s*[:\-]?\s*([\d/]+)',
+    r'Unique Parcel Identifier:?\s*([\d/]+)',
+    r'Parcel\s*ID:?\s*([\d/]+)',
+    r'([\d]{1,2}/[\d]{1,2}/[\d]{1,2}/[\d]{1,3}/[\d]{3,5})',
+))
+_WHITESPACE_RE = re.compile(r'\s+')
+_UPI_CHARS_RE = re.compile(r'^[\d/]+$')
+
+# Vertical band (fraction of page height) holding the lessee table on NLA
+# e-titles: from just above the "INFORMATION ON THE LESSEE" heading to well
+# past the cadastral plan heading, leaving room for long owner lists
+OWNER_BLOCK_BAND = (0.38, 0.75)
+
+PDF_EXTENSIONS = ('.pdf',)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+IMAGE_CONTENT_TYPES = ('image/jpeg', 'image/png')
+
+
+class UnsupportedDocumentError(ValueError):
+    """Raised when an upload is neither a PDF nor a JPEG/PNG image."""
+
+
+@dataclass
+class TitleScan:
+    filename: str
+    upi: Optional[str]
+    ocr_text: str
+    detected_wkt: Optional[str]
+    page_image: Image.Image
+    gray: np.ndarray
+
+
+def is_supported_document(filename: str, content_type: Optional[str] = None) -> bool:
+    name = (filename or '').lower()
+    return (
+        content_type == 'application/pdf'
+        or content_type in IMAGE_CONTENT_TYPES
+        or name.endswith(PDF_EXTENSIONS + IMAGE_EXTENSIONS)
+    )
+
+
+def rasterize_document(file_bytes: bytes, filename: str, content_type: Optional[str] = None) -> Image.Image:
+    """Return the first page of a PDF (300 dpi) or the uploaded image as RGB."""
+    name = (filename or '').lower()
+    if content_type == 'application/pdf' or name.endswith(PDF_EXTENSIONS):
+        return convert_from_bytes(file_bytes, dpi=300, first_page=1, last_page=1)[0]
+    if content_type in IMAGE_CONTENT_TYPES or name.endswith(IMAGE_EXTENSIONS):
+        return Image.open(io.BytesIO(file_bytes)).convert('RGB')
+    raise UnsupportedDocumentError(
+        'Unsupported file type. Please upload a PDF or high-resolution JPEG/PNG image.'
+    )
+
+
+def extract_upi_from_text(ocr_text: str) -> Optional[str]:
+    match = UPI_RE.search(ocr_text or '')
+    return match.group(1) if match else None
+
+
+def find_upi(text: str) -> Optional[str]:
+    """Lenient UPI search: labelled forms first, then a bare d/d/d/d/d run."""
+    for pattern in UPI_LENIENT_PATTERNS:
+        match = pattern.search(text or '')
+        if match:
+            upi = _WHITESPACE_RE.sub('', match.group(1).strip()).strip('/')
+            if upi and _UPI_CHARS_RE.match(upi):
+                return upi
+    return None
+
+
+def read_owner_block(gray: np.ndarray, ocr_engine=None) -> str:
+    """OCR just the lessee table with the single-block, owner-whitelist profile."""
+    height = gray.shape[0]
+    top, bottom = OWNER_BLOCK_BAND
+    block = gray[int(height * top):int(height * bottom)]
+    return (ocr_engine or get_ocr_engine()).read_text(block, field="owners")
+
+
+def extract_title_owners(gray: np.ndarray, page_text: str, ocr_engine=None) -> list[dict]:
+    """
+    Owners from the lessee table read with the "owners" profile; falls back to
+    the full-page text when the block yields none (e.g. photos whose layout
+    does not line up with OWNER_BLOCK_BAND).
+    """
+    owners = extract_owners(read_owner_block(gray, ocr_engine))
+    return owners or extract_owners(page_text)
+
+
+def scan_title_document(
+    file_bytes: bytes,
+    filename: str,
+    content_type: Optional[str],
+    detect_polygon: Callable[[Image.Image], Optional[str]],
+) -> TitleScan:
+    """Synchronous scan of one title document. Run it through `run_in_ocr_pool`."""
+    page_image = rasterize_document(file_bytes, filename, content_type)
+    gray = cv2.cvtColor(np.array(page_image), cv2.COLOR_RGB2GRAY)
+    ocr_engine = get_ocr_engine()
+    ocr_text = ocr_engine.read_text(gray)
+    upi = extract_upi_from_text(ocr_text)
+    if not upi:
+        # Retry with the digits-only UPI profile before giving up
+        upi = extract_upi_from_text(ocr_engine.read_text(gray, field="upi"))
+    detected_wkt = detect_polygon(page_image)
+    return TitleScan(
+        filename=filename,
+        upi=upi,
+        ocr_text=ocr_text,
+        detected_wkt=detected_wkt,
+        page_image=page_image,
+        gray=gray,
+    )
+
+
+_ocr_pool: Optional[ThreadPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> ThreadPoolExecutor:
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = ThreadPoolExecutor(
+                    max_workers=max(1, settings.OCR_POOL_WORKERS),
+                    thread_name_prefix="ocr",
+                )
+    return _ocr_pool
+
+
+async def run_in_ocr_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_ocr_pool(), fn, *args)
@@ -5,29 +5,35 @@ External services routes (LIIP, LAIS, etc.)
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Union
+import asyncio
+import json
 import logging
 
 from config.config import settings
-import httpx
+from data.services.http_clients import HttpClientRegistry
+from data.services.lookup_cache import LookupCacheRegistry
+from data.services.title_data_cache import TitleDataCache, TitleDataUnavailable
+from data.services.title_data_refresher import TitleDataRefresher
+from data.services.title_pdf_cache import TitlePdfCache
 
 from api.middlewares.auth import verify_token, get_optional_user
 from fastapi import Request
 from data.models.models import Property, PropertySubCategory, PropertyCategory
-from data.database.database import get_db
+from data.database.database import AsyncSessionLocal, get_db
 from sqlalchemy.future import select
 from sqlalchemy import or_, and_
 from api.ml.search.search import parse_search_ollama_enhanced
-from data.models.mapping import UpiBackup
 from sqlalchemy.future import select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+TITLE_PDF_CHUNK_SIZE = 64 * 1024
+
 
 class NLPPropertySearchRequest(BaseModel):
     query: str = Field(..., description="User's natural language search query")
@@ -282,11 +288,14 @@ async def search_property_nlp(
 async def get_title_data(
     upi: str = None,
     language: str = "english",
+    refresh: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get all title data by UPI and language using PARCEL_INFORMATION_IP_ADDRESS_GIS.
-    Saves/updates backup in the local database. If the request fails, returns backup with flag='backup'.
+    Served from the local UpiBackup copy while fresh; a stale copy is served and
+    refreshed in the background. Unknown UPIs and refresh=true go to NLA. If NLA
+    fails, any backup is returned. The X-Cache header reports which path was taken.
     """
     if not upi:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="UPI is required")
@@ -298,45 +307,119 @@ async def get_title_data(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="PARCEL_INFORMATION_IP_ADDRESS_GIS not configured")
 
-    url = endpoint.rstrip("/") + f"?upi={upi}&language={language}"
-
     try:
-        # ...existing code...
-        async with httpx.AsyncClient(timeout=60) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-
-        # ...existing code...
-        stmt = pg_insert(UpiBackup).values(
-            upi=upi,
-            upi_info=data
-        ).on_conflict_do_update(
-            index_elements=["upi"],
-            set_={"upi_info": data}
+        result = await TitleDataCache.get(upi, language, db, refresh=refresh)
+    except TitleDataUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to fetch title data and no backup found: {e}"
         )
-        await db.execute(stmt)
-        await db.commit()
-
-        # ...existing code...
-        return Response(
-            content=resp.content,
-            status_code=resp.status_code,
-            media_type=resp.headers.get("content-type", "application/json")
+
+    headers = {"X-Cache": result.cache_status}
+    if result.payload is not None:
+        # Return backup upi_info as-is, no wrapping, no extra keys
+        return JSONResponse(status_code=200, content=result.payload, headers=headers)
+    return Response(
+        content=result.content,
+        status_code=result.status_code,
+        media_type=result.media_type,
+        headers=headers,
+    )
+
+
+class TitleDataBatchRequest(BaseModel):
+    upis: List[str] = Field(..., description="UPIs to look up")
+    language: str = Field(default="english")
+    refresh: bool = Field(default=False, description="Skip the cache and fetch every UPI from NLA")
+
+
+@router.post("/title_data/batch", response_model=None)
+async def get_title_data_batch(
+    request: TitleDataBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Title data for many UPIs, streamed as NDJSON in completion order.
+
+    Cached UPIs are answered first from a single upi_backup query; misses are
+    fetched from NLA with at most NLA_MAX_CONCURRENCY in flight. Each line is
+    {"upi", "source": cache|live|backup|error, "cache_status", "data", "error"}.
+    """
+    upis = list(dict.fromkeys(u.strip() for u in request.upis if u and u.strip()))
+    if not upis:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one UPI is required")
+    if len(upis) > settings.TITLE_DATA_BATCH_MAX_UPIS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.TITLE_DATA_BATCH_MAX_UPIS} UPIs per batch",
         )
+    if not getattr(settings, "PARCEL_INFORMATION_IP_ADDRESS_GIS", None):
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail="PARCEL_INFORMATION_IP_ADDRESS_GIS not configured")
+    language = request.language or "english"
+
+    # The request session is closed once streaming starts, so resolve cache
+    # hits now; each miss gets its own session below.
+    cached = {} if request.refresh else await TitleDataCache.get_cached_many(upis, language, db)
+    misses = [u for u in upis if u not in cached]
+
+    def _line(upi: str, result=None, error: str = None) -> bytes:
+        body = {
+            "upi": upi,
+            "source": result.source if result else "error",
+            "cache_status": result.cache_status if result else None,
+            "data": result.json() if result else None,
+            "error": error,
+        }
+        return (json.dumps(body, default=str) + "\n").encode("utf-8")
 
-    except Exception as e:
-        logger.warning(f"External API failed for UPI {upi}: {e}")
-        result = await db.execute(select(UpiBackup).where(UpiBackup.upi == upi))
-        backup_record = result.scalar_one_or_none()
-        if backup_record and backup_record.upi_info:
-            # Return backup upi_info as-is, no wrapping, no extra keys
-            return JSONResponse(status_code=200, content=backup_record.upi_info)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Failed to fetch title data and no backup found: {e}"
-            )
+    semaphore = asyncio.Semaphore(max(1, settings.NLA_MAX_CONCURRENCY))
+
+    async def _fetch(upi: str) -> bytes:
+        async with semaphore:
+            try:
+                async with AsyncSessionLocal() as session:
+                    result = await TitleDataCache.get(upi, language, session, refresh=request.refresh)
+                return _line(upi, result)
+            except TitleDataUnavailable as e:
+                return _line(upi, error=f"Failed to fetch title data and no backup found: {e}")
+            except Exception as e:
+                logger.error(f"Batch title data failed for UPI {upi}: {e}")
+                return _line(upi, error=str(e))
+
+    async def _stream():
+        for upi, result in cached.items():
+            yield _line(upi, result)
+        tasks = [asyncio.create_task(_fetch(upi)) for upi in misses]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: stop fetching the rest
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        _stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Cache-Hits": str(len(cached)), "X-Cache-Misses": str(len(misses))},
+    )
+
+
+@router.get("/title_data/cache/stats", response_model=None)
+async def get_title_data_cache_stats():
+    """Hit/miss counters for the title data cache since the process started."""
+    return TitleDataCache.stats()
+
+
+@router.get("/cache/stats", response_model=None)
+async def get_external_cache_stats():
+    """Hit/miss counters for every upstream cache since the process started."""
+    return {
+        "title_data": TitleDataCache.stats(),
+        "title_data_refresher": TitleDataRefresher.stats(),
+        "lookups": LookupCacheRegistry.stats(),
+    }
 
 # Request Models
 class ParcelRequest(BaseModel):
@@ -386,6 +469,16 @@ class TaxArrearsResponse(BaseModel):
     data: Optional[Dict[str, Any]] = None
 
 
+async def _cached_identity_lookup(cache_name: str, identifier: str, url: str):
+    """(CachedLookup, hit) for an identity-registry GET, via the hashed-key lookup cache."""
+    cache = LookupCacheRegistry.get(cache_name)
+    entry = await cache.get(identifier)
+    if entry is not None:
+        return entry, True
+    resp = await HttpClientRegistry.coalesced_get("identity", url)
+    return await cache.put(identifier, resp.status_code, resp.content, resp.headers.get("content-type", "application/json")), False
+
+
 @router.get("/citizen/{nid}", response_model=CitizenInfoResponse)
 async def get_citizen_information(
     nid: str,
@@ -404,9 +497,9 @@ async def get_citizen_information(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="CITIZEN_INFORMATION_ENDPOINT not configured")
     url = endpoint.rstrip("/") + f"/person/{nid}"
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url)
-        return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get("content-type", "application/json"))
+        entry, hit = await _cached_identity_lookup("citizen", nid, url)
+        return Response(content=entry.content, status_code=entry.status_code, media_type=entry.media_type,
+                        headers={"X-Cache": "HIT" if hit else "MISS"})
     except Exception as e:
         logger.error(f"Error fetching citizen info: {e}")
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to fetch citizen information: {e}")
@@ -427,9 +520,9 @@ async def get_phone_numbers_by_nid(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="PHONE_NUMBERS_BY_NID endpoint not configured")
     url = endpoint.rstrip("/") + f"/nid/{nid}/phonenumbers"
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url)
-        return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get("content-type", "application/json"))
+        entry, hit = await _cached_identity_lookup("phone_numbers", nid, url)
+        return Response(content=entry.content, status_code=entry.status_code, media_type=entry.media_type,
+                        headers={"X-Cache": "HIT" if hit else "MISS"})
     except Exception as e:
         logger.error(f"Error fetching phone numbers: {e}")
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to fetch phone numbers: {e}")
@@ -450,9 +543,9 @@ async def get_nid_by_phone_number(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="NID_BY_PHONE_NUMBER_ENDPOINT not configured")
     url = endpoint.rstrip("/") + f"/phoneuser/{phone}"
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url)
-        return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get("content-type", "application/json"))
+        entry, hit = await _cached_identity_lookup("phone_user", phone, url)
+        return Response(content=entry.content, status_code=entry.status_code, media_type=entry.media_type,
+                        headers={"X-Cache": "HIT" if hit else "MISS"})
     except Exception as e:
         logger.error(f"Error fetching NID by phone: {e}")
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to fetch NID: {e}")
@@ -477,8 +570,7 @@ async def get_parcel_information(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="PARCEL_INFORMATION_IP_ADDRESS not configured")
     url = endpoint.rstrip("/") + f"?upi={request.upi}"
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url)
+        resp = await HttpClientRegistry.coalesced_get("nla", url)
         content_type = resp.headers.get("content-type", "application/json")
         try:
             parcel_json = resp.json()
@@ -564,13 +656,13 @@ async def get_upis_by_owner_id(
     if not auth_url or not auth_user or not auth_pass or not upis_url:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="UPIs endpoints not configured")
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            auth_resp = await client.post(auth_url, json={"username": auth_user, "password": auth_pass})
-            auth_token = auth_resp.text.strip()
-            if not auth_token:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Failed to obtain authentication token")
-            upis_full_url = upis_url.rstrip("/") + f"/?idno={request.owner_id}&idtypeid={request.id_type}"
-            upis_resp = await client.get(upis_full_url, headers={"Authorization": f"Bearer {auth_token}"})
+        client = HttpClientRegistry.get("lais")
+        auth_resp = await client.post(auth_url, json={"username": auth_user, "password": auth_pass})
+        auth_token = auth_resp.text.strip()
+        if not auth_token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Failed to obtain authentication token")
+        upis_full_url = upis_url.rstrip("/") + f"/?idno={request.owner_id}&idtypeid={request.id_type}"
+        upis_resp = await client.get(upis_full_url, headers={"Authorization": f"Bearer {auth_token}"})
         return Response(content=upis_resp.content, status_code=upis_resp.status_code, media_type=upis_resp.headers.get("content-type", "application/json"))
     except HTTPException:
         raise
@@ -597,8 +689,7 @@ async def get_tax_arrears(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="TAX_ARREARS_ENDPOINT not configured")
     url = endpoint.rstrip("/") + f"?upi={upi}"
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url)
+        resp = await HttpClientRegistry.get("lais").get(url)
         return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get("content-type", "application/json"))
     except Exception as e:
         logger.error(f"Error fetching tax arrears: {e}")
@@ -607,6 +698,7 @@ async def get_tax_arrears(
 
 @router.get("/title", response_model=None)
 async def get_title_by_upi(
+    request: Request,
     upi: str = None,
     language: str = "english",
     # token_payload: dict = Depends(verify_token)
@@ -617,6 +709,10 @@ async def get_title_by_upi(
     Fetches the e-title (property title document) for a parcel by UPI.
     Returns a PDF file.
     Requires authentication.
+
+    Cached titles are served from disk with ETag/If-None-Match and Range
+    support; otherwise the upstream body is streamed through and teed into
+    the cache.
     """
     if not upi:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="UPI is required")
@@ -625,18 +721,67 @@ async def get_title_by_upi(
     endpoint = getattr(settings, "TITLE_DOWNLOAD", None)
     if not endpoint:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="TITLE_DOWNLOAD not configured")
+
+    cached = await asyncio.to_thread(TitlePdfCache.lookup, upi, language)
+    if cached:
+        headers = {"ETag": cached.etag, "Cache-Control": "private, max-age=0, must-revalidate", "X-Cache": "HIT"}
+        if cached.content_disposition:
+            headers["Content-Disposition"] = cached.content_disposition
+        if_none_match = request.headers.get("if-none-match", "")
+        if cached.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return FileResponse(cached.path, media_type=cached.content_type, headers=headers)
+
     url = endpoint.rstrip("/") + f"/title?upi={upi}&language={language}"
+    client = HttpClientRegistry.get("nla_title")
     try:
-        async with httpx.AsyncClient(timeout=None) as client:  # allow streaming PDFs
-            resp = await client.get(url)
-        headers = {}
-        if cd := resp.headers.get("content-disposition"):
-            headers["Content-Disposition"] = cd
-        return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get("content-type", "application/pdf"), headers=headers)
+        resp = await client.send(client.build_request("GET", url), stream=True)
     except Exception as e:
         logger.error(f"Error fetching title: {e}")
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to fetch title: {e}")
 
+    content_type = resp.headers.get("content-type", "application/pdf")
+    headers = {"X-Cache": "MISS"}
+    if cd := resp.headers.get("content-disposition"):
+        headers["Content-Disposition"] = cd
+
+    if resp.status_code != 200:
+        try:
+            body = await resp.aread()
+        finally:
+            await resp.aclose()
+        return Response(content=body, status_code=resp.status_code, media_type=content_type, headers=headers)
+
+    # No Content-Length: aiter_bytes() undoes any upstream Content-Encoding, so the
+    # upstream length need not match the body sent on (and cached)
+    async def stream_and_cache():
+        # Cache disk I/O runs on worker threads, never on the event loop
+        writer = None
+        try:
+            writer = await asyncio.to_thread(TitlePdfCache.writer, upi, language, content_type, cd)
+        except OSError as e:
+            logger.warning(f"Title PDF cache unavailable: {e}")
+        completed = False
+        try:
+            async for chunk in resp.aiter_bytes(TITLE_PDF_CHUNK_SIZE):
+                if writer:
+                    await asyncio.to_thread(writer.write, chunk)
+                yield chunk
+            completed = True
+        finally:
+            await resp.aclose()
+            if writer:
+                if completed:
+                    try:
+                        await asyncio.to_thread(writer.commit)
+                    except OSError as e:
+                        logger.warning(f"Could not cache title PDF for UPI {upi}: {e}")
+                        await asyncio.to_thread(writer.discard)
+                else:
+                    await asyncio.to_thread(writer.discard)
+
+    return StreamingResponse(stream_and_cache(), status_code=200, media_type=content_type, headers=headers)
+
 
 @router.get("/gis-extract", response_model=None)
 async def get_gis_extract(
@@ -656,8 +801,7 @@ async def get_gis_extract(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="TITLE_DOWNLOAD not configured")
     url = endpoint.rstrip("/") + f"/gis_extract?upi={upi}"
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url)
+        resp = await HttpClientRegistry.coalesced_get("nla", url)
         return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get("content-type", "application/json"))
     except Exception as e:
         logger.error(f"Error fetching plot shape: {e}")
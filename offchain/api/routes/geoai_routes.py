@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from api.ml.geo_ai.train import train_all_models
-from api.ml.geo_ai.model_registry import ModelRegistry
+from api.ml.geo_ai.jobs import TrainingJobs
+from api.ml.geo_ai.feature_store import FeatureStore
+from api.ml.geo_ai.scoring import GeoAIScoreRefresher
 from api.ml.geo_ai.service import (
     predict_land_value,
     predict_investment_score,
@@ -11,24 +13,29 @@ from api.ml.geo_ai.service import (
     get_bank_lending_targets
 )
 from data.database.database import get_db
-import logging
 
 router = APIRouter(prefix="/geoai", tags=["GeoAI"])
 
-@router.post("/retrain")
-async def retrain_models(background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
-    async def train_task():
-        try:
-            await train_all_models(db)
-            ModelRegistry.reload_models()
-        except Exception as e:
-            logging.exception(e)
-    background_tasks.add_task(train_task)
+@router.post("/retrain", status_code=202)
+async def retrain_models(db: AsyncSession = Depends(get_db)):
+    job, created = await TrainingJobs.submit(db)
+    if not created:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": f"Training job {job.id} is already {job.status}", "job_id": job.id},
+        )
     return {
-        "status": "training started",
-        "message": "models will reload automatically"
+        **TrainingJobs.to_dict(job),
+        "message": "training runs in a separate worker; poll GET /retrain/{job_id} for status",
     }
 
+@router.get("/retrain/{job_id}")
+async def retrain_status(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await TrainingJobs.get(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return TrainingJobs.to_dict(job)
+
 @router.post("/predict-value/{upi}")
 async def predict_value(upi: str, db: AsyncSession = Depends(get_db)):
     result = await predict_land_value(db, upi)
@@ -44,22 +51,41 @@ async def investment_score(upi: str, db: AsyncSession = Depends(get_db)):
     return result
 
 @router.get("/growth-neighborhoods")
-async def growth_neighborhoods(db: AsyncSession = Depends(get_db)):
-    result = await get_growth_ranking(db)
+async def growth_neighborhoods(
+    district: Optional[str] = None,
+    sector: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await get_growth_ranking(db, district=district, sector=sector, limit=limit)
     if 'error' in result:
         raise HTTPException(status_code=500, detail=result['error'])
     return result
 
 @router.get("/risky-parcels")
-async def risky_parcels(db: AsyncSession = Depends(get_db)):
-    result = await get_risky_parcels(db)
+async def risky_parcels(
+    district: Optional[str] = None,
+    sector: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await get_risky_parcels(db, district=district, sector=sector, limit=limit)
     if 'error' in result:
         raise HTTPException(status_code=500, detail=result['error'])
     return result
 
 @router.get("/bank-lending-targets")
-async def bank_lending_targets(db: AsyncSession = Depends(get_db)):
-    result = await get_bank_lending_targets(db)
+async def bank_lending_targets(
+    district: Optional[str] = None,
+    sector: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await get_bank_lending_targets(db, district=district, sector=sector, limit=limit)
     if 'error' in result:
         raise HTTPException(status_code=500, detail=result['error'])
     return result
+
+@router.get("/feature-store/stats")
+async def feature_store_stats():
+    return {**FeatureStore.stats(), "scoring": GeoAIScoreRefresher.stats()}
@@ -1,10 +1,13 @@
 import os
+import io
 import shutil
 import re
 import json
+import asyncio
+import logging
+import zipfile
 import numpy as np
 import cv2
-import pytesseract
 import jwt
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request, Query, Response
 from fastapi.security.utils import get_authorization_scheme_param
@@ -15,14 +18,20 @@ from api.schemas.mapping_schema import MappingSchema, MarketStatusUpdate
 from data.models.mapping import Mapping
 from data.models.models import Property, User
 from data.models.chat import ChatSession, ChatMessage
-from data.database.database import get_db
+from data.database.database import get_db, AsyncSessionLocal
+from data.database.bulk import INSERTED, bulk_upsert
+from config.config import settings
 from datetime import datetime
 from pdf2image import convert_from_path
-from shapely.geometry import Polygon
-from pyproj import Transformer
 from dotenv import load_dotenv
 from typing import List, Optional
 from api.routes.external_routes import get_title_data
+from api.ml.title.ocr import get_ocr_engine
+from api.ml.gis_cord.parcel_detector import detect_parcel_polygon
+from api.ml.title.pipeline import (
+    extract_title_owners, find_upi, is_supported_document, run_in_ocr_pool, scan_title_document
+)
+from api.ml.title.owner_matching import match_owners, normalize_ocr_owners, registry_owners_from_details
 import geopandas as gpd
 from shapely import wkt
 load_dotenv()
@@ -192,222 +201,26 @@ def extract_upi_from_pdf(pdf_path):
     images = convert_from_path(pdf_path, dpi=300)
     img = np.array(images[0])
     gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    ocr_text = pytesseract.image_to_string(gray, lang='eng+kin')
+    ocr_text = get_ocr_engine().read_text(gray)
     match = re.search(r'UPI:?\s*(\d+/\d+/\d+/\d+/\d+)', ocr_text)
     return (match.group(1) if match else None), images[0]
 
 def get_detected_polygon(image):
-    transformer = Transformer.from_crs("epsg:32736", "epsg:4326", always_xy=True)
-    img = np.array(image)
-    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    h, w = gray.shape
-    roi = gray[int(h*0.5):, int(w*0.5):]
-    blurred = cv2.GaussianBlur(roi, (5, 5), 0)
-    thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not contours:
-        return None
-    parcel_contour = max(contours, key=cv2.contourArea)
-    epsilon = 0.01 * cv2.arcLength(parcel_contour, True)
-    approx = cv2.approxPolyDP(parcel_contour, epsilon, True)
-    anchor_utm = [510071, 4778635]
-    gps_coords = []
-    for pt in approx:
-        px_x, px_y = pt[0]
-        utm_x = anchor_utm[0] + (px_x * 0.5)
-        utm_y = anchor_utm[1] - (px_y * 0.5)
-        lon, lat = transformer.transform(utm_x, utm_y)
-        gps_coords.append((lon, lat))
-    return str(Polygon(gps_coords))
+    return detect_parcel_polygon(image, purpose="extract")
 
 def get_detected_polygon_for_verify(image):
     """
     Verify-only detector aligned with previous behavior:
-    uses the largest contour directly (without aggressive simplification).
+    uses the best parcel contour inside the map frame (without aggressive simplification).
     """
-    transformer = Transformer.from_crs("epsg:32736", "epsg:4326", always_xy=True)
-    img = np.array(image)
-    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    h, w = gray.shape
-    roi = gray[int(h * 0.5):, int(w * 0.5):]
-    blurred = cv2.GaussianBlur(roi, (5, 5), 0)
-
-    # 1) Find the map frame first (usually a large rectangle in the ROI)
-    edges = cv2.Canny(blurred, 50, 150)
-    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=1)
-    frame_contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    roi_h, roi_w = roi.shape
-    roi_area = float(max(roi_h * roi_w, 1))
-
-    frame_x, frame_y, frame_w, frame_h = 0, 0, roi_w, roi_h
-    best_frame_score = -1.0
-
-    for cnt in frame_contours:
-        area = cv2.contourArea(cnt)
-        if area < roi_area * 0.06:
-            continue
-
-        peri = cv2.arcLength(cnt, True)
-        if peri <= 0:
-            continue
-
-        approx = cv2.approxPolyDP(cnt, 0.02 * peri, True)
-        x, y, w_box, h_box = cv2.boundingRect(cnt)
-        if w_box <= 0 or h_box <= 0:
-            continue
-
-        box_area = float(w_box * h_box)
-        extent = area / box_area
-        aspect = w_box / float(h_box)
-
-        # Prefer quadrilateral-like, sizable, document-map-like rectangles
-        quad_bonus = 1.2 if len(approx) in (4, 5) else 1.0
-        aspect_penalty = 1.0 - min(abs(aspect - 1.1), 1.1) * 0.35
-        score = area * extent * quad_bonus * max(0.2, aspect_penalty)
-
-        if score > best_frame_score:
-            best_frame_score = score
-            frame_x, frame_y, frame_w, frame_h = x, y, w_box, h_box
-
-    # Crop slightly inside frame to avoid border line being selected as parcel boundary
-    inset_x = max(3, int(frame_w * 0.015))
-    inset_y = max(3, int(frame_h * 0.015))
-    map_x0 = min(max(frame_x + inset_x, 0), roi_w - 1)
-    map_y0 = min(max(frame_y + inset_y, 0), roi_h - 1)
-    map_x1 = min(max(frame_x + frame_w - inset_x, map_x0 + 1), roi_w)
-    map_y1 = min(max(frame_y + frame_h - inset_y, map_y0 + 1), roi_h)
-
-    map_roi = roi[map_y0:map_y1, map_x0:map_x1]
-    if map_roi.size == 0:
-        map_roi = roi
-        map_x0, map_y0 = 0, 0
-
-    # 2) Detect parcel shape inside map frame only
-    map_blurred = cv2.GaussianBlur(map_roi, (5, 5), 0)
-    thresh = cv2.adaptiveThreshold(
-        map_blurred,
-        255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY_INV,
-        11,
-        2,
-    )
-    kernel = np.ones((3, 3), np.uint8)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=1)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
+    return detect_parcel_polygon(image, purpose="verify")
 
-    contours, _ = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-    if not contours:
-        return None
-
-    map_h, map_w = map_roi.shape
-    map_area = float(max(map_h * map_w, 1))
-    center_x, center_y = map_w / 2.0, map_h / 2.0
-
-    def touches_border(cnt):
-        x, y, cw, ch = cv2.boundingRect(cnt)
-        return x <= 2 or y <= 2 or (x + cw) >= (map_w - 2) or (y + ch) >= (map_h - 2)
-
-    best_contour = None
-    best_score = -1.0
-
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if area < max(140.0, map_area * 0.001):
-            continue
-        if area > map_area * 0.85:
-            continue
-
-        perimeter = cv2.arcLength(contour, True)
-        if perimeter <= 0:
-            continue
-
-        moments = cv2.moments(contour)
-        if moments["m00"] <= 0:
-            continue
-
-        cx = moments["m10"] / moments["m00"]
-        cy = moments["m01"] / moments["m00"]
-        dist_norm = np.hypot(cx - center_x, cy - center_y) / np.hypot(center_x, center_y)
-
-        hull = cv2.convexHull(contour)
-        hull_area = cv2.contourArea(hull)
-        solidity = area / hull_area if hull_area > 0 else 0
-
-        border_penalty = 0.35 if touches_border(contour) else 0.0
-        score = area * (0.7 + 0.3 * solidity) * max(0.1, 1.0 - 0.45 * dist_norm) * (1.0 - border_penalty)
-
-        if score > best_score:
-            best_score = score
-            best_contour = contour
-
-    if best_contour is None:
-        best_contour = max(contours, key=cv2.contourArea)
-
-    epsilon = 0.0025 * cv2.arcLength(best_contour, True)
-    approx = cv2.approxPolyDP(best_contour, epsilon, True)
-    parcel_contour = approx if len(approx) >= 5 else best_contour
-
-    anchor_utm = [510071, 4778635]
-    gps_coords = []
-    for pt in parcel_contour:
-        px_x, px_y = pt[0]
-        # Convert local map ROI coordinates back to original verify ROI coordinates
-        roi_x = px_x + map_x0
-        roi_y = px_y + map_y0
-        utm_x = anchor_utm[0] + (roi_x * 0.5)
-        utm_y = anchor_utm[1] - (roi_y * 0.5)
-        lon, lat = transformer.transform(utm_x, utm_y)
-        gps_coords.append((lon, lat))
-
-    if len(gps_coords) < 4:
-        return None
-
-    try:
-        polygon = Polygon(gps_coords)
-        if polygon.is_empty:
-            return None
-        if not polygon.is_valid:
-            polygon = polygon.buffer(0)
-        return polygon.wkt if not polygon.is_empty else None
-    except Exception:
-        return None
-
-@router.post("/extract-pdf", response_model=dict)
-async def extract_pdf_and_store(
-    file: UploadFile = File(...),
-    price: Optional[float] = Form(None),
-    db: AsyncSession = Depends(get_db),
-    request: Request = None
-):
-    # Read file bytes
-    file_bytes = await file.read()
-    import io
-    from pdf2image import convert_from_bytes
-    from PIL import Image
-    # Detect file type
-    content_type = file.content_type or ''
-    if content_type == 'application/pdf' or file.filename.lower().endswith('.pdf'):
-        images = convert_from_bytes(file_bytes, dpi=300)
-        page_image = images[0]
-        img = np.array(page_image)
-    elif content_type in ('image/jpeg', 'image/png') or file.filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-        pil_img = Image.open(io.BytesIO(file_bytes)).convert('RGB')
-        page_image = pil_img
-        img = np.array(pil_img)
-    else:
-        raise HTTPException(status_code=415, detail='Unsupported file type. Please upload a PDF or high-resolution JPEG/PNG image.')
-    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    ocr_text = pytesseract.image_to_string(gray, lang='eng+kin')
-    match = re.search(r'UPI:?\s*(\d+/\d+/\d+/\d+/\d+)', ocr_text)
-    upi = match.group(1) if match else None
-    detected_wkt = get_detected_polygon(page_image)
-    uploaded_by = None
+def _uploader_id_from_request(request: Optional[Request]):
+    """Best-effort uploader id from request state or the (unverified) bearer token."""
     if request and hasattr(request, 'state') and hasattr(request.state, 'user'):
         user = getattr(request.state, 'user', None)
         if user and isinstance(user, dict):
-            uploaded_by = user.get('id') or user.get('person_id')
+            return user.get('id') or user.get('person_id')
     elif request:
         auth = request.headers.get('authorization')
         if auth:
@@ -415,15 +228,15 @@ async def extract_pdf_and_store(
             if token:
                 try:
                     payload = jwt.decode(token, options={"verify_signature": False})
-                    uploaded_by = payload.get('id') or payload.get('person_id')
+                    return payload.get('id') or payload.get('person_id')
                 except Exception:
                     pass
+    return None
 
 
-    mapping_obj = None
-    property_summary = None
-    status_details = {}
-    backup_details = {
+def _empty_parcel_details(upi: Optional[str]) -> dict:
+    """Placeholder parcel details used when the registry lookup fails."""
+    return {
         "upi": upi,
         "parcelPolygon": {"polygon": None},
         "parcelCoordinates": {"lat": None, "lon": None},
@@ -449,118 +262,154 @@ async def extract_pdf_and_store(
         "approvalDate": None,
         "owners": []
     }
+
+
+def _details_from_title_response(result) -> dict:
+    """Pull parcelDetails out of a get_title_data response, keeping data-level owners."""
+    if hasattr(result, 'body'):
+        raw_data = json.loads(result.body)["data"]
+    else:
+        raw_data = result["data"]
+    details = raw_data["parcelDetails"]
+    # owners and parcelRepresentative live at data level, not inside parcelDetails
+    details["_owners"] = raw_data.get("owners") or []
+    details["_parcelRepresentative"] = raw_data.get("parcelRepresentative") or {}
+    return details
+
+
+async def _fetch_parcel_details(upi: str, db: AsyncSession) -> tuple[dict, bool]:
+    """Return (details, from_registry). Falls back to empty details on failure."""
+    try:
+        result = await get_title_data(upi=upi, language="english", db=db)
+        return _details_from_title_response(result), True
+    except Exception as e:
+        logging.error(f"Error fetching parcel info for UPI {upi}: {e}")
+        return _empty_parcel_details(upi), False
+
+
+def _is_admin_user(user) -> bool:
+    user_roles = getattr(user, 'role', []) if user else []
+    if isinstance(user_roles, list):
+        return any(str(r).lower() in ('admin', 'super_admin') for r in user_roles)
+    if isinstance(user_roles, str):
+        return user_roles.lower() in ('admin', 'super_admin')
+    return False
+
+
+def _authorised_nids(details: dict) -> set:
+    """All NIDs allowed to upload this title: owners + parcel representative."""
+    owners = details.get("_owners") or details.get("owners") or []
+    authorised = set()
+    for o in owners:
+        raw = o.get("idNo") or o.get("id_number") or o.get("nationalId") or ""
+        authorised.add(str(raw).strip())
+    rep = details.get("_parcelRepresentative") or details.get("parcelRepresentative") or details.get("representative") or {}
+    if isinstance(rep, dict):
+        raw_rep = rep.get("idNo") or rep.get("id_number") or rep.get("nationalId") or ""
+        authorised.add(str(raw_rep).strip())
+    authorised.discard("")
+    return authorised
+
+
+def _mapping_fields_from_details(details: dict, detected_wkt, uploaded_by, price) -> dict:
+    return dict(
+        upi=details.get("upi"),
+        official_registry_polygon=details.get("parcelPolygon", {}).get("polygon"),
+        document_detected_polygon=detected_wkt,
+        latitude=details.get("parcelCoordinates", {}).get("lat"),
+        longitude=details.get("parcelCoordinates", {}).get("lon"),
+        parcel_area_sqm=details.get("area"),
+        province=details.get("provinceName"),
+        uploaded_by=uploaded_by,
+        district=details.get("districtName"),
+        for_sale=False,
+        price=price if price is not None else 0,
+        sector=details.get("sectorName"),
+        cell=details.get("cellName"),
+        village=details.get("villageName"),
+        full_address=details.get("address", {}).get("string"),
+        land_use_type=details.get("landUseTypeNameEnglish"),
+        planned_land_use=details.get("plannedLandUses", [{}])[0].get("landUseName") if details.get("plannedLandUses") else None,
+        is_developed=details.get("isDeveloped"),
+        has_infrastructure=details.get("hasInfrastructure"),
+        has_building=details.get("hasBuilding"),
+        building_floors=details.get("numberOfBuildingFloors"),
+        tenure_type=details.get("rightTypeName"),
+        lease_term_years=details.get("leaseTerm"),
+        remaining_lease_term=details.get("remainingLeaseTerm"),
+        under_mortgage=details.get("underMortgage"),
+        has_caveat=details.get("hasCaveat"),
+        in_transaction=details.get("inTransaction"),
+        registration_date=None,
+        approval_date=details.get("approvalDate"),
+        year_of_record=datetime.now().year,
+        property_id=None,
+    )
+
+
+def _property_summary(prop) -> dict:
+    return {
+        "upi": prop.upi,
+        "size": getattr(prop, "size", None),
+        "usage": getattr(prop, "usage", None),
+        "status": getattr(prop, "status", None),
+        "location": getattr(prop, "location", None)
+    }
+
+
+@router.post("/extract-pdf", response_model=dict)
+async def extract_pdf_and_store(
+    file: UploadFile = File(...),
+    price: Optional[float] = Form(None),
+    db: AsyncSession = Depends(get_db),
+    request: Request = None
+):
+    file_bytes = await file.read()
+    if not is_supported_document(file.filename, file.content_type):
+        raise HTTPException(status_code=415, detail='Unsupported file type. Please upload a PDF or high-resolution JPEG/PNG image.')
+    scan = await run_in_ocr_pool(
+        scan_title_document, file_bytes, file.filename, file.content_type, get_detected_polygon
+    )
+    upi = scan.upi
+    detected_wkt = scan.detected_wkt
+    uploaded_by = _uploader_id_from_request(request)
+
+    mapping_obj = None
+    property_summary = None
+    status_details = {}
     if upi:
-        try:
-            result = await get_title_data(upi=upi, language="english", db=db)
-            if hasattr(result, 'body'):
-                raw_data = json.loads(result.body)["data"]
-            else:
-                raw_data = result["data"]
-            details = raw_data["parcelDetails"]
-            # owners and parcelRepresentative live at data level, not inside parcelDetails
-            details["_owners"] = raw_data.get("owners") or []
-            details["_parcelRepresentative"] = raw_data.get("parcelRepresentative") or {}
-        except Exception as e:
-            # Log error and use backup
-            import logging
-            logging.error(f"Error fetching parcel info for UPI {upi}: {e}")
-            details = backup_details
+        details, from_registry = await _fetch_parcel_details(upi, db)
 
         # Owner permission check
         user_id = int(uploaded_by) if uploaded_by is not None else None
         user_result = await db.execute(select(User).where(User.id == user_id))
         current_user = user_result.scalar_one_or_none()
-        user_roles = getattr(current_user, 'role', []) if current_user else []
-        is_admin = False
-        if isinstance(user_roles, list):
-            is_admin = any(str(r).lower() in ('admin', 'super_admin') for r in user_roles)
-        elif isinstance(user_roles, str):
-            is_admin = user_roles.lower() in ('admin', 'super_admin')
-
+        is_admin = _is_admin_user(current_user)
         n_id_number = str(getattr(current_user, 'n_id_number', None) or '').strip() if current_user else ''
-
-        # Collect all authorised NIDs from owners list + parcel representative
-        # owners/parcelRepresentative are at data level (stored in _owners/_parcelRepresentative keys)
-        owners = details.get("_owners") or details.get("owners") or []
-        authorised_nids = set()
-        for o in owners:
-            raw = o.get("idNo") or o.get("id_number") or o.get("nationalId") or ""
-            authorised_nids.add(str(raw).strip())
-        rep = details.get("_parcelRepresentative") or details.get("parcelRepresentative") or details.get("representative") or {}
-        if isinstance(rep, dict):
-            raw_rep = rep.get("idNo") or rep.get("id_number") or rep.get("nationalId") or ""
-            authorised_nids.add(str(raw_rep).strip())
-        authorised_nids.discard("")  # remove empty strings
+        authorised_nids = _authorised_nids(details)
 
         if not is_admin:
             if not n_id_number or n_id_number not in authorised_nids:
-                import logging
                 logging.warning(
                     f"[extract-pdf] Access denied: user NID '{n_id_number}' not in parcel authorised NIDs {authorised_nids}"
                 )
                 # If backup, skip permission check
-                if details is not backup_details:
+                if from_registry:
                     raise HTTPException(status_code=403, detail="Only people who have access to this title can upload it. Sorry.")
 
-        mapping_fields = dict(
-            upi=details.get("upi"),
-            official_registry_polygon=details.get("parcelPolygon", {}).get("polygon"),
-            document_detected_polygon=detected_wkt,
-            latitude=details.get("parcelCoordinates", {}).get("lat"),
-            longitude=details.get("parcelCoordinates", {}).get("lon"),
-            parcel_area_sqm=details.get("area"),
-            province=details.get("provinceName"),
-            uploaded_by=uploaded_by,
-            district=details.get("districtName"),
-            for_sale=False,
-            price=price if price is not None else 0,
-            sector=details.get("sectorName"),
-            cell=details.get("cellName"),
-            village=details.get("villageName"),
-            full_address=details.get("address", {}).get("string"),
-            land_use_type=details.get("landUseTypeNameEnglish"),
-            planned_land_use=details.get("plannedLandUses", [{}])[0].get("landUseName") if details.get("plannedLandUses") else None,
-            is_developed=details.get("isDeveloped"),
-            has_infrastructure=details.get("hasInfrastructure"),
-            has_building=details.get("hasBuilding"),
-            building_floors=details.get("numberOfBuildingFloors"),
-            tenure_type=details.get("rightTypeName"),
-            lease_term_years=details.get("leaseTerm"),
-            remaining_lease_term=details.get("remainingLeaseTerm"),
-            under_mortgage=details.get("underMortgage"),
-            has_caveat=details.get("hasCaveat"),
-            in_transaction=details.get("inTransaction"),
-            registration_date=None,
-            approval_date=details.get("approvalDate"),
-            year_of_record=datetime.now().year,
-            property_id=None,
-        )
+        mapping_fields = _mapping_fields_from_details(details, detected_wkt, uploaded_by, price)
         prop_result = await db.execute(select(Property).where(Property.upi == upi))
         prop = prop_result.scalar_one_or_none()
         if prop:
             mapping_fields["property_id"] = prop.id
-            property_summary = {
-                "upi": prop.upi,
-                "size": getattr(prop, "size", None),
-                "usage": getattr(prop, "usage", None),
-                "status": getattr(prop, "status", None),
-                "location": getattr(prop, "location", None)
-            }
+            property_summary = _property_summary(prop)
         else:
             property_summary = "not found"
-        existing_result = await db.execute(select(Mapping).where(Mapping.upi == upi))
-        existing_mapping = existing_result.scalar_one_or_none()
-        if existing_mapping:
-            for k, v in mapping_fields.items():
-                setattr(existing_mapping, k, v)
-            await db.commit()
-            await db.refresh(existing_mapping)
-            mapping_obj = existing_mapping
-        else:
-            mapping_obj = Mapping(**mapping_fields)
-            db.add(mapping_obj)
-            await db.commit()
-            await db.refresh(mapping_obj)
+        upserted = await bulk_upsert(
+            db, Mapping, [mapping_fields], returning=[Mapping], fingerprint_exclude=("year_of_record",)
+        )
+        mapping_obj = upserted[0][0]
+        await db.commit()
 
         # GIS overlap update after insert/update
         sql = '''
@@ -598,6 +447,240 @@ async def extract_pdf_and_store(
         "uploaded_by": mapping_obj.uploaded_by if mapping_obj else uploaded_by
     }
 
+
+def _too_many_documents() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Too many documents in one batch. Maximum is {settings.BATCH_INGEST_MAX_FILES}."
+    )
+
+
+def _expand_batch_uploads(files: List[UploadFile], archives: list) -> tuple[list[dict], list[dict]]:
+    """
+    Flatten uploaded PDFs/images and ZIP archives into individual documents.
+    Nothing is read into memory here: each document carries a `read` callable that
+    loads its bytes when it is scanned. ZIP archives are opened in place on the
+    spooled upload and appended to `archives` for the caller to close.
+    The document count and per-file size limits are enforced while expanding, so an
+    oversized batch is rejected before anything is inflated.
+    Returns (documents, rejected) where each rejected entry is already a report row.
+    """
+    max_bytes = settings.BATCH_INGEST_MAX_FILE_MB * 1024 * 1024
+    documents: list[dict] = []
+    rejected: list[dict] = []
+
+    def add(name: str, content_type: Optional[str], size: int, read):
+        if not is_supported_document(name, content_type):
+            rejected.append({"filename": name, "status": "failed", "detail": "Unsupported file type"})
+        elif size > max_bytes:
+            rejected.append({"filename": name, "status": "failed", "detail": "File too large"})
+        elif len(documents) >= settings.BATCH_INGEST_MAX_FILES:
+            raise _too_many_documents()
+        else:
+            documents.append({"filename": name, "content_type": content_type, "read": read})
+
+    def read_upload(fileobj):
+        def read() -> bytes:
+            fileobj.seek(0)
+            return fileobj.read()
+        return read
+
+    def read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        def read() -> bytes:
+            # Never trust the declared size: stop one byte past the limit
+            with archive.open(info) as member:
+                data = member.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                raise ValueError("File too large")
+            return data
+        return read
+
+    for f in files:
+        name = f.filename or "upload"
+        f.file.seek(0, os.SEEK_END)
+        size = f.file.tell()
+        if f.content_type in ('application/zip', 'application/x-zip-compressed') or name.lower().endswith('.zip'):
+            try:
+                f.file.seek(0)
+                archive = zipfile.ZipFile(f.file)
+            except zipfile.BadZipFile:
+                rejected.append({"filename": name, "status": "failed", "detail": "Invalid ZIP archive"})
+                continue
+            archives.append(archive)
+            for info in archive.infolist():
+                member = info.filename
+                base = os.path.basename(member)
+                if info.is_dir() or not base or base.startswith('.') or member.startswith('__MACOSX/'):
+                    continue
+                add(f"{name}:{member}", None, info.file_size, read_member(archive, info))
+        else:
+            add(name, f.content_type, size, read_upload(f.file))
+
+    return documents, rejected
+
+
+def _scan_batch_document(doc: dict) -> tuple[Optional[str], Optional[str]]:
+    """
+    Read and scan one batch document on the OCR pool. Only (upi, detected_wkt) is
+    kept; the page image and grayscale copy are dropped as soon as the scan ends.
+    """
+    scan = scan_title_document(doc["read"](), doc["filename"], doc["content_type"], get_detected_polygon)
+    return scan.upi, scan.detected_wkt
+
+
+async def _scan_batch_documents(documents: list[dict]) -> list:
+    # Bounded window: at most two documents per OCR worker are read or scanning at once
+    window = asyncio.Semaphore(max(1, settings.OCR_POOL_WORKERS) * 2)
+
+    async def scan_one(doc: dict):
+        async with window:
+            return await run_in_ocr_pool(_scan_batch_document, doc)
+
+    return await asyncio.gather(*(scan_one(d) for d in documents), return_exceptions=True)
+
+
+async def _fetch_parcel_details_isolated(upi: str, semaphore: asyncio.Semaphore) -> tuple[dict, bool]:
+    """Concurrent-safe registry lookup: each call gets its own DB session for the backup upsert."""
+    async with semaphore:
+        async with AsyncSessionLocal() as session:
+            return await _fetch_parcel_details(upi, session)
+
+
+@router.post("/extract-pdf/batch", response_model=dict)
+async def extract_pdf_batch(
+    files: List[UploadFile] = File(...),
+    price: Optional[float] = Form(None),
+    db: AsyncSession = Depends(get_db),
+    request: Request = None
+):
+    """
+    Bulk version of /extract-pdf for agencies onboarding many plots.
+    Accepts several PDFs/images and/or ZIP archives of them. Documents are read and
+    scanned a few at a time on the OCR pool, registry data is resolved concurrently,
+    and mappings are written in chunks (one transaction per chunk). Returns a
+    per-file report.
+    """
+    archives: list[zipfile.ZipFile] = []
+    try:
+        documents, report = _expand_batch_uploads(files, archives)
+        total_files = len(documents) + len(report)
+
+        # 1) Scan documents in a bounded window on the OCR pool
+        scans = await _scan_batch_documents(documents)
+    finally:
+        for archive in archives:
+            archive.close()
+
+    # 2) Resolve the uploader once for the whole batch
+    uploaded_by = _uploader_id_from_request(request)
+    current_user = None
+    if uploaded_by is not None:
+        user_result = await db.execute(select(User).where(User.id == int(uploaded_by)))
+        current_user = user_result.scalar_one_or_none()
+    is_admin = _is_admin_user(current_user)
+    n_id_number = str(getattr(current_user, 'n_id_number', None) or '').strip() if current_user else ''
+
+    # 3) Resolve registry data for all distinct UPIs concurrently
+    scanned: list[tuple[dict, object]] = []
+    for doc, scan in zip(documents, scans):
+        if isinstance(scan, Exception):
+            report.append({"filename": doc["filename"], "status": "failed", "detail": f"Scan failed: {scan}"})
+        elif not scan[0]:
+            report.append({"filename": doc["filename"], "status": "skipped", "detail": "No UPI extracted from document."})
+        else:
+            scanned.append((doc, scan))
+
+    distinct_upis = list(dict.fromkeys(upi for _, (upi, _wkt) in scanned))
+    semaphore = asyncio.Semaphore(max(1, settings.NLA_MAX_CONCURRENCY))
+    resolved = await asyncio.gather(
+        *(_fetch_parcel_details_isolated(upi, semaphore) for upi in distinct_upis)
+    )
+    details_by_upi = dict(zip(distinct_upis, resolved))
+
+    # 4) Permission checks and mapping field construction (last document wins per UPI)
+    pending: dict[str, dict] = {}
+    for doc, (upi, detected_wkt) in scanned:
+        details, from_registry = details_by_upi[upi]
+        if not is_admin and from_registry:
+            if not n_id_number or n_id_number not in _authorised_nids(details):
+                report.append({
+                    "filename": doc["filename"],
+                    "status": "forbidden",
+                    "upi": upi,
+                    "detail": "Only people who have access to this title can upload it.",
+                })
+                continue
+        fields = _mapping_fields_from_details(details, detected_wkt, uploaded_by, price)
+        fields["upi"] = fields.get("upi") or upi
+        previous = pending.get(fields["upi"])
+        if previous:
+            report.append({
+                "filename": previous["filename"],
+                "status": "duplicate",
+                "upi": fields["upi"],
+                "detail": f"Superseded by {doc['filename']} in the same batch.",
+            })
+        pending[fields["upi"]] = {"filename": doc["filename"], "fields": fields}
+
+    # 5) Bulk property lookup, then write mappings one transaction per chunk
+    all_upis = list(pending.keys())
+    property_ids: dict[str, int] = {}
+    if all_upis:
+        prop_result = await db.execute(select(Property.id, Property.upi).where(Property.upi.in_(all_upis)))
+        property_ids = {row.upi: row.id for row in prop_result.fetchall()}
+
+    written: list[dict] = []
+    chunk_size = max(1, settings.BATCH_INGEST_CHUNK_SIZE)
+    for start in range(0, len(all_upis), chunk_size):
+        chunk = all_upis[start:start + chunk_size]
+        try:
+            for upi in chunk:
+                pending[upi]["fields"]["property_id"] = property_ids.get(upi)
+            upserted = await bulk_upsert(
+                db, Mapping, [pending[upi]["fields"] for upi in chunk],
+                returning=[Mapping.id, Mapping.upi, Mapping.property_id, INSERTED],
+                fingerprint_exclude=("year_of_record",),
+            )
+            await db.commit()
+            written.extend(
+                {
+                    "filename": pending[row.upi]["filename"],
+                    "upi": row.upi,
+                    "status": "created" if row.inserted else "updated",
+                    "mapping_id": row.id,
+                    "property_id": row.property_id,
+                }
+                for row in upserted
+            )
+        except Exception as e:
+            await db.rollback()
+            logging.error(f"[extract-pdf/batch] chunk starting at {chunk[0]} failed: {e}")
+            for upi in chunk:
+                report.append({"filename": pending[upi]["filename"], "status": "failed", "upi": upi, "detail": f"Database write failed: {e}"})
+
+    # 6) Overlap flags for everything written, in one PostGIS query
+    overlap_upis = await _compute_overlap_upi_set(db, [row["upi"] for row in written])
+    for row in written:
+        report.append({
+            "filename": row["filename"],
+            "status": row["status"],
+            "upi": row["upi"],
+            "mapping_id": row["mapping_id"],
+            "property_id": row["property_id"],
+            "overlaps": row["upi"] in overlap_upis,
+        })
+
+    counts: dict[str, int] = {}
+    for row in report:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+
+    return {
+        "total_files": total_files,
+        "summary": counts,
+        "uploaded_by": uploaded_by,
+        "results": report,
+    }
+
 @router.get("/parcel-overlaps", response_model=List[dict])
 async def get_parcel_overlaps(db: AsyncSession = Depends(get_db)):
     """
@@ -1120,374 +1203,22 @@ async def verify_pdf(
         raise HTTPException(status_code=415, detail='Unsupported file type. Please upload a PDF or high-resolution JPEG/PNG image.')
     
     gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    ocr_text = pytesseract.image_to_string(gray, lang='eng+kin')
-    
-    # Extract UPI from OCR with multiple patterns
-    def extract_upi(text):
-        upi_patterns = [
-            r'UPI:?\s*([\d\s/]+)',
-            r'UPI\s*[:\-]?\s*([\d/]+)',
-            r'Unique Parcel Identifier:?\s*([\d/]+)',
-            r'Parcel\s*ID:?\s*([\d/]+)',
-            r'([\d]{1,2}/[\d]{1,2}/[\d]{1,2}/[\d]{1,3}/[\d]{3,5})',
-        ]
-        for pattern in upi_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                upi_raw = match.group(1).strip()
-                upi = re.sub(r'\s+', '', upi_raw).strip('/')
-                if upi and re.match(r'^[\d/]+$', upi):
-                    return upi
-        return None
+    ocr_engine = get_ocr_engine()
+    ocr_text = ocr_engine.read_text(gray)
     
-    upi = extract_upi(ocr_text)
+    upi = find_upi(ocr_text)
+    if not upi:
+        # Retry with the digits-only UPI profile before giving up
+        upi = find_upi(ocr_engine.read_text(gray, field="upi"))
     detected_wkt = get_detected_polygon_for_verify(page_image)
 
-    # --- Comprehensive owner extraction for all e-title formats ---
-    
-    def extract_owners_robust(text):
-        """
-        Comprehensive owner extraction for all e-title formats:
-        - Single/multiple owners
-        - National IDs (16 digits)
-        - Passport numbers (alphanumeric with underscore, e.g., 107433062_RW)
-        - Government IDs with _RW suffix
-        - Percentages (with or without % sign)
-        - Representative information
-        - Address extraction
-        - HTML/XML encoded characters
-        """
-        owners = []
-        
-        # Clean the text first - remove HTML entities
-        text_clean = re.sub(r'&#x?[A-Fa-f0-9]+;', '', text)
-        text_clean = re.sub(r'<br\s*/?>', ' ', text_clean)
-        text_clean = re.sub(r'<td[^>]*>', ' ', text_clean)
-        text_clean = re.sub(r'</td>', ' ', text_clean)
-        text_clean = re.sub(r'<tr[^>]*>', '\n', text_clean)
-        text_clean = re.sub(r'</tr>', '\n', text_clean)
-        
-        lines = text_clean.split('\n')
-        
-        # Pattern 1: Extract from table section with proper parsing
-        table_pattern = r'Names of the lessee\s*\(s\).*?Number of identification document.*?Shares\s*\(%\).*?Names and address of the representative.*?\n(.*?)(?=\n\s*\n|\n[A-Z]|\Z)'
-        table_match = re.search(table_pattern, text_clean, re.DOTALL | re.IGNORECASE)
-        
-        if table_match:
-            table_content = table_match.group(1)
-            table_lines = table_content.split('\n')
-            
-            i = 0
-            while i < len(table_lines):
-                line = table_lines[i].strip()
-                if not line or line.startswith('Names') or line.startswith('Number'):
-                    i += 1
-                    continue
-                
-                # Pattern: Number. Name ID Percentage [Representative Info]
-                owner_data = None
-                
-                # Pattern for numbered owner with percentage
-                # Handles: "1. UWERA PEACE 1197870017174206 50.00"
-                # Handles: "1. GOVERNMENT OF RWANDA107433062_RW100.00"
-                match_num = re.match(r'^(\d+)\.\s+([A-Z\s]+?)\s+([A-Z0-9_]{10,20})\s*(\d+\.?\d*)', line)
-                if match_num:
-                    num, name, id_num, percentage = match_num.groups()
-                    # Determine ID type
-                    if '_RW' in id_num or (id_num.isalnum() and any(c.isalpha() for c in id_num) and not id_num.isdigit()):
-                        id_type = 'government' if '_RW' in id_num else 'passport'
-                    else:
-                        id_type = 'national_id'
-                    owner_data = {
-                        'name': name.strip(),
-                        'id_number': id_num,
-                        'id_type': id_type,
-                        'percentage': percentage,
-                        'number': num
-                    }
-                else:
-                    # Pattern without space between name and ID
-                    # Handles: "1. UWERA PEACE119787001717420650.00"
-                    match_concat = re.match(r'^(\d+)\.\s+([A-Z\s]+?)([A-Z0-9_]{10,20})(\d+\.?\d*)', line)
-                    if match_concat:
-                        num, name, id_num, percentage = match_concat.groups()
-                        if '_RW' in id_num or (id_num.isalnum() and any(c.isalpha() for c in id_num) and not id_num.isdigit()):
-                            id_type = 'government' if '_RW' in id_num else 'passport'
-                        else:
-                            id_type = 'national_id'
-                        owner_data = {
-                            'name': name.strip(),
-                            'id_number': id_num,
-                            'id_type': id_type,
-                            'percentage': percentage,
-                            'number': num
-                        }
-                    else:
-                        # Pattern with name and ID only (no percentage in same line)
-                        match_no_pct = re.match(r'^(\d+)\.\s+([A-Z\s]+?)\s+([A-Z0-9_]{10,20})$', line)
-                        if match_no_pct:
-                            num, name, id_num = match_no_pct.groups()
-                            if '_RW' in id_num or (id_num.isalnum() and any(c.isalpha() for c in id_num) and not id_num.isdigit()):
-                                id_type = 'government' if '_RW' in id_num else 'passport'
-                            else:
-                                id_type = 'national_id'
-                            owner_data = {
-                                'name': name.strip(),
-                                'id_number': id_num,
-                                'id_type': id_type,
-                                'percentage': None,
-                                'number': num
-                            }
-                
-                if owner_data:
-                    # Check next lines for representative and address
-                    rep_info = None
-                    address = None
-                    
-                    j = i + 1
-                    while j < len(table_lines) and j < i + 3:
-                        next_line = table_lines[j].strip()
-                        if next_line and not re.match(r'^\d+\.', next_line):
-                            # Check for representative in parentheses
-                            rep_match = re.search(r'([A-Z\s]+)\s*\(([A-Z0-9_]{10,20})\)', next_line)
-                            if rep_match:
-                                rep_name, rep_id = rep_match.groups()
-                                rep_type = 'government' if '_RW' in rep_id else ('national_id' if rep_id.isdigit() and len(rep_id) == 16 else 'passport')
-                                rep_info = {
-                                    'name': rep_name.strip(),
-                                    'id_number': rep_id,
-                                    'id_type': rep_type
-                                }
-                                # Remaining part might be address
-                                address_part = next_line.replace(rep_match.group(0), '').strip()
-                                if address_part:
-                                    address = address_part
-                            elif ',' in next_line or 'City' in next_line or 'Province' in next_line:
-                                # This is likely address
-                                address = next_line
-                            j += 1
-                        else:
-                            break
-                    
-                    owner_data['representative'] = rep_info
-                    owner_data['address'] = address
-                    owners.append(owner_data)
-                    i = j
-                else:
-                    i += 1
-        
-        # Pattern 2: If no table found, parse lines directly
-        if not owners:
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                if not line:
-                    i += 1
-                    continue
-                
-                # Pattern for simple format with representative
-                # Handles: "1. BUTARE ROBERT 1195880001032090 100.00 BUTARE ROBERT (1195880001032090)"
-                simple_match = re.match(r'^(\d+)\.\s+([A-Z\s]+?)\s+([A-Z0-9_]{10,20})\s+(\d+\.?\d*)\s+(.*)$', line)
-                if simple_match:
-                    num, name, id_num, percentage, rest = simple_match.groups()
-                    if '_RW' in id_num or (id_num.isalnum() and any(c.isalpha() for c in id_num) and not id_num.isdigit()):
-                        id_type = 'government' if '_RW' in id_num else 'passport'
-                    else:
-                        id_type = 'national_id'
-                    owner = {
-                        'name': name.strip(),
-                        'id_number': id_num,
-                        'id_type': id_type,
-                        'percentage': percentage,
-                        'number': num
-                    }
-                    
-                    # Extract representative from rest
-                    rep_match = re.search(r'([A-Z\s]+)\s*\(([A-Z0-9_]{10,20})\)', rest)
-                    if rep_match:
-                        rep_name, rep_id = rep_match.groups()
-                        rep_type = 'government' if '_RW' in rep_id else ('national_id' if rep_id.isdigit() and len(rep_id) == 16 else 'passport')
-                        owner['representative'] = {
-                            'name': rep_name.strip(),
-                            'id_number': rep_id,
-                            'id_type': rep_type
-                        }
-                        # Address is after representative
-                        address_part = rest.replace(rep_match.group(0), '').strip()
-                        if address_part:
-                            owner['address'] = address_part
-                    elif ',' in rest or 'City' in rest:
-                        owner['address'] = rest
-                    
-                    owners.append(owner)
-                    i += 1
-                    continue
-                
-                # Pattern for Kinyarwanda format with separate address lines
-                kinya_match = re.match(r'^(\d+)\.\s+([A-Z\s]+?)\s+(\d{16})\s+(\d+\.?\d*)$', line)
-                if kinya_match:
-                    num, name, id_num, percentage = kinya_match.groups()
-                    owner = {
-                        'name': name.strip(),
-                        'id_number': id_num,
-                        'id_type': 'national_id',
-                        'percentage': percentage,
-                        'number': num
-                    }
-                    
-                    # Check next lines for representative/address
-                    if i + 1 < len(lines):
-                        next_line = lines[i + 1].strip()
-                        if next_line and not re.match(r'^\d+\.', next_line):
-                            rep_match = re.search(r'([A-Z\s]+)\s*\((\d{16})\)', next_line)
-                            if rep_match:
-                                rep_name, rep_id = rep_match.groups()
-                                owner['representative'] = {
-                                    'name': rep_name.strip(),
-                                    'id_number': rep_id,
-                                    'id_type': 'national_id'
-                                }
-                                address_part = next_line.replace(rep_match.group(0), '').strip()
-                                if address_part:
-                                    owner['address'] = address_part
-                            else:
-                                owner['address'] = next_line
-                            i += 1
-                    
-                    owners.append(owner)
-                    i += 1
-                    continue
-                
-                # Pattern for simple numbered owner without representative
-                simple_num_match = re.match(r'^(\d+)\.\s+([A-Z\s]+?)\s+(\d{16})\s+(\d+\.?\d*)', line)
-                if simple_num_match:
-                    num, name, id_num, percentage = simple_num_match.groups()
-                    owners.append({
-                        'name': name.strip(),
-                        'id_number': id_num,
-                        'id_type': 'national_id',
-                        'percentage': percentage,
-                        'number': num
-                    })
-                    i += 1
-                    continue
-                
-                i += 1
-        
-        # Pattern 3: Extract any remaining 16-digit National IDs with names
-        for line in lines:
-            id_matches = re.finditer(r'\b(\d{16})\b', line)
-            for id_match in id_matches:
-                id_number = id_match.group(1)
-                if any(o.get('id_number') == id_number for o in owners):
-                    continue
-                
-                before_id = line[:id_match.start()].strip()
-                name_parts = []
-                for part in before_id.split():
-                    cleaned = re.sub(r'^\d+\.', '', part).strip()
-                    if cleaned and cleaned.isalpha() and (cleaned.isupper() or cleaned.istitle()):
-                        name_parts.append(cleaned)
-                
-                if name_parts:
-                    name = ' '.join(name_parts)
-                    after_id = line[id_match.end():].strip()
-                    percent_match = re.search(r'(\d+\.?\d*)', after_id)
-                    percentage = percent_match.group(1) if percent_match and after_id and after_id[0].isdigit() else None
-                    
-                    owners.append({
-                        'name': name,
-                        'id_number': id_number,
-                        'id_type': 'national_id',
-                        'percentage': percentage,
-                        'raw_line': line
-                    })
-        
-        # Pattern 4: Extract government/passport format with underscore (e.g., 107433062_RW)
-        for line in lines:
-            passport_matches = re.finditer(r'\b([A-Z0-9]+_[A-Z0-9]+)\b', line)
-            for p_match in passport_matches:
-                passport_number = p_match.group(1)
-                if any(o.get('id_number') == passport_number for o in owners):
-                    continue
-                
-                before_id = line[:p_match.start()].strip()
-                name_parts = re.findall(r'\b[A-Z\s]+\b', before_id)
-                if name_parts:
-                    name = name_parts[-1].strip() if name_parts else before_id
-                    id_type = 'government' if '_RW' in passport_number else 'passport'
-                    owners.append({
-                        'name': name,
-                        'id_number': passport_number,
-                        'id_type': id_type,
-                        'percentage': '100.00',
-                        'raw_line': line
-                    })
-        
-        # Pattern 5: Extract from lessee representative section
-        rep_section = re.search(r'Lessee representative\s*([A-Z\s]+)', text_clean, re.IGNORECASE)
-        if rep_section:
-            rep_name = rep_section.group(1).strip()
-            rep_exists = any(o.get('name') == rep_name for o in owners)
-            if not rep_exists:
-                owners.append({
-                    'name': rep_name,
-                    'id_number': None,
-                    'id_type': 'representative',
-                    'percentage': None,
-                    'is_representative': True
-                })
-        
-        # Deduplicate by ID number
-        seen_ids = set()
-        unique_owners = []
-        for owner in owners:
-            if owner.get('id_number') and owner['id_number'] not in seen_ids:
-                seen_ids.add(owner['id_number'])
-                unique_owners.append(owner)
-            elif not owner.get('id_number'):
-                unique_owners.append(owner)
-        
-        return unique_owners
+    normalized_ocr_owners = normalize_ocr_owners(extract_title_owners(gray, ocr_text, ocr_engine))
     
-    def normalize_name(name):
-        """Normalize name for comparison"""
-        if not name:
-            return ""
-        parts = name.upper().split()
-        return " ".join(parts)
-    
-    # Extract owners using robust method
-    ocr_owners = extract_owners_robust(ocr_text)
-    
-    # Prepare normalized list for comparison
-    normalized_ocr_owners = [
-        {
-            "name": normalize_name(o["name"]),
-            "id_number": o.get("id_number", ""),
-            "id_type": o.get("id_type", "unknown"),
-            "percentage": o.get("percentage"),
-            "is_representative": o.get("is_representative", False),
-            "address": o.get("address")
-        }
-        for o in ocr_owners
-    ]
-    
-    # Debug logging
-    print("="*50)
-    print(f"EXTRACTED {len(normalized_ocr_owners)} OWNER(S):")
-    print("="*50)
-    for owner in normalized_ocr_owners:
-        print(f"Name: {owner['name']}")
-        print(f"ID Number: {owner['id_number']}")
-        print(f"ID Type: {owner['id_type']}")
-        if owner.get('percentage'):
-            print(f"Percentage: {owner['percentage']}%")
-        if owner.get('is_representative'):
-            print(f"Role: Representative")
-        if owner.get('address'):
-            print(f"Address: {owner['address']}")
-        print("-"*30)
+    logging.debug(
+        "[verify-pdf] extracted %d owner(s): %s",
+        len(normalized_ocr_owners),
+        [(o["name"], o["id_number"], o["id_type"]) for o in normalized_ocr_owners],
+    )
     
     if not upi and not detected_wkt:
         raise HTTPException(
@@ -1554,7 +1285,6 @@ async def verify_pdf(
             details["_owners"] = result_dict["data"].get("owners") or []
             details["_parcelRepresentative"] = result_dict["data"].get("parcelRepresentative") or {}
         except Exception as e:
-            import logging
             logging.error(f"[verify-pdf] Error fetching parcel info for UPI {upi}: {e}")
             details = backup_details
             result_dict = {}
@@ -1579,42 +1309,7 @@ async def verify_pdf(
                 detail={"message": "This title is not valid. Parcel boundary data is missing."}
             )
         
-        # Extract owners from NLA/registry robustly
-        nla_owners_raw = details.get("_owners") or details.get("owners") or []
-        nla_owners = []
-        for owner in nla_owners_raw:
-            name = owner.get("fullName") or owner.get("name") or ""
-            id_number = owner.get("idNo") or owner.get("id_number") or ""
-            # Determine ID type
-            if '_RW' in id_number:
-                id_type = 'government'
-            elif id_number and len(id_number) == 16 and id_number.isdigit():
-                id_type = 'national_id'
-            elif id_number and any(c.isalpha() for c in id_number):
-                id_type = 'passport'
-            else:
-                id_type = 'unknown'
-            nla_owners.append({
-                "name": normalize_name(name),
-                "id_number": id_number.strip(),
-                "id_type": id_type,
-                "percentage": owner.get("percentage") or owner.get("share"),
-                "address": owner.get("address")
-            })
-        
-        # Also add representative if exists
-        rep = details.get("_parcelRepresentative") or details.get("parcelRepresentative") or {}
-        if rep and rep.get("name"):
-            rep_id = rep.get("idNo") or rep.get("id_number") or ""
-            rep_type = 'government' if '_RW' in rep_id else ('national_id' if rep_id and len(rep_id) == 16 and rep_id.isdigit() else 'passport')
-            nla_owners.append({
-                "name": normalize_name(rep.get("name")),
-                "id_number": rep_id,
-                "id_type": rep_type,
-                "percentage": None,
-                "address": rep.get("address"),
-                "is_representative": True
-            })
+        nla_owners = registry_owners_from_details(details)
         
         # Prepare extracted_info and registry_info
         def filter_info(info):
@@ -1634,73 +1329,8 @@ async def verify_pdf(
         registry_info["owners"] = nla_owners
         
         # Owner comparison scoring
-        from rapidfuzz import fuzz
-        
-        def compare_owners(ocr_owner, reg_owner):
-            """Compare owners handling National ID, Passport, and Government IDs"""
-            id_match = (ocr_owner["id_number"] == reg_owner["id_number"])
-            
-            if id_match:
-                return True, 100, "exact_id_match"
-            
-            name_score = fuzz.ratio(ocr_owner["name"], reg_owner["name"])
-            
-            # For National IDs, check if they differ by 1-2 digits
-            if len(ocr_owner["id_number"]) == 16 and len(reg_owner["id_number"]) == 16:
-                diff_count = sum(1 for a, b in zip(ocr_owner["id_number"], reg_owner["id_number"]) if a != b)
-                if diff_count <= 2 and name_score > 85:
-                    return True, name_score, "fuzzy_match_high_confidence"
-            
-            if name_score > 85:
-                return True, name_score, "fuzzy_match_name"
-            
-            return False, name_score, "no_match"
-        
         total = len(normalized_ocr_owners)
-        matched = 0
-        detailed_matches = []
-        used_reg_indices = set()
-        
-        for ocr_owner in normalized_ocr_owners:
-            best_score = 0
-            best_reg_index = -1
-            best_match_type = "no_match"
-            is_match = False
-            
-            for idx, reg_owner in enumerate(nla_owners):
-                if idx in used_reg_indices:
-                    continue
-                
-                match_result, score, match_type = compare_owners(ocr_owner, reg_owner)
-                if score > best_score:
-                    best_score = score
-                    best_reg_index = idx
-                    best_match_type = match_type
-                    is_match = match_result
-            
-            if is_match and best_reg_index >= 0:
-                matched += 1
-                used_reg_indices.add(best_reg_index)
-                detailed_matches.append({
-                    "ocr_owner": ocr_owner,
-                    "registry_owner": nla_owners[best_reg_index],
-                    "match_score": best_score,
-                    "match_type": best_match_type,
-                    "matched": True
-                })
-            else:
-                detailed_matches.append({
-                    "ocr_owner": ocr_owner,
-                    "registry_owner": None,
-                    "match_score": best_score,
-                    "match_type": best_match_type,
-                    "matched": False
-                })
-        
-        extra_reg_owners = []
-        for idx, reg_owner in enumerate(nla_owners):
-            if idx not in used_reg_indices:
-                extra_reg_owners.append(reg_owner)
+        detailed_matches, extra_reg_owners, matched = match_owners(normalized_ocr_owners, nla_owners)
         
         fraud_score = int((matched / total) * 100) if total > 0 else 0
         if fraud_score == 100 and len(extra_reg_owners) == 0:
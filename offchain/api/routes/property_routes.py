@@ -11,7 +11,6 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
-import httpx
 import re
 
 from config.config import settings
@@ -20,6 +19,8 @@ from data.database.database import get_db, get_liip_db
 from data.models.models import Property, PropertyCategory, PropertySubCategory, PropertyImage, User, AgencyOrBroker, AgencyUser
 from data.services.otp_service import OTPService
 from data.services.notification_service import NotificationService
+from data.services.circuit_breaker import CircuitOpenError
+from data.services.http_clients import HttpClientRegistry
 from api.middlewares.auth import get_current_user, get_optional_user, require_admin
 
 router = APIRouter()
@@ -495,8 +496,7 @@ async def create_property(property: dict = Body(...), db: AsyncSession = Depends
         try:
             endpoint = getattr(settings, "PARCEL_INFORMATION_IP_ADDRESS", None)
             if endpoint:
-                async with httpx.AsyncClient(timeout=15) as client:
-                    resp = await client.get(endpoint.rstrip('/') + f"?upi={data.get('upi')}")
+                resp = await HttpClientRegistry.coalesced_get("nla", endpoint.rstrip('/') + f"?upi={data.get('upi')}")
                 if resp.status_code == 200:
                     try:
                         parcel_json = resp.json()
@@ -1131,8 +1131,7 @@ async def change_property_status(property_id: int, payload: dict = Body(...), db
                     if not phone_nid_endpoint:
                         raise HTTPException(status_code=500, detail='NID_BY_PHONE_NUMBER_ENDPOINT not configured')
                     try:
-                        async with httpx.AsyncClient(timeout=15) as client:
-                            resp_phone = await client.get(phone_nid_endpoint.rstrip('/') + f"/phoneuser/{rep_phone}")
+                        resp_phone = await HttpClientRegistry.coalesced_get("identity", phone_nid_endpoint.rstrip('/') + f"/phoneuser/{rep_phone}")
                         if resp_phone.status_code == 200:
                             try:
                                 phone_json = resp_phone.json()
@@ -1368,8 +1367,7 @@ async def _compare_parcel_risk_fields(obj, db: AsyncSession):
         if not endpoint:
             return {'ok': True, 'differences': [], 'remote': None, 'local': _maybe_parse_json_field(getattr(obj, 'parcel_information', None) or {})}
 
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(endpoint.rstrip('/') + f"?upi={upi}")
+        resp = await HttpClientRegistry.coalesced_get("nla", endpoint.rstrip('/') + f"?upi={upi}")
         if resp.status_code != 200:
             raise HTTPException(status_code=502, detail='Failed to fetch parcel information from external service')
         try:
@@ -1508,8 +1506,7 @@ async def reverify_property_upi(property_id: int, db: AsyncSession = Depends(get
         raise HTTPException(status_code=501, detail='Parcel information endpoint not configured')
 
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(endpoint.rstrip('/') + f"?upi={upi}")
+        resp = await HttpClientRegistry.coalesced_get("nla", endpoint.rstrip('/') + f"?upi={upi}")
         if resp.status_code != 200:
             raise HTTPException(status_code=502, detail='Failed to fetch parcel information from external service')
         try:
@@ -1523,6 +1520,12 @@ async def reverify_property_upi(property_id: int, db: AsyncSession = Depends(get
             p = remote_json
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f'Parcel registry unavailable: {e}',
+            headers={'Retry-After': str(max(1, int(e.retry_after)))},
+        )
     except Exception as e:
         raise HTTPException(status_code=502, detail=f'Error fetching parcel information: {e}')
 
@@ -2017,8 +2020,7 @@ async def update_property(property_id: int, property: dict = Body(...), db: Asyn
         try:
             endpoint = getattr(settings, "PARCEL_INFORMATION_IP_ADDRESS", None)
             if endpoint:
-                async with httpx.AsyncClient(timeout=15) as client:
-                    resp = await client.get(endpoint.rstrip('/') + f"?upi={data.get('upi')}")
+                resp = await HttpClientRegistry.coalesced_get("nla", endpoint.rstrip('/') + f"?upi={data.get('upi')}")
                 if resp.status_code == 200:
                     try:
                         parcel_json = resp.json()
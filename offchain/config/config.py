@@ -91,7 +91,80 @@ class Settings(BaseSettings):
     SMS_SEND: Optional[str] = Field(default=None, env="SMS_SEND")
     SMS_USERNAME: Optional[str] = Field(default=None, env="SMS_USERNAME")
     SMS_PASSWORD: Optional[str] = Field(default=None, env="SMS_PASSWORD")
-    
+
+    # OCR Configuration
+    OCR_BACKEND: str = Field(default="auto", env="OCR_BACKEND")  # auto | tesserocr | pytesseract
+    OCR_LANG: str = Field(default="eng+kin", env="OCR_LANG")
+    TESSDATA_PATH: Optional[str] = Field(default=None, env="TESSDATA_PATH")
+    OCR_POOL_WORKERS: int = Field(default=4, env="OCR_POOL_WORKERS")
+    # multiscale | legacy, per purpose; extract stays legacy until the benchmark shows IoU parity
+    PARCEL_DETECTOR_EXTRACT: str = Field(default="legacy", env="PARCEL_DETECTOR_EXTRACT")
+    PARCEL_DETECTOR_VERIFY: str = Field(default="multiscale", env="PARCEL_DETECTOR_VERIFY")
+
+    # Title ingestion
+    NLA_MAX_CONCURRENCY: int = Field(default=8, env="NLA_MAX_CONCURRENCY")
+    BATCH_INGEST_MAX_FILES: int = Field(default=500, env="BATCH_INGEST_MAX_FILES")
+    BATCH_INGEST_MAX_FILE_MB: int = Field(default=25, env="BATCH_INGEST_MAX_FILE_MB")
+    BATCH_INGEST_CHUNK_SIZE: int = Field(default=100, env="BATCH_INGEST_CHUNK_SIZE")
+
+    # Upstream HTTP clients (seconds)
+    HTTP_CONNECT_TIMEOUT: float = Field(default=5.0, env="HTTP_CONNECT_TIMEOUT")
+    NLA_HTTP_TIMEOUT: float = Field(default=20.0, env="NLA_HTTP_TIMEOUT")
+    NLA_TITLE_HTTP_TIMEOUT: float = Field(default=120.0, env="NLA_TITLE_HTTP_TIMEOUT")
+    LAIS_HTTP_TIMEOUT: float = Field(default=20.0, env="LAIS_HTTP_TIMEOUT")
+    IDENTITY_HTTP_TIMEOUT: float = Field(default=15.0, env="IDENTITY_HTTP_TIMEOUT")
+    SMS_HTTP_TIMEOUT: float = Field(default=15.0, env="SMS_HTTP_TIMEOUT")
+    NLA_HTTP_MAX_CONNECTIONS: int = Field(default=50, env="NLA_HTTP_MAX_CONNECTIONS")
+
+    # Upstream circuit breakers and adaptive timeouts
+    CIRCUIT_WINDOW_SECONDS: int = Field(default=60, env="CIRCUIT_WINDOW_SECONDS")
+    CIRCUIT_MIN_CALLS: int = Field(default=10, env="CIRCUIT_MIN_CALLS")
+    CIRCUIT_FAILURE_RATIO: float = Field(default=0.5, env="CIRCUIT_FAILURE_RATIO")
+    CIRCUIT_SLOW_CALL_SECONDS: float = Field(default=10.0, env="CIRCUIT_SLOW_CALL_SECONDS")
+    CIRCUIT_SLOW_CALL_RATIO: float = Field(default=0.8, env="CIRCUIT_SLOW_CALL_RATIO")
+    CIRCUIT_OPEN_SECONDS: int = Field(default=30, env="CIRCUIT_OPEN_SECONDS")
+    ADAPTIVE_TIMEOUT_MULTIPLIER: float = Field(default=3.0, env="ADAPTIVE_TIMEOUT_MULTIPLIER")
+    ADAPTIVE_TIMEOUT_MIN_SECONDS: float = Field(default=2.0, env="ADAPTIVE_TIMEOUT_MIN_SECONDS")
+
+    # Title data cache (UpiBackup): served as-is while fresh, served and refreshed
+    # in the background while stale, re-fetched from NLA once past the stale window
+    TITLE_DATA_FRESH_TTL_SECONDS: int = Field(default=6 * 3600, env="TITLE_DATA_FRESH_TTL_SECONDS")
+    TITLE_DATA_STALE_TTL_SECONDS: int = Field(default=7 * 24 * 3600, env="TITLE_DATA_STALE_TTL_SECONDS")
+    TITLE_DATA_BATCH_MAX_UPIS: int = Field(default=500, env="TITLE_DATA_BATCH_MAX_UPIS")
+    TITLE_DATA_REFRESH_ENABLED: bool = Field(default=True, env="TITLE_DATA_REFRESH_ENABLED")
+    TITLE_DATA_REFRESH_INTERVAL_SECONDS: int = Field(default=60, env="TITLE_DATA_REFRESH_INTERVAL_SECONDS")
+    TITLE_DATA_REFRESH_PER_MINUTE: int = Field(default=30, env="TITLE_DATA_REFRESH_PER_MINUTE")
+
+    # Citizen / phone-number lookup cache (in-process, hashed keys)
+    LOOKUP_CACHE_TTL_SECONDS: int = Field(default=3600, env="LOOKUP_CACHE_TTL_SECONDS")
+    LOOKUP_CACHE_NEGATIVE_TTL_SECONDS: int = Field(default=300, env="LOOKUP_CACHE_NEGATIVE_TTL_SECONDS")
+    LOOKUP_CACHE_MAX_ENTRIES: int = Field(default=10000, env="LOOKUP_CACHE_MAX_ENTRIES")
+
+    # E-title PDF disk cache
+    TITLE_PDF_CACHE_DIR: str = Field(default="assets/title_pdf_cache", env="TITLE_PDF_CACHE_DIR")
+    TITLE_PDF_CACHE_MAX_MB: int = Field(default=2048, env="TITLE_PDF_CACHE_MAX_MB")
+    TITLE_PDF_CACHE_TTL_SECONDS: int = Field(default=24 * 3600, env="TITLE_PDF_CACHE_TTL_SECONDS")
+
+    # GeoAI feature store: how often a prediction may trigger an incremental sync
+    FEATURE_STORE_SYNC_SECONDS: int = Field(default=30, env="FEATURE_STORE_SYNC_SECONDS")
+
+    # GeoAI columnar feature snapshots (Arrow IPC, memory-mapped by workers)
+    GEOAI_SNAPSHOT_DIR: str = Field(default="assets/geoai_snapshots", env="GEOAI_SNAPSHOT_DIR")
+    GEOAI_SNAPSHOT_MAX_AGE_SECONDS: int = Field(default=3600, env="GEOAI_SNAPSHOT_MAX_AGE_SECONDS")
+    GEOAI_SNAPSHOT_KEEP: int = Field(default=3, env="GEOAI_SNAPSHOT_KEEP")
+
+    # Precomputed GeoAI scores (geoai_scores): re-score changed parcels in the background
+    GEOAI_SCORE_REFRESH_ENABLED: bool = Field(default=True, env="GEOAI_SCORE_REFRESH_ENABLED")
+    GEOAI_SCORE_REFRESH_INTERVAL_SECONDS: int = Field(default=300, env="GEOAI_SCORE_REFRESH_INTERVAL_SECONDS")
+
+    # GeoAI training worker (scripts/train_geoai.py): killed and marked failed after this long
+    GEOAI_TRAINING_TIMEOUT_SECONDS: int = Field(default=3600, env="GEOAI_TRAINING_TIMEOUT_SECONDS")
+    # Cores shared by the concurrently trained models (0 = all); rounds without improvement before stopping
+    GEOAI_TRAINING_THREADS: int = Field(default=0, env="GEOAI_TRAINING_THREADS")
+    GEOAI_EARLY_STOPPING_ROUNDS: int = Field(default=30, env="GEOAI_EARLY_STOPPING_ROUNDS")
+    # How often a prediction may check models/latest.json for a new version to hot-swap
+    GEOAI_MODEL_WATCH_SECONDS: int = Field(default=5, env="GEOAI_MODEL_WATCH_SECONDS")
+
     @property
     def DATABASE_URL(self) -> str:
         """Generate database URL for SQLAlchemy"""
@@ -0,0 +1,105 @@
+"""
+Bulk upsert helper on PostgreSQL INSERT ... ON CONFLICT DO UPDATE
+
+Writes many rows per round-trip as one multi-row INSERT, and lets the
+database resolve insert-vs-update atomically, instead of selecting each row
+and then inserting or mutating it through the ORM (which costs a round-trip
+per row and races with concurrent writers of the same key).
+
+Usage:
+    rows = await bulk_upsert(
+        db, Mapping, [fields, ...],
+        index_elements=["upi"],
+        returning=[Mapping.id, Mapping.upi, INSERTED],
+    )
+    created = sum(1 for r in rows if r.inserted)
+
+Tables with a `content_hash` column get it filled from the row (see
+`content_fingerprint`). With `skip_unchanged=True` rows whose hash matches
+the stored one are left untouched (no write, `updated_at` kept) and are not
+returned, so `len(rows) - len(result)` is the unchanged count.
+
+Pass `returning=[Mapping]` to get ORM objects back (refreshed from the row).
+The caller owns the transaction; nothing is committed here.
+"""
+
+from typing import Any, Iterable, List, Optional, Sequence
+
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from pkg.utils.utils import content_fingerprint
+
+# asyncpg caps a statement at 32767 bind parameters
+_MAX_BIND_PARAMS = 32767
+
+# RETURNING column that is true for inserted rows and false for updated ones
+INSERTED = literal_column("(xmax = 0)").label("inserted")
+
+
+async def bulk_upsert(
+    db: AsyncSession,
+    model,
+    rows: Iterable[dict],
+    index_elements: Sequence[str] = ("upi",),
+    update_columns: Optional[Sequence[str]] = None,
+    returning: Optional[Sequence[Any]] = None,
+    chunk_size: int = 1000,
+    skip_unchanged: bool = False,
+    fingerprint_exclude: Sequence[str] = (),
+) -> List[Any]:
+    """
+    Upsert `rows` into `model`'s table, keyed on `index_elements` (which must
+    be covered by a unique index). On conflict every supplied column except
+    the key is overwritten, or only `update_columns` when given. All rows must
+    carry the same keys. Later duplicates of a key win.
+
+    `fingerprint_exclude` lists fields left out of the content hash (e.g.
+    values that change on every run).
+
+    Returns the RETURNING rows (empty list when `returning` is None).
+    """
+    table_columns = model.__table__.columns
+    fingerprinted = "content_hash" in table_columns
+    exclude = tuple(fingerprint_exclude) + ("content_hash",)
+    by_key = {}
+    for row in rows:
+        if fingerprinted and "content_hash" not in row:
+            row = {**row, "content_hash": content_fingerprint(row, exclude=exclude)}
+        by_key[tuple(row[col] for col in index_elements)] = row
+    unique_rows = list(by_key.values())
+    if not unique_rows:
+        return []
+
+    columns = list(unique_rows[0].keys())
+    if update_columns is None:
+        update_columns = [col for col in columns if col not in index_elements]
+    elif fingerprinted and "content_hash" not in update_columns:
+        update_columns = list(update_columns) + ["content_hash"]
+    touch_updated_at = "updated_at" in table_columns and "updated_at" not in update_columns
+
+    per_chunk = max(1, min(chunk_size, _MAX_BIND_PARAMS // max(1, len(columns))))
+    results: List[Any] = []
+    for start in range(0, len(unique_rows), per_chunk):
+        stmt = pg_insert(model).values(unique_rows[start:start + per_chunk])
+        set_ = {col: stmt.excluded[col] for col in update_columns}
+        if touch_updated_at:
+            # Column onupdate defaults do not fire for ON CONFLICT updates
+            set_["updated_at"] = func.now()
+        if set_:
+            where = None
+            if skip_unchanged and fingerprinted:
+                where = table_columns["content_hash"].is_distinct_from(stmt.excluded["content_hash"])
+            stmt = stmt.on_conflict_do_update(index_elements=list(index_elements), set_=set_, where=where)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+
+        if returning:
+            stmt = stmt.returning(*returning)
+            result = await db.execute(stmt, execution_options={"populate_existing": True})
+            results.extend(result.all())
+        else:
+            await db.execute(stmt)
+    return results
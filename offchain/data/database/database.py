@@ -59,6 +59,7 @@ async def init_db():
             # Import all models here to ensure they're registered
             from data.models import models
             from data.models import chat  # noqa: F401 — registers chat_sessions / chat_messages
+            from data.models import geoai  # noqa: F401 — registers geoai_scores
 
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,52 @@
+"""
+Postgres advisory lock keys
+
+Background jobs that run in every API worker use an advisory lock so only
+one worker does the work per tick. Each job gets its own key, derived from
+its name so keys are readable here and never collide by accident.
+
+Short jobs take a transaction-scoped lock inside their own transaction:
+
+    locked = (await db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": TITLE_DATA_REFRESH_LOCK}
+    )).scalar()
+
+Long jobs hold a session-level lock on a dedicated autocommit connection
+instead, so their work can commit in short transactions of its own rather
+than sit idle in one open transaction:
+
+    async with session_advisory_lock(GEOAI_SCORE_REFRESH_LOCK) as locked:
+        if locked:
+            ...
+"""
+
+import hashlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import text
+
+from data.database.database import engine
+
+
+def advisory_lock_key(name: str) -> int:
+    """Stable signed 64-bit key (the bigint pg_advisory_* functions take) for `name`."""
+    digest = hashlib.sha256(f"safeland:{name}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+TITLE_DATA_REFRESH_LOCK = advisory_lock_key("title_data_refresh")
+GEOAI_SCORE_REFRESH_LOCK = advisory_lock_key("geoai_score_refresh")
+
+
+@asynccontextmanager
+async def session_advisory_lock(key: int) -> AsyncIterator[bool]:
+    """Try a session-level advisory lock; yields whether it was taken and always releases it."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})).scalar()
+        try:
+            yield bool(locked)
+        finally:
+            if locked:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
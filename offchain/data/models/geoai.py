@@ -0,0 +1,74 @@
+"""
+GeoAI persistence: precomputed scores for the top-k endpoints and the
+training job log.
+"""
+
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from data.database.database import Base
+from data.models.mapping import Mapping  # noqa: F401 — FK target must be registered
+
+
+class GeoAIScore(Base):
+    """
+    Batch scores written by api.ml.geo_ai.scoring after training and when
+    parcels change. `model_version` is the bundle the scores came from, so
+    readers can ignore rows left over from an older model.
+    """
+    __tablename__ = "geoai_scores"
+
+    upi               = Column(String, ForeignKey("mappings.upi", ondelete="CASCADE"), primary_key=True)
+    model_version     = Column(String, nullable=False, index=True)
+
+    # copied from the mapping so top-k reads can filter without a join
+    district          = Column(String, nullable=True, index=True)
+    sector            = Column(String, nullable=True, index=True)
+
+    predicted_value        = Column(Float, nullable=True, index=True)
+    investment_probability = Column(Float, nullable=True, index=True)
+    risk_probability       = Column(Float, nullable=True, index=True)
+    growth_score           = Column(Float, nullable=True, index=True)
+    bank_score             = Column(Float, nullable=True, index=True)
+
+    computed_at       = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Training job states; queued and running count as active
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+ACTIVE_JOB_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+
+class TrainingJob(Base):
+    """
+    One POST /geoai/retrain run, executed by scripts/train_geoai.py in its own
+    process. The partial unique index allows at most one active job, so
+    concurrent retrain requests cannot start duplicate runs.
+    """
+    __tablename__ = "training_jobs"
+    __table_args__ = (
+        Index(
+            "uq_training_jobs_one_active",
+            text("(status IN ('queued', 'running'))"),
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id               = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    status           = Column(String, nullable=False, default=JOB_QUEUED, index=True)
+    pid              = Column(Integer, nullable=True)
+
+    requested_at     = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at       = Column(DateTime(timezone=True), nullable=True)
+    finished_at      = Column(DateTime(timezone=True), nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+
+    # e.g. {"valuation_rmse": ..., "risk_accuracy": ..., "records": ...}
+    metrics          = Column(JSONB, nullable=True)
+    model_version    = Column(String, nullable=True)
+    error            = Column(Text, nullable=True)
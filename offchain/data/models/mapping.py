@@ -79,11 +79,15 @@ class Mapping(Base):
     # --------------------------------
     # SYSTEM TIMESTAMPS
     # --------------------------------
+    # SHA-256 of the mapped registry fields; upserts skip rows whose hash is unchanged
+    content_hash = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Indexed: the GeoAI feature store syncs incrementally on it
     updated_at = Column(
         DateTime(timezone=True),
         server_default=func.now(),
-        onupdate=func.now()
+        onupdate=func.now(),
+        index=True
     )
 
     # --------------------------------
@@ -102,4 +106,15 @@ class UpiBackup(Base):
     __tablename__ = "upi_backup"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     upi = Column(String, nullable=False, index=True, unique=True)
-    upi_info = Column(JSONB, nullable=True)
\ No newline at end of file
+    upi_info = Column(JSONB, nullable=True)
+    # Set only when upi_info is a title-data payload fetched from NLA; rows
+    # without it (e.g. import skip notes) are never served from the cache.
+    language = Column(String, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), nullable=True)
+    # Maintained by the background refresher (data.services.title_data_refresher)
+    access_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_accessed_at = Column(DateTime(timezone=True), nullable=True)
+    last_refresh_at = Column(DateTime(timezone=True), nullable=True)
+    # SHA-256 of the normalized upi_info; changed_at moves only when it differs
+    content_hash = Column(String(64), nullable=True)
+    changed_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
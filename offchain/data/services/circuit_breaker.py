@@ -0,0 +1,184 @@
+"""
+Per-upstream circuit breakers and adaptive timeouts
+
+Each upstream client in `HttpClientRegistry` sends its requests through a
+`BreakerTransport`, which:
+
+- fails fast with `CircuitOpenError` while the breaker is open, so callers
+  drop straight to their cached/backup path instead of holding a DB session
+  and a worker for the full timeout;
+- records outcome and latency in a rolling window, and opens the breaker
+  when too many calls fail (exception or 5xx) or are slow;
+- after CIRCUIT_OPEN_SECONDS lets a single half-open probe through, which
+  closes the breaker on success and re-opens it on failure;
+- shrinks the read timeout to ADAPTIVE_TIMEOUT_MULTIPLIER x the observed p99
+  latency (never above the configured timeout, never below
+  ADAPTIVE_TIMEOUT_MIN_SECONDS). Probes always get the configured timeout.
+
+State is per process; `/health/upstreams` reports it.
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Successful calls needed before the timeout adapts to observed latency
+MIN_LATENCY_SAMPLES = 20
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Circuit open for upstream '{upstream}', retry in {retry_after:.0f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, configured_read_timeout: Optional[float]):
+        self.name = name
+        self.configured_read_timeout = configured_read_timeout
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        # (monotonic time, ok, slow) per call in the rolling window
+        self._window: Deque[Tuple[float, bool, bool]] = deque()
+        # latencies of recent successful calls, for the adaptive timeout
+        self._latencies: Deque[float] = deque(maxlen=500)
+
+    def _prune(self, now: float) -> None:
+        horizon = now - settings.CIRCUIT_WINDOW_SECONDS
+        while self._window and self._window[0][0] < horizon:
+            self._window.popleft()
+
+    def _open(self, now: float, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self.probe_in_flight = False
+        logger.warning(f"Circuit for upstream '{self.name}' opened: {reason}")
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError. Returns True for a half-open probe."""
+        now = time.monotonic()
+        if self.state == OPEN:
+            remaining = self.opened_at + settings.CIRCUIT_OPEN_SECONDS - now
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self.probe_in_flight:
+                raise CircuitOpenError(self.name, settings.CIRCUIT_OPEN_SECONDS)
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool, latency: float, probe: bool) -> None:
+        now = time.monotonic()
+        if probe:
+            self.probe_in_flight = False
+            if ok:
+                self.state = CLOSED
+                self._window.clear()
+                logger.info(f"Circuit for upstream '{self.name}' closed after successful probe")
+            else:
+                self._open(now, "half-open probe failed")
+            return
+
+        if ok:
+            self._latencies.append(latency)
+        slow = latency >= settings.CIRCUIT_SLOW_CALL_SECONDS
+        self._window.append((now, ok, slow))
+        self._prune(now)
+
+        if self.state != CLOSED or len(self._window) < settings.CIRCUIT_MIN_CALLS:
+            return
+        calls = len(self._window)
+        failures = sum(1 for _, call_ok, _ in self._window if not call_ok)
+        slow_calls = sum(1 for _, _, call_slow in self._window if call_slow)
+        if failures / calls >= settings.CIRCUIT_FAILURE_RATIO:
+            self._open(now, f"{failures}/{calls} calls failed")
+        elif slow_calls / calls >= settings.CIRCUIT_SLOW_CALL_RATIO:
+            self._open(now, f"{slow_calls}/{calls} calls slower than {settings.CIRCUIT_SLOW_CALL_SECONDS}s")
+
+    def p99(self) -> Optional[float]:
+        if len(self._latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.99 * len(ordered)) - 1)]
+
+    def read_timeout(self) -> Optional[float]:
+        configured = self.configured_read_timeout
+        p99 = self.p99()
+        if p99 is None or configured is None:
+            return configured
+        adaptive = max(p99 * settings.ADAPTIVE_TIMEOUT_MULTIPLIER, settings.ADAPTIVE_TIMEOUT_MIN_SECONDS)
+        return min(adaptive, configured)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        calls = len(self._window)
+        failures = sum(1 for _, ok, _ in self._window if not ok)
+        p99 = self.p99()
+        retry_after = None
+        if self.state == OPEN:
+            retry_after = max(0.0, round(self.opened_at + settings.CIRCUIT_OPEN_SECONDS - time.monotonic(), 1))
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "window_failures": failures,
+            "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+            "read_timeout_s": self.read_timeout(),
+            "configured_read_timeout_s": self.configured_read_timeout,
+            "times_opened": self.times_opened,
+            "retry_after_s": retry_after,
+        }
+
+
+class BreakerTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport of one upstream client with its breaker."""
+
+    def __init__(self, breaker: CircuitBreaker, inner: httpx.AsyncBaseTransport):
+        self.breaker = breaker
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        probe = self.breaker.before_call()
+        if not probe:
+            timeout = dict(request.extensions.get("timeout") or {})
+            adaptive = self.breaker.read_timeout()
+            current = timeout.get("read")
+            if adaptive is not None and (current is None or adaptive < current):
+                timeout["read"] = adaptive
+                request.extensions["timeout"] = timeout
+
+        started = time.monotonic()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started, probe)
+            raise
+        except BaseException:
+            # Cancelled by the caller: no verdict, but free the probe slot
+            if probe:
+                self.breaker.probe_in_flight = False
+            raise
+        self.breaker.record(response.status_code < 500, time.monotonic() - started, probe)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
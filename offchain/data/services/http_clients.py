@@ -0,0 +1,168 @@
+"""
+Shared HTTP clients for upstream government services (NLA, LAIS, Irembo/NIDA, SMS)
+
+One pooled `httpx.AsyncClient` per upstream, kept alive for the lifetime of
+the app, so calls reuse TCP/TLS connections instead of paying the handshake
+on every request. Each upstream has its own pool limits and timeouts.
+HTTP/2 is negotiated through `h2` (in requirements.txt); an environment
+without it falls back to HTTP/1.1. Every client goes through its upstream's
+circuit breaker (see `circuit_breaker`).
+
+The app lifespan calls `HttpClientRegistry.startup()` / `close()`. Clients
+are also created lazily on first use, so scripts and background jobs work
+without the lifespan.
+
+Usage:
+    client = HttpClientRegistry.get("nla")
+    resp = await client.get(url)
+
+    # Idempotent lookups: identical concurrent GETs share one upstream call
+    resp = await HttpClientRegistry.coalesced_get("nla", url)
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401 — enables HTTP/2 in httpx
+except ImportError:
+    h2 = None
+
+from config.config import settings
+from data.services.circuit_breaker import BreakerTransport, CircuitBreaker
+from pkg.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    timeout: httpx.Timeout
+    max_connections: int
+    max_keepalive: int
+    keepalive_expiry: float = 30.0
+
+
+def _upstreams() -> Dict[str, UpstreamConfig]:
+    connect = settings.HTTP_CONNECT_TIMEOUT
+    return {
+        # NLA parcel / title data JSON APIs
+        "nla": UpstreamConfig(
+            timeout=httpx.Timeout(settings.NLA_HTTP_TIMEOUT, connect=connect),
+            max_connections=settings.NLA_HTTP_MAX_CONNECTIONS,
+            max_keepalive=20,
+        ),
+        # NLA e-title PDF downloads: slow bodies, few connections
+        "nla_title": UpstreamConfig(
+            timeout=httpx.Timeout(settings.NLA_TITLE_HTTP_TIMEOUT, connect=connect),
+            max_connections=10,
+            max_keepalive=5,
+        ),
+        # LAIS (UPIs by owner, tax arrears)
+        "lais": UpstreamConfig(
+            timeout=httpx.Timeout(settings.LAIS_HTTP_TIMEOUT, connect=connect),
+            max_connections=20,
+            max_keepalive=10,
+        ),
+        # Citizen / phone-number lookups
+        "identity": UpstreamConfig(
+            timeout=httpx.Timeout(settings.IDENTITY_HTTP_TIMEOUT, connect=connect),
+            max_connections=20,
+            max_keepalive=10,
+        ),
+        "sms": UpstreamConfig(
+            timeout=httpx.Timeout(settings.SMS_HTTP_TIMEOUT, connect=connect),
+            max_connections=10,
+            max_keepalive=5,
+        ),
+    }
+
+
+class HttpClientRegistry:
+    _clients: Dict[str, httpx.AsyncClient] = {}
+    _breakers: Dict[str, CircuitBreaker] = {}
+    _config: Optional[Dict[str, UpstreamConfig]] = None
+    _lock = asyncio.Lock()
+    _flight = SingleFlight("upstream")
+
+    @classmethod
+    def _configs(cls) -> Dict[str, UpstreamConfig]:
+        if cls._config is None:
+            cls._config = _upstreams()
+        return cls._config
+
+    @classmethod
+    def breaker(cls, name: str) -> CircuitBreaker:
+        """Breaker for an upstream; kept across client rebuilds."""
+        if name not in cls._breakers:
+            cls._breakers[name] = CircuitBreaker(name, cls._configs()[name].timeout.read)
+        return cls._breakers[name]
+
+    @classmethod
+    def _build(cls, name: str) -> httpx.AsyncClient:
+        config = cls._configs()[name]
+        pool = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            http2=h2 is not None,
+        )
+        return httpx.AsyncClient(
+            timeout=config.timeout,
+            transport=BreakerTransport(cls.breaker(name), pool),
+        )
+
+    @classmethod
+    def get(cls, name: str) -> httpx.AsyncClient:
+        """Pooled client for an upstream; created on first use."""
+        if name not in cls._configs():
+            raise KeyError(f"Unknown upstream: {name}")
+        client = cls._clients.get(name)
+        if client is None or client.is_closed:
+            client = cls._build(name)
+            cls._clients[name] = client
+        return client
+
+    @classmethod
+    async def coalesced_get(cls, name: str, url: str, **kwargs) -> httpx.Response:
+        """
+        GET through the upstream's pooled client, sharing the response with any
+        identical request already in flight. The body is read before it is
+        shared, so every waiter can call .json() / .content independently.
+        """
+        key = (name, url, repr(sorted(kwargs.items())))
+        return await cls._flight.do(key, cls.get(name).get, url, **kwargs)
+
+    @classmethod
+    def coalescing_stats(cls) -> Dict[str, int]:
+        return cls._flight.stats()
+
+    @classmethod
+    def health(cls) -> Dict[str, dict]:
+        return {name: cls.breaker(name).snapshot() for name in cls._configs()}
+
+    @classmethod
+    async def startup(cls):
+        async with cls._lock:
+            for name in cls._configs():
+                cls.get(name)
+        logger.info(
+            f"HTTP clients ready for {', '.join(cls._clients)} "
+            f"(HTTP/2 {'on' if h2 is not None else 'off'})"
+        )
+
+    @classmethod
+    async def close(cls):
+        async with cls._lock:
+            clients, cls._clients = cls._clients, {}
+            for name, client in clients.items():
+                try:
+                    await client.aclose()
+                except Exception as e:
+                    logger.warning(f"Error closing HTTP client '{name}': {e}")
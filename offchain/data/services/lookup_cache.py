@@ -0,0 +1,144 @@
+"""
+TTL cache for upstream identity lookups (citizen, phone numbers, phone user)
+
+Entries go to the shared Redis cache (see `shared_cache`) when REDIS_URL is
+set, so every API worker answers from the same entries; otherwise each
+process keeps its own cachetools TTL caches.
+
+Keys are HMAC-SHA256 digests of (endpoint, identifier), keyed with
+JWT_SECRET, so national IDs and phone numbers never appear as cache keys.
+Successful answers live for LOOKUP_CACHE_TTL_SECONDS; upstream 404s are
+cached for LOOKUP_CACHE_NEGATIVE_TTL_SECONDS so repeated lookups of an
+unknown ID stop reaching the registry. Other failures are never cached.
+Hit/miss counters are per process.
+
+Usage:
+    cache = LookupCacheRegistry.get("citizen")
+    hit = await cache.get(nid)
+    if hit is None:
+        resp = await client.get(url)
+        hit = await cache.put(nid, resp.status_code, resp.content, content_type)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from config.config import settings
+from data.services.shared_cache import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedLookup:
+    status_code: int
+    content: bytes
+    media_type: str
+
+    @property
+    def negative(self) -> bool:
+        return self.status_code == 404
+
+
+class LookupCache:
+    def __init__(self, name: str):
+        self.name = name
+        self._positive = TTLCache(maxsize=settings.LOOKUP_CACHE_MAX_ENTRIES, ttl=settings.LOOKUP_CACHE_TTL_SECONDS)
+        self._negative = TTLCache(
+            maxsize=settings.LOOKUP_CACHE_MAX_ENTRIES, ttl=settings.LOOKUP_CACHE_NEGATIVE_TTL_SECONDS
+        )
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _key(self, identifier: str) -> str:
+        message = f"{self.name}:{identifier.strip()}".encode("utf-8")
+        return hmac.new(settings.JWT_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+    async def _shared_get(self, key: str) -> Optional[CachedLookup]:
+        try:
+            raw = await redis_client.get(f"lookup:{key}")
+        except Exception as e:
+            logger.warning(f"Shared lookup cache read failed: {e}")
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return CachedLookup(
+            status_code=data["status_code"],
+            content=base64.b64decode(data["content"]),
+            media_type=data["media_type"],
+        )
+
+    async def _shared_put(self, key: str, entry: CachedLookup, ttl: int) -> None:
+        data = {
+            "status_code": entry.status_code,
+            "content": base64.b64encode(entry.content).decode("ascii"),
+            "media_type": entry.media_type,
+        }
+        try:
+            await redis_client.set(f"lookup:{key}", json.dumps(data), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Shared lookup cache write failed: {e}")
+
+    async def get(self, identifier: str) -> Optional[CachedLookup]:
+        key = self._key(identifier)
+        if redis_client:
+            entry = await self._shared_get(key)
+        else:
+            entry = self._positive.get(key) or self._negative.get(key)
+        if entry is None:
+            self.misses += 1
+        elif entry.negative:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def put(self, identifier: str, status_code: int, content: bytes, media_type: str) -> CachedLookup:
+        entry = CachedLookup(status_code=status_code, content=content, media_type=media_type)
+        if 200 <= status_code < 300:
+            store, ttl = self._positive, settings.LOOKUP_CACHE_TTL_SECONDS
+        elif entry.negative:
+            store, ttl = self._negative, settings.LOOKUP_CACHE_NEGATIVE_TTL_SECONDS
+        else:
+            return entry
+        key = self._key(identifier)
+        if redis_client:
+            await self._shared_put(key, entry, ttl)
+        else:
+            store[key] = entry
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else None,
+            "backend": "redis" if redis_client else "memory",
+            "entries": len(self._positive),
+            "negative_entries": len(self._negative),
+        }
+
+
+class LookupCacheRegistry:
+    _caches: Dict[str, LookupCache] = {}
+
+    @classmethod
+    def get(cls, name: str) -> LookupCache:
+        if name not in cls._caches:
+            cls._caches[name] = LookupCache(name)
+        return cls._caches[name]
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        return {name: cache.stats() for name, cache in cls._caches.items()}
@@ -3,7 +3,6 @@ Notification service for sending emails and SMS
 """
 
 import smtplib
-import httpx
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,6 +13,7 @@ import logging
 from config.config import settings
 from data.models.models import NotificationLog
 from data.database.database import AsyncSessionLocal
+from data.services.http_clients import HttpClientRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -164,17 +164,16 @@ class NotificationService:
                 "sender_id": settings.SMS_SENDER_ID or "NLA",
             }
 
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                resp = await client.post(
-                    settings.SMS_SEND,
-                    json=payload,
-                    headers={"Authorization": f"Bearer {token}"}
-                )
-                if resp.status_code >= 400:
-                    notification_log.status = "failed"
-                    notification_log.error_message = f"SMS send failed: {resp.status_code} {resp.text}"
-                    await db.commit()
-                    return False
+            resp = await HttpClientRegistry.get("sms").post(
+                settings.SMS_SEND,
+                json=payload,
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            if resp.status_code >= 400:
+                notification_log.status = "failed"
+                notification_log.error_message = f"SMS send failed: {resp.status_code} {resp.text}"
+                await db.commit()
+                return False
 
             # Update log
             notification_log.status = "sent"
@@ -194,22 +193,21 @@ class NotificationService:
     async def _fetch_sms_token() -> Optional[str]:
         """Authenticate with SMS provider to get access token."""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(
-                    settings.SMS_AUTH,
-                    json={
-                        "api_username": settings.SMS_USERNAME,
-                        "api_password": settings.SMS_PASSWORD,
-                    },
-                )
-                if resp.status_code >= 400:
-                    logger.error(f"SMS auth failed: {resp.status_code} {resp.text}")
-                    return None
-                data = resp.json()
-                token = data.get("access_token")
-                if not token:
-                    logger.error("SMS auth response missing access_token")
-                return token
+            resp = await HttpClientRegistry.get("sms").post(
+                settings.SMS_AUTH,
+                json={
+                    "api_username": settings.SMS_USERNAME,
+                    "api_password": settings.SMS_PASSWORD,
+                },
+            )
+            if resp.status_code >= 400:
+                logger.error(f"SMS auth failed: {resp.status_code} {resp.text}")
+                return None
+            data = resp.json()
+            token = data.get("access_token")
+            if not token:
+                logger.error("SMS auth response missing access_token")
+            return token
         except Exception as e:
             logger.error(f"SMS auth error: {e}")
             return None
@@ -0,0 +1,27 @@
+"""
+Optional Redis client shared by the process-wide caches
+
+When REDIS_URL is set and a Redis client library is installed, caches that
+should be shared across API workers (the chat schema catalog, identity
+lookups) store their entries here. Otherwise `redis_client` is None and each
+cache falls back to its own in-process store.
+
+Usage:
+    from data.services.shared_cache import redis_client
+    if redis_client:
+        await redis_client.set(key, value, ex=ttl)
+"""
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    try:
+        import aioredis
+    except ImportError:
+        aioredis = None
+
+from config.config import settings
+
+redis_client = None
+if aioredis and settings.REDIS_URL:
+    redis_client = aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
@@ -0,0 +1,298 @@
+"""
+Stale-while-revalidate cache for NLA title data, backed by `UpiBackup`
+
+`UpiBackup` already holds the last NLA payload per UPI. Each row now records
+when it was fetched and in which language, so `/title_data` can answer from it:
+
+    age <= TITLE_DATA_FRESH_TTL_SECONDS   -> serve the row            (HIT)
+    age <= TITLE_DATA_STALE_TTL_SECONDS   -> serve the row and refresh
+                                             it in the background     (STALE)
+    older / unknown UPI / other language  -> fetch from NLA           (MISS)
+    refresh=True                          -> fetch from NLA           (BYPASS)
+    NLA failed, any row exists            -> serve the row            (BACKUP)
+
+Only successful title payloads are served from the cache; "not found" answers
+and rows written by other tools (no `fetched_at`) always go to NLA.
+
+Usage:
+    result = await TitleDataCache.get(upi, "english", db)
+    result.cache_status  # "HIT" | "STALE" | "MISS" | "BYPASS" | "BACKUP"
+"""
+
+import asyncio
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from config.config import settings
+from data.database.bulk import INSERTED
+from data.database.database import AsyncSessionLocal
+from data.models.mapping import UpiBackup
+from data.services.circuit_breaker import OPEN
+from data.services.http_clients import HttpClientRegistry
+from pkg.utils.utils import content_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class TitleDataUnavailable(Exception):
+    """NLA failed and there is no local copy to fall back on."""
+
+
+# Where an answer came from, as reported by the batch endpoint
+CACHE_STATUS_SOURCE = {
+    "HIT": "cache",
+    "STALE": "cache",
+    "MISS": "live",
+    "BYPASS": "live",
+    "BACKUP": "backup",
+}
+
+
+@dataclass
+class TitleDataResult:
+    cache_status: str
+    # Upstream answers are passed through byte-for-byte; cached ones are JSON
+    payload: Optional[Dict[str, Any]] = None
+    content: Optional[bytes] = None
+    status_code: int = 200
+    media_type: str = "application/json"
+
+    @property
+    def source(self) -> str:
+        return CACHE_STATUS_SOURCE[self.cache_status]
+
+    def json(self) -> Any:
+        if self.payload is not None:
+            return self.payload
+        return json.loads(self.content) if self.content else None
+
+
+def _title_data_url(upi: str, language: str) -> str:
+    endpoint = getattr(settings, "PARCEL_INFORMATION_IP_ADDRESS_GIS", None)
+    return endpoint.rstrip("/") + f"?upi={upi}&language={language}"
+
+
+def _is_title_payload(info) -> bool:
+    if not isinstance(info, dict):
+        return False
+    if info.get("success") is False or info.get("found") is False:
+        return False
+    return isinstance(info.get("data"), dict)
+
+
+class TitleDataCache:
+    _stats: Dict[str, int] = {
+        "hit": 0,
+        "stale": 0,
+        "miss": 0,
+        "bypass": 0,
+        "backup": 0,
+        "upstream_errors": 0,
+        "refreshes": 0,
+        "refresh_changed": 0,
+        "refresh_unchanged": 0,
+        "refresh_failures": 0,
+    }
+    _refreshing: Set[str] = set()
+    _tasks: Set[asyncio.Task] = set()
+    # Counted in memory and flushed in bulk by the refresher, not per request
+    _accesses: Counter = Counter()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        counts = dict(cls._stats)
+        served = counts["hit"] + counts["stale"] + counts["miss"] + counts["bypass"] + counts["backup"]
+        local = counts["hit"] + counts["stale"]
+        counts["requests"] = served
+        counts["hit_ratio"] = round(local / served, 4) if served else None
+        counts["refreshing"] = len(cls._refreshing)
+        counts["upstream_coalescing"] = HttpClientRegistry.coalescing_stats()
+        counts["fresh_ttl_seconds"] = settings.TITLE_DATA_FRESH_TTL_SECONDS
+        counts["stale_ttl_seconds"] = settings.TITLE_DATA_STALE_TTL_SECONDS
+        return counts
+
+    @classmethod
+    def _age_seconds(cls, row: UpiBackup) -> Optional[float]:
+        if row.fetched_at is None:
+            return None
+        fetched_at = row.fetched_at
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - fetched_at).total_seconds()
+
+    @classmethod
+    async def _fetch_upstream(cls, upi: str, language: str):
+        resp = await HttpClientRegistry.coalesced_get("nla", _title_data_url(upi, language))
+        resp.raise_for_status()
+        return resp, resp.json()
+
+    @classmethod
+    async def _store(cls, db: AsyncSession, upi: str, language: str, data) -> str:
+        """Upsert the payload. Returns "new", "changed" or "unchanged" (only freshness stamped)."""
+        content_hash = content_fingerprint(data)
+        stmt = pg_insert(UpiBackup).values(
+            upi=upi,
+            upi_info=data,
+            language=language,
+            content_hash=content_hash,
+            fetched_at=func.now(),
+            last_refresh_at=func.now(),
+            changed_at=func.now(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["upi"],
+            set_={
+                "upi_info": data,
+                "language": language,
+                "content_hash": content_hash,
+                "fetched_at": func.now(),
+                "last_refresh_at": func.now(),
+                "changed_at": func.now(),
+            },
+            where=or_(
+                UpiBackup.content_hash.is_distinct_from(stmt.excluded.content_hash),
+                UpiBackup.language.is_distinct_from(stmt.excluded.language),
+            ),
+        ).returning(INSERTED)
+        written = (await db.execute(stmt)).first()
+        if written is None:
+            # Same content: only record that it was confirmed fresh
+            await db.execute(
+                update(UpiBackup)
+                .where(UpiBackup.upi == upi)
+                .values(fetched_at=func.now(), last_refresh_at=func.now())
+            )
+        await db.commit()
+        if written is None:
+            return "unchanged"
+        return "new" if written.inserted else "changed"
+
+    @classmethod
+    async def _refresh(cls, upi: str, language: str) -> bool:
+        try:
+            _, data = await cls._fetch_upstream(upi, language)
+            # Keep the stale copy rather than overwrite it with a "not found"
+            if _is_title_payload(data):
+                async with AsyncSessionLocal() as db:
+                    outcome = await cls._store(db, upi, language, data)
+                cls._stats["refreshes"] += 1
+                cls._stats["refresh_unchanged" if outcome == "unchanged" else "refresh_changed"] += 1
+                return True
+        except Exception as e:
+            cls._stats["refresh_failures"] += 1
+            logger.warning(f"Background title data refresh failed for UPI {upi}: {e}")
+        finally:
+            cls._refreshing.discard(upi)
+        return False
+
+    @classmethod
+    async def refresh(cls, upi: str, language: str) -> bool:
+        """Refresh one UPI now unless a refresh is already running. True if the row was updated."""
+        if upi in cls._refreshing:
+            return False
+        cls._refreshing.add(upi)
+        return await cls._refresh(upi, language)
+
+    @classmethod
+    def drain_accesses(cls) -> Dict[str, int]:
+        """Per-UPI read counts since the last call, for the refresher to persist."""
+        accesses, cls._accesses = cls._accesses, Counter()
+        return dict(accesses)
+
+    @classmethod
+    def _schedule_refresh(cls, upi: str, language: str) -> None:
+        # No point queueing refreshes while NLA's breaker is failing fast
+        if upi in cls._refreshing or HttpClientRegistry.breaker("nla").state == OPEN:
+            return
+        cls._refreshing.add(upi)
+        task = asyncio.create_task(cls._refresh(upi, language))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    def _serve_cached(
+        cls, row: Optional[UpiBackup], upi: str, language: str, background_refresh: bool = True
+    ) -> Optional[TitleDataResult]:
+        if row is None or row.language != language or not _is_title_payload(row.upi_info):
+            return None
+        age = cls._age_seconds(row)
+        if age is not None and age <= settings.TITLE_DATA_FRESH_TTL_SECONDS:
+            cls._stats["hit"] += 1
+            return TitleDataResult(cache_status="HIT", payload=row.upi_info)
+        if age is not None and age <= settings.TITLE_DATA_STALE_TTL_SECONDS and background_refresh:
+            cls._stats["stale"] += 1
+            cls._schedule_refresh(upi, language)
+            return TitleDataResult(cache_status="STALE", payload=row.upi_info)
+        return None
+
+    @classmethod
+    async def get_cached_many(
+        cls,
+        upis: List[str],
+        language: str,
+        db: AsyncSession,
+    ) -> Dict[str, TitleDataResult]:
+        """Fresh/stale cache answers for many UPIs in one query; misses are left out."""
+        rows = (await db.execute(select(UpiBackup).where(UpiBackup.upi.in_(upis)))).scalars().all()
+        found = {}
+        for row in rows:
+            cached = cls._serve_cached(row, row.upi, language)
+            if cached:
+                found[row.upi] = cached
+        # Misses are counted when the caller falls back to get()
+        cls._accesses.update(found.keys())
+        return found
+
+    @classmethod
+    async def get(
+        cls,
+        upi: str,
+        language: str,
+        db: AsyncSession,
+        refresh: bool = False,
+        background_refresh: bool = True,
+        store: bool = True,
+    ) -> TitleDataResult:
+        """
+        background_refresh=False treats stale rows as misses and fetches them
+        inline instead of spawning a refresh task; store=False leaves upi_backup
+        untouched. Bulk callers (the CSV importer) use both to keep every NLA
+        call within their own concurrency limit and honour --dry-run.
+        """
+        row = (await db.execute(select(UpiBackup).where(UpiBackup.upi == upi))).scalar_one_or_none()
+        if row is not None:
+            cls._accesses[upi] += 1
+
+        if not refresh:
+            cached = cls._serve_cached(row, upi, language, background_refresh)
+            if cached:
+                return cached
+
+        try:
+            resp, data = await cls._fetch_upstream(upi, language)
+        except Exception as e:
+            cls._stats["upstream_errors"] += 1
+            logger.warning(f"External API failed for UPI {upi}: {e}")
+            if row is not None and row.upi_info:
+                cls._stats["backup"] += 1
+                return TitleDataResult(cache_status="BACKUP", payload=row.upi_info)
+            raise TitleDataUnavailable(str(e)) from e
+
+        if store:
+            await cls._store(db, upi, language, data)
+        cls._stats["bypass" if refresh else "miss"] += 1
+        return TitleDataResult(
+            cache_status="BYPASS" if refresh else "MISS",
+            content=resp.content,
+            status_code=resp.status_code,
+            media_type=resp.headers.get("content-type", "application/json"),
+        )
@@ -0,0 +1,215 @@
+"""
+Background refresher that keeps `UpiBackup` warm
+
+Runs as an asyncio loop inside the API process. Every
+TITLE_DATA_REFRESH_INTERVAL_SECONDS it:
+
+1. flushes the per-UPI read counts collected by `TitleDataCache` into
+   `access_count` / `last_accessed_at` (one batched UPDATE);
+2. under a transaction-scoped Postgres advisory lock, picks rows due for
+   refresh (not attempted for REFRESH_AHEAD x the fresh TTL) and claims
+   them by stamping `last_refresh_at`, then commits: half of the budget goes
+   to the most read rows, the rest to the rows that have waited longest.
+   The stamp is the lease: other workers skip claimed rows, and no
+   transaction or connection is held during the network work below;
+3. refreshes the claimed rows from NLA, at most
+   TITLE_DATA_REFRESH_PER_MINUTE per minute. The stamp stays on failures so
+   failing or unknown UPIs do not hog the budget; rows left unattempted
+   (NLA's breaker opened) get their previous stamp back.
+
+Successful refreshes update `fetched_at`, which is what the read path uses to
+decide freshness.
+
+Usage (app lifespan):
+    TitleDataRefresher.start()
+    ...
+    await TitleDataRefresher.stop()
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select, text, update
+
+from config.config import settings
+from data.database.database import AsyncSessionLocal
+from data.database.locks import TITLE_DATA_REFRESH_LOCK
+from data.models.mapping import UpiBackup
+from data.services.circuit_breaker import OPEN
+from data.services.http_clients import HttpClientRegistry
+from data.services.title_data_cache import TitleDataCache
+
+logger = logging.getLogger(__name__)
+
+# Refresh rows once they have used this fraction of the fresh TTL, so hot
+# rows are renewed before readers see them go stale
+REFRESH_AHEAD = 0.8
+
+_FLUSH_ACCESSES_SQL = text(
+    "UPDATE upi_backup SET access_count = access_count + :hits, last_accessed_at = now() "
+    "WHERE upi = :upi"
+)
+
+_RELEASE_CLAIM_SQL = text("UPDATE upi_backup SET last_refresh_at = :previous WHERE upi = :upi")
+
+
+class TitleDataRefresher:
+    _task: Optional[asyncio.Task] = None
+    _stats: Dict[str, int] = {"ticks": 0, "skipped_locked": 0, "attempted": 0, "refreshed": 0}
+
+    @classmethod
+    def stats(cls) -> Dict[str, object]:
+        return {
+            **cls._stats,
+            "running": cls._task is not None and not cls._task.done(),
+            "interval_seconds": settings.TITLE_DATA_REFRESH_INTERVAL_SECONDS,
+            "per_minute": settings.TITLE_DATA_REFRESH_PER_MINUTE,
+        }
+
+    @classmethod
+    def _budget(cls) -> int:
+        return max(1, int(settings.TITLE_DATA_REFRESH_PER_MINUTE * settings.TITLE_DATA_REFRESH_INTERVAL_SECONDS / 60))
+
+    @classmethod
+    async def _flush_accesses(cls) -> None:
+        accesses = TitleDataCache.drain_accesses()
+        if not accesses:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(_FLUSH_ACCESSES_SQL, [{"upi": upi, "hits": hits} for upi, hits in accesses.items()])
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not record {len(accesses)} title data access counts: {e}")
+
+    @classmethod
+    async def _candidates(cls, db, budget: int) -> List[Tuple[str, str, Optional[datetime]]]:
+        due_before = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.TITLE_DATA_FRESH_TTL_SECONDS * REFRESH_AHEAD
+        )
+        # Matches the ix_upi_backup_last_touched expression index
+        last_touched = func.coalesce(UpiBackup.last_refresh_at, UpiBackup.fetched_at)
+        due = or_(last_touched.is_(None), last_touched < due_before)
+        columns = (UpiBackup.upi, UpiBackup.language, UpiBackup.last_refresh_at)
+
+        hot_rows = await db.execute(
+            select(*columns)
+            .where(due, UpiBackup.access_count > 0)
+            .order_by(UpiBackup.access_count.desc(), last_touched.asc().nulls_first())
+            .limit((budget + 1) // 2)
+        )
+        picked = {upi: (language, previous) for upi, language, previous in hot_rows.all()}
+
+        oldest = select(*columns).where(due)
+        if picked:
+            oldest = oldest.where(UpiBackup.upi.notin_(list(picked)))
+        oldest_rows = await db.execute(
+            oldest.order_by(last_touched.asc().nulls_first()).limit(budget - len(picked))
+        )
+        picked.update({upi: (language, previous) for upi, language, previous in oldest_rows.all()})
+        return [(upi, language or "english", previous) for upi, (language, previous) in picked.items()]
+
+    @classmethod
+    async def _claim(cls, budget: int) -> Optional[List[Tuple[str, str, Optional[datetime]]]]:
+        """Pick and stamp due rows in one short transaction; None when another worker holds the lock."""
+        async with AsyncSessionLocal() as db:
+            locked = (await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": TITLE_DATA_REFRESH_LOCK})).scalar()
+            if not locked:
+                return None
+            candidates = await cls._candidates(db, budget)
+            if candidates:
+                await db.execute(
+                    update(UpiBackup)
+                    .where(UpiBackup.upi.in_([upi for upi, _, _ in candidates]))
+                    .values(last_refresh_at=func.now())
+                )
+            # Commit releases the advisory lock
+            await db.commit()
+        return candidates
+
+    @classmethod
+    async def _release(cls, unattempted: List[Tuple[str, str, Optional[datetime]]]) -> None:
+        """Give claimed-but-unattempted rows their previous stamp back."""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    _RELEASE_CLAIM_SQL, [{"upi": upi, "previous": previous} for upi, _, previous in unattempted]
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not release {len(unattempted)} title data refresh claim(s): {e}")
+
+    @classmethod
+    async def tick(cls) -> int:
+        """One refresh round. Returns the number of rows updated."""
+        cls._stats["ticks"] += 1
+        await cls._flush_accesses()
+
+        if not getattr(settings, "PARCEL_INFORMATION_IP_ADDRESS_GIS", None):
+            return 0
+        if HttpClientRegistry.breaker("nla").state == OPEN:
+            return 0
+
+        budget = cls._budget()
+        candidates = await cls._claim(budget)
+        if candidates is None:
+            cls._stats["skipped_locked"] += 1
+            return 0
+
+        # Spread the budget over the interval instead of bursting it at NLA
+        spacing = settings.TITLE_DATA_REFRESH_INTERVAL_SECONDS / budget / 2
+        refreshed = 0
+        attempted = 0
+        try:
+            for upi, language, _ in candidates:
+                if HttpClientRegistry.breaker("nla").state == OPEN:
+                    break
+                attempted += 1
+                if await TitleDataCache.refresh(upi, language):
+                    refreshed += 1
+                await asyncio.sleep(spacing)
+        finally:
+            if attempted < len(candidates):
+                await cls._release(candidates[attempted:])
+
+        cls._stats["attempted"] += attempted
+        cls._stats["refreshed"] += refreshed
+        if attempted:
+            logger.info(f"Title data refresher: {refreshed}/{attempted} UPI(s) refreshed")
+        return refreshed
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            try:
+                await cls.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Title data refresher tick failed: {e}")
+            await asyncio.sleep(settings.TITLE_DATA_REFRESH_INTERVAL_SECONDS)
+
+    @classmethod
+    def start(cls) -> None:
+        if not settings.TITLE_DATA_REFRESH_ENABLED or (cls._task and not cls._task.done()):
+            return
+        cls._task = asyncio.create_task(cls._run())
+        logger.info(
+            f"Title data refresher started ({settings.TITLE_DATA_REFRESH_PER_MINUTE}/min, "
+            f"every {settings.TITLE_DATA_REFRESH_INTERVAL_SECONDS}s)"
+        )
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
+        # Keep the counts gathered since the last tick
+        await cls._flush_accesses()
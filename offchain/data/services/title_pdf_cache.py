@@ -0,0 +1,227 @@
+"""
+Content-addressed disk cache for NLA e-title PDFs
+
+Layout under TITLE_PDF_CACHE_DIR:
+
+    blobs/<sha256>.pdf          the PDF bytes, named by their hash (= ETag)
+    index/<key>.json            (upi, language) -> sha256 + response headers
+    index/usage.json            running total of blob bytes (under usage.lock)
+
+A download is streamed to the client and teed into a temp file; only a
+complete body is hashed into `blobs/` and indexed. Identical PDFs share one
+blob. Each new blob adds its size to the running total; only when the total
+exceeds TITLE_PDF_CACHE_MAX_MB are the blobs listed and trimmed, least
+recently served first, which also re-syncs the total. Index entries older
+than TITLE_PDF_CACHE_TTL_SECONDS, or whose blob was evicted, count as misses.
+
+Every call here does blocking disk I/O; async callers run them through
+`asyncio.to_thread`.
+
+Usage:
+    entry = TitlePdfCache.lookup(upi, language)   # CachedTitlePdf | None
+    writer = TitlePdfCache.writer(upi, language, content_type, disposition)
+    writer.write(chunk); ...; writer.commit()     # or writer.discard()
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedTitlePdf:
+    path: Path
+    etag: str
+    content_type: str
+    content_disposition: Optional[str]
+
+
+def _root() -> Path:
+    return Path(settings.TITLE_PDF_CACHE_DIR)
+
+
+def _index_path(upi: str, language: str) -> Path:
+    key = hashlib.sha1(f"{upi}|{language}".encode("utf-8")).hexdigest()
+    return _root() / "index" / f"{key}.json"
+
+
+def _blob_path(digest: str) -> Path:
+    return _root() / "blobs" / f"{digest}.pdf"
+
+
+def _usage_path() -> Path:
+    return _root() / "index" / "usage.json"
+
+
+class _UsageLock:
+    """Cross-process lock around usage.json (API workers share the cache dir)."""
+
+    def __enter__(self):
+        path = _root() / "index" / "usage.lock"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+
+
+def _read_usage() -> Optional[int]:
+    try:
+        return int(json.loads(_usage_path().read_text(encoding="utf-8"))["total_bytes"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_usage(total: int) -> None:
+    path = _usage_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"total_bytes": max(0, total)}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _scan_blobs() -> list:
+    blobs = []
+    for path in (_root() / "blobs").glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        blobs.append((stat.st_mtime, stat.st_size, path))
+    return blobs
+
+
+class TitlePdfWriter:
+    """Tees a streamed download into the cache; nothing is visible until commit()."""
+
+    def __init__(self, upi: str, language: str, content_type: str, content_disposition: Optional[str]):
+        self.upi = upi
+        self.language = language
+        self.content_type = content_type
+        self.content_disposition = content_disposition
+        self._hash = hashlib.sha256()
+        self._size = 0
+        blobs = _root() / "blobs"
+        blobs.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=blobs, suffix=".part")
+        self._tmp = Path(tmp)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def discard(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def commit(self) -> Optional[str]:
+        self._file.close()
+        if self._size == 0:
+            self._tmp.unlink(missing_ok=True)
+            return None
+        digest = self._hash.hexdigest()
+        blob = _blob_path(digest)
+        added = 0
+        if blob.exists():
+            self._tmp.unlink(missing_ok=True)
+            os.utime(blob)
+        else:
+            os.replace(self._tmp, blob)
+            added = self._size
+
+        index = _index_path(self.upi, self.language)
+        index.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "upi": self.upi,
+            "language": self.language,
+            "sha256": digest,
+            "size": self._size,
+            "content_type": self.content_type,
+            "content_disposition": self.content_disposition,
+            "fetched_at": time.time(),
+        }
+        tmp_index = index.with_suffix(".tmp")
+        tmp_index.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp_index, index)
+
+        if added:
+            TitlePdfCache.record_added(added)
+        return digest
+
+
+class TitlePdfCache:
+    @staticmethod
+    def lookup(upi: str, language: str) -> Optional[CachedTitlePdf]:
+        index = _index_path(upi, language)
+        try:
+            entry = json.loads(index.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > settings.TITLE_PDF_CACHE_TTL_SECONDS:
+            return None
+        blob = _blob_path(entry["sha256"])
+        if not blob.exists():
+            index.unlink(missing_ok=True)
+            return None
+        # mtime doubles as "last served" for eviction
+        os.utime(blob)
+        return CachedTitlePdf(
+            path=blob,
+            etag=f'"{entry["sha256"]}"',
+            content_type=entry.get("content_type") or "application/pdf",
+            content_disposition=entry.get("content_disposition"),
+        )
+
+    @staticmethod
+    def writer(upi: str, language: str, content_type: str, content_disposition: Optional[str]) -> TitlePdfWriter:
+        return TitlePdfWriter(upi, language, content_type, content_disposition)
+
+    @staticmethod
+    def record_added(size: int) -> None:
+        """Add a new blob to the running total; evict only when it is over budget."""
+        budget = settings.TITLE_PDF_CACHE_MAX_MB * 1024 * 1024
+        with _UsageLock():
+            total = _read_usage()
+            if total is not None:
+                total += size
+                _write_usage(total)
+                if total <= budget:
+                    return
+            TitlePdfCache._evict_locked(budget)
+
+    @staticmethod
+    def evict() -> None:
+        """Delete least recently served blobs until the cache fits its size budget."""
+        with _UsageLock():
+            TitlePdfCache._evict_locked(settings.TITLE_PDF_CACHE_MAX_MB * 1024 * 1024)
+
+    @staticmethod
+    def _evict_locked(budget: int) -> None:
+        # Full listing: only on first use or when over budget; re-syncs the running total
+        blobs = _scan_blobs()
+        total = sum(size for _, size, _ in blobs)
+        if total > budget:
+            blobs.sort()
+            for _, size, path in blobs:
+                if total <= budget:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                logger.debug(f"Evicted cached title PDF {path.name}")
+        _write_usage(total)
@@ -16,6 +16,7 @@ Where should banks lend money?
 """
 
 import os
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -26,6 +27,10 @@ from fastapi.responses import HTMLResponse
 # --- Database & Route Imports ---
 # Assuming these modules exist in your project structure
 from data.database.database import init_db, close_db
+from data.services.http_clients import HttpClientRegistry
+from data.services.title_data_refresher import TitleDataRefresher
+from api.ml.geo_ai.model_registry import ModelRegistry
+from api.ml.geo_ai.scoring import GeoAIScoreRefresher
 from api.routes import (
     user_routes, 
     external_routes, 
@@ -53,11 +58,20 @@ os.makedirs("assets", exist_ok=True)
 # --- Lifecycle Manager ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifecycle manager for database connections"""
+    """Lifecycle manager for database connections and upstream HTTP clients"""
     logger.info("Starting up SafeLand API...")
     await init_db()
+    await HttpClientRegistry.startup()
+    # Load the GeoAI models before serving, off the event loop, so the first
+    # prediction request does not joblib-load every bundle inline
+    await asyncio.to_thread(ModelRegistry.current)
+    TitleDataRefresher.start()
+    GeoAIScoreRefresher.start()
     yield
     logger.info("Shutting down SafeLand API...")
+    await GeoAIScoreRefresher.stop()
+    await TitleDataRefresher.stop()
+    await HttpClientRegistry.close()
     await close_db()
 
 # --- App Initialization ---
@@ -251,6 +265,14 @@ async def health_check():
     return {"status": "healthy", "service": "safeland-api", "version": "1.0.0"}
 
 
+@app.get("/health/upstreams", tags=["General"])
+async def upstream_health():
+    """Circuit breaker state, p99 latency and effective read timeout per upstream"""
+    upstreams = HttpClientRegistry.health()
+    degraded = [name for name, state in upstreams.items() if state["state"] != "closed"]
+    return {"status": "degraded" if degraded else "healthy", "degraded": degraded, "upstreams": upstreams}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,23 @@
+"""add language and fetched_at to upi_backup for the title data cache
+
+Revision ID: g6_upi_backup_fetched_at
+Revises: f5_chat_pdf_context
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'g6_upi_backup_fetched_at'
+down_revision = 'f5_chat_pdf_context'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('upi_backup', sa.Column('language', sa.String(), nullable=True))
+    op.add_column('upi_backup', sa.Column('fetched_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('upi_backup', 'fetched_at')
+    op.drop_column('upi_backup', 'language')
@@ -0,0 +1,27 @@
+"""add access stats and refresh attempts to upi_backup for the background refresher
+
+Revision ID: h7_upi_backup_access_stats
+Revises: g6_upi_backup_fetched_at
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'h7_upi_backup_access_stats'
+down_revision = 'g6_upi_backup_fetched_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('upi_backup', sa.Column('access_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('upi_backup', sa.Column('last_accessed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('upi_backup', sa.Column('last_refresh_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_upi_backup_fetched_at', 'upi_backup', ['fetched_at'])
+
+
+def downgrade():
+    op.drop_index('ix_upi_backup_fetched_at', table_name='upi_backup')
+    op.drop_column('upi_backup', 'last_refresh_at')
+    op.drop_column('upi_backup', 'last_accessed_at')
+    op.drop_column('upi_backup', 'access_count')
@@ -0,0 +1,25 @@
+"""add content_hash fingerprints to mappings and upi_backup
+
+Revision ID: i8_content_hash
+Revises: h7_upi_backup_access_stats
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'i8_content_hash'
+down_revision = 'h7_upi_backup_access_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('mappings', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('upi_backup', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('upi_backup', sa.Column('changed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('upi_backup', 'changed_at')
+    op.drop_column('upi_backup', 'content_hash')
+    op.drop_column('mappings', 'content_hash')
@@ -0,0 +1,20 @@
+"""index mappings.updated_at for incremental GeoAI feature syncs
+
+Revision ID: j9_mappings_updated_at_index
+Revises: i8_content_hash
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = 'j9_mappings_updated_at_index'
+down_revision = 'i8_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_mappings_updated_at', 'mappings', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_mappings_updated_at', table_name='mappings')
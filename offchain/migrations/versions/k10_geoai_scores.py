@@ -0,0 +1,33 @@
+"""add geoai_scores for precomputed GeoAI batch scores
+
+Revision ID: k10_geoai_scores
+Revises: j9_mappings_updated_at_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'k10_geoai_scores'
+down_revision = 'j9_mappings_updated_at_index'
+branch_labels = None
+depends_on = None
+
+SCORE_COLUMNS = ['predicted_value', 'investment_probability', 'risk_probability', 'growth_score', 'bank_score']
+
+
+def upgrade():
+    op.create_table(
+        'geoai_scores',
+        sa.Column('upi', sa.String(), sa.ForeignKey('mappings.upi', ondelete='CASCADE'), primary_key=True),
+        sa.Column('model_version', sa.String(), nullable=False),
+        sa.Column('district', sa.String(), nullable=True),
+        sa.Column('sector', sa.String(), nullable=True),
+        *[sa.Column(name, sa.Float(), nullable=True) for name in SCORE_COLUMNS],
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    for name in ['model_version', 'district', 'sector'] + SCORE_COLUMNS:
+        op.create_index(f'ix_geoai_scores_{name}', 'geoai_scores', [name])
+
+
+def downgrade():
+    op.drop_table('geoai_scores')
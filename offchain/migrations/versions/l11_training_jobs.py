@@ -0,0 +1,43 @@
+"""add training_jobs for out-of-process GeoAI training
+
+Revision ID: l11_training_jobs
+Revises: k10_geoai_scores
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'l11_training_jobs'
+down_revision = 'k10_geoai_scores'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'training_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('pid', sa.Integer(), nullable=True),
+        sa.Column('requested_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('duration_seconds', sa.Float(), nullable=True),
+        sa.Column('metrics', postgresql.JSONB(), nullable=True),
+        sa.Column('model_version', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+    )
+    op.create_index('ix_training_jobs_id', 'training_jobs', ['id'])
+    op.create_index('ix_training_jobs_status', 'training_jobs', ['status'])
+    # At most one queued/running job at a time
+    op.create_index(
+        'uq_training_jobs_one_active', 'training_jobs',
+        [sa.text("(status IN ('queued', 'running'))")],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade():
+    op.drop_table('training_jobs')
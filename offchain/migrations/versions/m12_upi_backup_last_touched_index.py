@@ -0,0 +1,29 @@
+"""index upi_backup by last refresh attempt for the background refresher
+
+The refresher orders and filters due rows by coalesce(last_refresh_at,
+fetched_at), so the plain fetched_at index from h7 was never used.
+
+Revision ID: m12_upi_backup_last_touched_index
+Revises: l11_training_jobs
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'm12_upi_backup_last_touched_index'
+down_revision = 'l11_training_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_upi_backup_fetched_at', table_name='upi_backup')
+    op.create_index(
+        'ix_upi_backup_last_touched', 'upi_backup',
+        [sa.text('coalesce(last_refresh_at, fetched_at)')],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_upi_backup_last_touched', table_name='upi_backup')
+    op.create_index('ix_upi_backup_fetched_at', 'upi_backup', ['fetched_at'])
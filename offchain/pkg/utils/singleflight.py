@@ -0,0 +1,53 @@
+"""
+Single-flight request coalescing
+
+Concurrent calls with the same key share one in-flight awaitable: the first
+caller starts it, later callers wait on the same result (or exception).
+Nothing is cached once the call finishes.
+
+The call runs in its own task, so a waiter that is cancelled (e.g. the client
+disconnected) does not cancel the work other waiters depend on.
+
+Usage:
+    flight = SingleFlight()
+    resp = await flight.do(("nla", url), client.get, url)
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.shared += 1
+            # Keys can be URLs carrying national IDs; log a digest, not the key
+            digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:12]
+            logger.debug(f"{self.name}: joined in-flight call for key {digest}")
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "shared": self.shared, "inflight": len(self._inflight)}
@@ -2,6 +2,7 @@
 Utility functions for SafeLand API
 """
 
+import json
 import random
 import string
 import hashlib
@@ -103,3 +104,26 @@ def validate_nid(nid: str) -> bool:
     """Validate Rwanda National ID format"""
     # Rwanda NID is 16 digits
     return nid.isdigit() and len(nid) == 16
+
+
+def _normalize_for_fingerprint(value):
+    if isinstance(value, dict):
+        return {str(k): _normalize_for_fingerprint(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_for_fingerprint(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def content_fingerprint(value, exclude: tuple = ()) -> str:
+    """
+    Stable SHA-256 of a JSON-like value: key order and whitespace inside
+    strings do not matter. Top-level keys in `exclude` are ignored.
+    """
+    if isinstance(value, dict) and exclude:
+        value = {k: v for k, v in value.items() if k not in exclude}
+    canonical = json.dumps(_normalize_for_fingerprint(value), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
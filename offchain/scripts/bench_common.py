@@ -0,0 +1,62 @@
+"""
+Shared helpers for the scripts/bench_*.py harnesses: corpus discovery,
+OCR text caching and percentile maths.
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+
+OFFCHAIN_ROOT = Path(__file__).resolve().parents[1]
+if str(OFFCHAIN_ROOT) not in sys.path:
+    sys.path.insert(0, str(OFFCHAIN_ROOT))
+
+DEFAULT_CORPUS_GLOBS = ("assets/gis_uploads/*.pdf", "api/ml/*.pdf")
+DEFAULT_CACHE_DIR = OFFCHAIN_ROOT / "assets" / "bench" / "ocr_cache"
+
+
+def discover_corpus(globs) -> list[Path]:
+    paths: set[Path] = set()
+    for pattern in globs:
+        paths.update(OFFCHAIN_ROOT.glob(pattern))
+    return sorted(paths)
+
+
+def relative(path: Path) -> str:
+    return path.resolve().relative_to(OFFCHAIN_ROOT).as_posix()
+
+
+def render_first_page(pdf_path: Path):
+    from pdf2image import convert_from_path
+    return convert_from_path(str(pdf_path), dpi=300, first_page=1, last_page=1)[0]
+
+
+def cached_ocr_text(pdf_path: Path, cache_dir: Path = DEFAULT_CACHE_DIR, page=None) -> str:
+    """
+    OCR the first page once and cache the text by file hash, so repeated
+    benchmark runs measure the code under test and not tesseract.
+    """
+    digest = hashlib.sha256(pdf_path.read_bytes()).hexdigest()
+    cache_file = cache_dir / f"{digest}.txt"
+    if cache_file.exists():
+        return cache_file.read_text(encoding="utf-8")
+
+    import cv2
+    import numpy as np
+    from api.ml.title.ocr import get_ocr_engine
+
+    page = page if page is not None else render_first_page(pdf_path)
+    gray = cv2.cvtColor(np.array(page), cv2.COLOR_RGB2GRAY)
+    text = get_ocr_engine().read_text(gray)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(text, encoding="utf-8")
+    return text
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,200 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Allow running this script from either:
+# - offchain/                 -> python scripts/bench_owner_extraction.py
+# - offchain/scripts/         -> python bench_owner_extraction.py
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_common import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CORPUS_GLOBS,
+    OFFCHAIN_ROOT,
+    cached_ocr_text,
+    discover_corpus,
+    percentile,
+    relative,
+)
+
+from api.ml.title.owner_parser import extract_owners
+from api.ml.title.pipeline import find_upi
+
+DEFAULT_GOLDEN_PATH = OFFCHAIN_ROOT / "assets" / "bench" / "owner_golden.json"
+
+
+def _owner_key(owner: dict) -> tuple[str, str]:
+    name = " ".join(str(owner.get("name") or "").upper().split())
+    return name, str(owner.get("id_number") or "")
+
+
+def _summarise_owner(owner: dict) -> dict:
+    return {
+        "name": owner.get("name"),
+        "id_number": owner.get("id_number"),
+        "id_type": owner.get("id_type"),
+        "percentage": owner.get("percentage"),
+    }
+
+
+def _score(expected: list[dict], actual: list[dict]) -> tuple[int, int, int]:
+    """(true positives, false positives, false negatives) on (name, id) pairs."""
+    expected_keys = {_owner_key(o) for o in expected}
+    actual_keys = {_owner_key(o) for o in actual}
+    tp = len(expected_keys & actual_keys)
+    return tp, len(actual_keys - expected_keys), len(expected_keys - actual_keys)
+
+
+def run(
+    globs: list[str],
+    golden_path: Path,
+    cache_dir: Path,
+    iterations: int,
+    record: bool,
+    check: bool,
+    min_f1: float,
+) -> int:
+    corpus = discover_corpus(globs)
+    if not corpus:
+        print(f"No documents matched {globs}")
+        return 1
+
+    golden = {}
+    if golden_path.exists():
+        golden = json.loads(golden_path.read_text(encoding="utf-8"))
+
+    print(f"Corpus: {len(corpus)} document(s), {iterations} iteration(s) each")
+    print(f"{'document':<48} {'owners':>6} {'p50 ms':>8} {'p95 ms':>8} {'tp':>4} {'fp':>4} {'fn':>4}")
+
+    all_timings: list[float] = []
+    totals = [0, 0, 0]
+    recorded = {}
+
+    for pdf_path in corpus:
+        key = relative(pdf_path)
+        try:
+            text = cached_ocr_text(pdf_path, cache_dir)
+        except Exception as exc:
+            print(f"{key:<48} OCR failed: {exc}")
+            continue
+
+        timings = []
+        owners: list[dict] = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            owners = extract_owners(text)
+            timings.append((time.perf_counter() - started) * 1000)
+        all_timings.extend(timings)
+
+        recorded[key] = {
+            "upi": find_upi(text),
+            "owners": [_summarise_owner(o) for o in owners],
+        }
+
+        scores = ("", "", "")
+        if key in golden:
+            tp, fp, fn = _score(golden[key].get("owners") or [], owners)
+            totals[0] += tp
+            totals[1] += fp
+            totals[2] += fn
+            scores = (tp, fp, fn)
+
+        print(
+            f"{key:<48} {len(owners):>6} {percentile(timings, 50):>8.3f} "
+            f"{percentile(timings, 95):>8.3f} {scores[0]:>4} {scores[1]:>4} {scores[2]:>4}"
+        )
+
+    print("\nLatency (all documents)")
+    print(f"  mean : {statistics.mean(all_timings) if all_timings else 0:.3f} ms")
+    print(f"  p50  : {percentile(all_timings, 50):.3f} ms")
+    print(f"  p95  : {percentile(all_timings, 95):.3f} ms")
+
+    exit_code = 0
+    tp, fp, fn = totals
+    if golden:
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        print("\nAccuracy vs golden (name + ID pairs)")
+        print(f"  precision : {precision:.3f}")
+        print(f"  recall    : {recall:.3f}")
+        print(f"  f1        : {f1:.3f}")
+        if check and f1 < min_f1:
+            print(f"FAIL: f1 {f1:.3f} < {min_f1:.3f}")
+            exit_code = 1
+    elif check:
+        print(f"FAIL: no golden file at {golden_path}; run with --record first")
+        exit_code = 1
+
+    if record:
+        golden_path.parent.mkdir(parents=True, exist_ok=True)
+        golden_path.write_text(json.dumps(recorded, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nRecorded {len(recorded)} document(s) to {golden_path} (review before committing)")
+
+    return exit_code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark owner extraction latency and accuracy over the sample e-title PDFs."
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=None,
+        help=f"Glob relative to offchain/ (repeatable). Default: {', '.join(DEFAULT_CORPUS_GLOBS)}.",
+    )
+    parser.add_argument(
+        "--golden",
+        type=Path,
+        default=DEFAULT_GOLDEN_PATH,
+        help="JSON file with the expected owners per document.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached OCR text (keyed by PDF hash).",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=50,
+        help="Parser runs per document for the latency figures (default: 50).",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Write the current output as the golden file.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit non-zero when f1 against the golden file drops below --min-f1.",
+    )
+    parser.add_argument(
+        "--min-f1",
+        type=float,
+        default=0.95,
+        help="Minimum f1 accepted by --check (default: 0.95).",
+    )
+
+    args = parser.parse_args()
+
+    sys.exit(
+        run(
+            globs=args.corpus or list(DEFAULT_CORPUS_GLOBS),
+            golden_path=args.golden,
+            cache_dir=args.cache_dir,
+            iterations=max(1, args.iterations),
+            record=args.record,
+            check=args.check,
+            min_f1=args.min_f1,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
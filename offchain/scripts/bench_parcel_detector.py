@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Allow running this script from either:
+# - offchain/                 -> python scripts/bench_parcel_detector.py
+# - offchain/scripts/         -> python bench_parcel_detector.py
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_common import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CORPUS_GLOBS,
+    cached_ocr_text,
+    discover_corpus,
+    percentile,
+    relative,
+    render_first_page,
+)
+
+from shapely import wkt as shapely_wkt
+from shapely import affinity
+from shapely.ops import transform as shapely_transform
+
+from api.ml.gis_cord.georef import TITLE_MAP_CRS, WGS84_CRS, get_transformer
+from api.ml.gis_cord.parcel_detector import (
+    legacy_extract_polygon,
+    legacy_verify_polygon,
+    multiscale_polygon,
+)
+from api.ml.title.pipeline import find_upi
+
+DETECTORS = {
+    "legacy_extract": legacy_extract_polygon,
+    "legacy_verify": legacy_verify_polygon,
+    "multiscale": multiscale_polygon,
+}
+
+
+def _project(geom):
+    transformer = get_transformer(WGS84_CRS, TITLE_MAP_CRS)
+    return shapely_transform(transformer.transform, geom)
+
+
+def _normalised(geom):
+    """
+    Centre on the centroid and scale to unit area. The detected polygon is
+    geo-referenced from a fixed anchor and pixel size, so only its shape is
+    comparable with the registry polygon, not its position or scale.
+    """
+    if geom is None or geom.is_empty or geom.area <= 0:
+        return None
+    centroid = geom.centroid
+    geom = affinity.translate(geom, -centroid.x, -centroid.y)
+    factor = 1.0 / geom.area ** 0.5
+    return affinity.scale(geom, factor, factor, origin=(0, 0))
+
+
+def shape_iou(detected_wkt, registry_wkt):
+    if not detected_wkt or not registry_wkt:
+        return None
+    try:
+        a = _normalised(_project(shapely_wkt.loads(detected_wkt)).buffer(0))
+        b = _normalised(_project(shapely_wkt.loads(registry_wkt)).buffer(0))
+    except Exception:
+        return None
+    if a is None or b is None:
+        return None
+    union = a.union(b).area
+    return a.intersection(b).area / union if union > 0 else None
+
+
+async def _load_registry_polygons(upis: list[str]) -> dict:
+    """UPI -> registry WKT from mappings, then from cached NLA title data."""
+    from sqlalchemy import select
+    from data.database.database import AsyncSessionLocal
+    from data.models.mapping import Mapping, UpiBackup
+
+    found = {}
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(Mapping.upi, Mapping.official_registry_polygon).where(Mapping.upi.in_(upis))
+        )
+        for upi, polygon in rows.all():
+            if polygon:
+                found[upi] = polygon
+
+        missing = [u for u in upis if u not in found]
+        if missing:
+            rows = await db.execute(select(UpiBackup.upi, UpiBackup.upi_info).where(UpiBackup.upi.in_(missing)))
+            for upi, info in rows.all():
+                details = ((info or {}).get("data") or {}).get("parcelDetails") or {}
+                polygon = (details.get("parcelPolygon") or {}).get("polygon")
+                if polygon:
+                    found[upi] = polygon
+    return found
+
+
+def run(globs: list[str], cache_dir: Path, repeat: int, registry_json, output) -> int:
+    corpus = discover_corpus(globs)
+    if not corpus:
+        print(f"No documents matched {globs}")
+        return 1
+
+    pages = {}
+    upis = {}
+    for pdf_path in corpus:
+        key = relative(pdf_path)
+        try:
+            page = render_first_page(pdf_path)
+        except Exception as exc:
+            print(f"{key}: render failed: {exc}")
+            continue
+        pages[key] = page
+        upis[key] = find_upi(cached_ocr_text(pdf_path, cache_dir, page=page))
+
+    if registry_json:
+        registry = json.loads(Path(registry_json).read_text(encoding="utf-8"))
+    else:
+        try:
+            registry = asyncio.run(_load_registry_polygons([u for u in upis.values() if u]))
+        except Exception as exc:
+            print(f"Registry lookup unavailable ({exc}); IoU columns will be empty")
+            registry = {}
+
+    results = []
+    timings = {name: [] for name in DETECTORS}
+    ious = {name: [] for name in DETECTORS}
+
+    header = f"{'document':<44}" + "".join(f" {name + ' ms':>19} {'IoU':>6}" for name in DETECTORS)
+    print(f"Corpus: {len(pages)} page(s), {repeat} run(s) per detector")
+    print(header)
+
+    for key, page in pages.items():
+        registry_wkt = registry.get(key) or registry.get(upis[key] or "")
+        row = {"document": key, "upi": upis[key], "detectors": {}}
+        line = f"{key:<44}"
+        for name, detector in DETECTORS.items():
+            runs = []
+            detected = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                detected = detector(page)
+                runs.append((time.perf_counter() - started) * 1000)
+            timings[name].extend(runs)
+            iou = shape_iou(detected, registry_wkt)
+            if iou is not None:
+                ious[name].append(iou)
+            row["detectors"][name] = {
+                "p50_ms": percentile(runs, 50),
+                "iou": iou,
+                "found": detected is not None,
+            }
+            line += f" {percentile(runs, 50):>19.1f} {('%.3f' % iou) if iou is not None else '-':>6}"
+        results.append(row)
+        print(line)
+
+    summary = {}
+    print("\nSummary")
+    for name in DETECTORS:
+        mean_iou = sum(ious[name]) / len(ious[name]) if ious[name] else None
+        summary[name] = {
+            "p50_ms": percentile(timings[name], 50),
+            "p95_ms": percentile(timings[name], 95),
+            "mean_iou": mean_iou,
+            "scored": len(ious[name]),
+        }
+        print(
+            f"  {name:<16} p50 {summary[name]['p50_ms']:>8.1f} ms  p95 {summary[name]['p95_ms']:>8.1f} ms  "
+            f"mean IoU {('%.3f' % mean_iou) if mean_iou is not None else '-'} ({len(ious[name])} scored)"
+        )
+
+    if output:
+        Path(output).write_text(json.dumps({"summary": summary, "documents": results}, indent=2), encoding="utf-8")
+        print(f"\nWrote {output}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the legacy and multiscale parcel detectors on the sample titles: "
+            "latency and shape IoU against the registry polygon."
+        )
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=None,
+        help=f"Glob relative to offchain/ (repeatable). Default: {', '.join(DEFAULT_CORPUS_GLOBS)}.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached OCR text, used to find each title's UPI.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per detector and page (default: 3).",
+    )
+    parser.add_argument(
+        "--registry-json",
+        default=None,
+        help="JSON object of document path or UPI -> registry WKT. Default: read from the database.",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Optional path for a JSON report.",
+    )
+
+    args = parser.parse_args()
+
+    sys.exit(
+        run(
+            globs=args.corpus or list(DEFAULT_CORPUS_GLOBS),
+            cache_dir=args.cache_dir,
+            repeat=max(1, args.repeat),
+            registry_json=args.registry_json,
+            output=args.output,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
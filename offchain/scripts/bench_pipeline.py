@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Allow running this script from either:
+# - offchain/                 -> python scripts/bench_pipeline.py
+# - offchain/scripts/         -> python bench_pipeline.py
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_common import (
+    DEFAULT_CORPUS_GLOBS,
+    OFFCHAIN_ROOT,
+    discover_corpus,
+    percentile,
+    relative,
+)
+
+import cv2
+import numpy as np
+import psutil
+
+from api.ml.gis_cord.parcel_detector import detect_parcel_polygon
+from api.ml.title.ocr import get_ocr_engine
+from api.ml.title.owner_matching import match_owners, normalize_ocr_owners, registry_owners_from_details
+from api.ml.title.pipeline import extract_title_owners, find_upi, rasterize_document
+from api.routes.mapping_routes import _details_from_title_response, _mapping_fields_from_details
+from data.models.mapping import Mapping
+
+DEFAULT_RESULTS_DIR = OFFCHAIN_ROOT / "assets" / "bench" / "results"
+DEFAULT_FIXTURE_PATH = OFFCHAIN_ROOT / "assets" / "bench" / "nla_fixture.json"
+
+STAGES = ("rasterize", "ocr", "upi", "owners", "contours", "nla", "match", "db_write", "total")
+
+
+class StageTimer:
+    """Collects wall-clock samples per stage; safe to share between worker threads."""
+
+    def __init__(self):
+        self._samples = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._samples[name].append(elapsed)
+
+    def summary(self) -> dict:
+        return {
+            stage: {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+            }
+            for stage, samples in self._samples.items()
+            if samples
+        }
+
+
+class PeakRssSampler:
+    """Polls this process' RSS in the background and keeps the maximum."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+
+class NlaFixture:
+    """
+    Offline stand-in for get_title_data. Recorded payloads are served from a
+    JSON file (UPI -> title response); unknown UPIs get a synthetic payload
+    whose owners mirror the document, so owner matching does real work.
+    """
+
+    def __init__(self, path: Path, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+        self.payloads = {}
+        if path and path.exists():
+            self.payloads = json.loads(path.read_text(encoding="utf-8"))
+
+    def title_data(self, upi: str, ocr_owners: list[dict]) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        if upi in self.payloads:
+            return self.payloads[upi]
+        return {
+            "data": {
+                "parcelDetails": {
+                    "upi": upi,
+                    "parcelPolygon": {
+                        "polygon": "POLYGON((30.06 -1.95, 30.061 -1.95, 30.061 -1.951, 30.06 -1.951, 30.06 -1.95))"
+                    },
+                    "parcelCoordinates": {"lat": -1.9505, "lon": 30.0605},
+                    "area": 12100,
+                    "provinceName": "Kigali City",
+                    "districtName": "Gasabo",
+                    "address": {"string": "Kigali City, Gasabo"},
+                    "plannedLandUses": [],
+                },
+                "owners": [
+                    {"fullName": o.get("name"), "idNo": o.get("id_number") or "", "percentage": o.get("percentage")}
+                    for o in ocr_owners
+                ],
+                "parcelRepresentative": {},
+            }
+        }
+
+
+def _process_document(filename: str, data: bytes, timer: StageTimer, nla: NlaFixture, db_writer) -> dict:
+    with timer.stage("total"):
+        with timer.stage("rasterize"):
+            page = rasterize_document(data, filename)
+            gray = cv2.cvtColor(np.array(page), cv2.COLOR_RGB2GRAY)
+
+        engine = get_ocr_engine()
+        with timer.stage("ocr"):
+            ocr_text = engine.read_text(gray)
+
+        with timer.stage("upi"):
+            upi = find_upi(ocr_text) or find_upi(engine.read_text(gray, field="upi"))
+
+        with timer.stage("owners"):
+            ocr_owners = normalize_ocr_owners(extract_title_owners(gray, ocr_text, engine))
+
+        with timer.stage("contours"):
+            detected_wkt = detect_parcel_polygon(gray, purpose="extract")
+            detect_parcel_polygon(gray, purpose="verify")
+
+        if not upi:
+            return {"document": filename, "status": "no_upi"}
+
+        with timer.stage("nla"):
+            details = _details_from_title_response(nla.title_data(upi, ocr_owners))
+
+        with timer.stage("match"):
+            _, _, matched = match_owners(ocr_owners, registry_owners_from_details(details))
+
+        with timer.stage("db_write"):
+            mapping = Mapping(**_mapping_fields_from_details(details, detected_wkt, "bench", None))
+            if db_writer:
+                db_writer(mapping)
+
+    return {"document": filename, "status": "ok", "upi": upi, "owners": len(ocr_owners), "matched": matched}
+
+
+def _make_db_writer():
+    """
+    Flush each mapping inside a transaction that is always rolled back, so DB
+    write latency is measured without leaving rows behind. All DB work runs
+    on one background event loop, because the async engine's connection
+    pool is bound to the loop that created it.
+    """
+    from data.database.database import AsyncSessionLocal
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True, name="bench-db").start()
+
+    async def _write(mapping):
+        async with AsyncSessionLocal() as db:
+            db.add(mapping)
+            await db.flush()
+            await db.rollback()
+
+    def write(mapping):
+        asyncio.run_coroutine_threadsafe(_write(mapping), loop).result()
+
+    return write
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=OFFCHAIN_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _print_comparison(current: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    print(f"\nComparison with {baseline_path.name} (commit {baseline.get('commit')})")
+    baseline_runs = {r["workers"]: r for r in baseline.get("runs", [])}
+    for current_run in current["runs"]:
+        previous = baseline_runs.get(current_run["workers"])
+        if not previous:
+            continue
+        print(f"  workers={current_run['workers']}")
+        for stage, stats in current_run["stages"].items():
+            before = previous["stages"].get(stage)
+            if not before or not before["p50_ms"]:
+                continue
+            delta = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            print(f"    {stage:<10} p50 {before['p50_ms']:>9.1f} -> {stats['p50_ms']:>9.1f} ms ({delta:+.1f}%)")
+        print(f"    {'docs/s':<10} {previous['docs_per_sec']:>13.2f} -> {current_run['docs_per_sec']:>9.2f}")
+
+
+def run(
+    globs: list[str],
+    worker_counts: list[int],
+    rounds: int,
+    fixture_path: Path,
+    nla_latency_ms: float,
+    with_db: bool,
+    output: Path,
+    compare: Path,
+) -> int:
+    corpus = discover_corpus(globs)
+    if not corpus:
+        print(f"No documents matched {globs}")
+        return 1
+
+    documents = [(relative(p), p.read_bytes()) for p in corpus] * max(1, rounds)
+    nla = NlaFixture(fixture_path, nla_latency_ms)
+    db_writer = _make_db_writer() if with_db else None
+
+    # Warm-up: loads OCR language data and builds transformers outside the timings
+    _process_document(documents[0][0], documents[0][1], StageTimer(), nla, None)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "ocr_backend": get_ocr_engine().backend_name,
+        "documents": len(corpus),
+        "rounds": rounds,
+        "nla_latency_ms": nla_latency_ms,
+        "db_writes": with_db,
+        "runs": [],
+    }
+
+    print(f"Corpus: {len(corpus)} document(s) x {rounds} round(s), OCR backend '{report['ocr_backend']}'")
+    for workers in worker_counts:
+        timer = StageTimer()
+        with PeakRssSampler() as rss:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bench") as pool:
+                outcomes = list(pool.map(lambda d: _process_document(d[0], d[1], timer, nla, db_writer), documents))
+            elapsed = time.perf_counter() - started
+
+        stages = timer.summary()
+        run_report = {
+            "workers": workers,
+            "elapsed_s": round(elapsed, 3),
+            "docs_per_sec": round(len(documents) / elapsed, 3) if elapsed else 0.0,
+            "peak_rss_mb": round(rss.peak / (1024 * 1024), 1),
+            "no_upi": sum(1 for o in outcomes if o["status"] == "no_upi"),
+            "stages": stages,
+        }
+        report["runs"].append(run_report)
+
+        print(
+            f"\nworkers={workers}: {run_report['docs_per_sec']:.2f} docs/s, "
+            f"peak RSS {run_report['peak_rss_mb']:.1f} MB, {run_report['no_upi']} without UPI"
+        )
+        for stage in STAGES:
+            if stage in stages:
+                print(f"  {stage:<10} p50 {stages[stage]['p50_ms']:>9.1f} ms  p95 {stages[stage]['p95_ms']:>9.1f} ms")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\nWrote {output}")
+
+    if compare:
+        _print_comparison(report, compare)
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Offline benchmark of the title pipeline (rasterise, OCR, UPI, owners, contours, "
+            "NLA lookup, owner matching, DB write) with the NLA stubbed by a local fixture."
+        )
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=None,
+        help=f"Glob relative to offchain/ (repeatable). Default: {', '.join(DEFAULT_CORPUS_GLOBS)}.",
+    )
+    parser.add_argument(
+        "--workers",
+        default="1,2,4",
+        help="Comma-separated worker counts to measure (default: 1,2,4).",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=1,
+        help="How many times the corpus is processed per worker count (default: 1).",
+    )
+    parser.add_argument(
+        "--nla-fixture",
+        type=Path,
+        default=DEFAULT_FIXTURE_PATH,
+        help="JSON object of UPI -> recorded title response. Missing UPIs get a synthetic payload.",
+    )
+    parser.add_argument(
+        "--nla-latency-ms",
+        type=float,
+        default=0.0,
+        help="Simulated NLA round-trip per lookup (default: 0).",
+    )
+    parser.add_argument(
+        "--db",
+        action="store_true",
+        help="Also flush each mapping to the configured database (always rolled back).",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Result JSON path. Default: assets/bench/results/pipeline_<commit>_<timestamp>.json.",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        default=None,
+        help="Earlier result JSON to print per-stage p50 deltas against.",
+    )
+
+    args = parser.parse_args()
+
+    worker_counts = sorted({max(1, int(token)) for token in args.workers.split(",") if token.strip()})
+    output = args.output or DEFAULT_RESULTS_DIR / (
+        f"pipeline_{_git_commit()}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+
+    sys.exit(
+        run(
+            globs=args.corpus or list(DEFAULT_CORPUS_GLOBS),
+            worker_counts=worker_counts,
+            rounds=max(1, args.rounds),
+            fixture_path=args.nla_fixture,
+            nla_latency_ms=args.nla_latency_ms,
+            with_db=args.db,
+            output=output,
+            compare=args.compare,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
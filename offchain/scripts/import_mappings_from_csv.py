@@ -4,12 +4,13 @@ import csv
 import json
 import os
 import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 # Allow running this script from either:
 # - offchain/                 -> python scripts/import_mappings_from_csv.py
@@ -26,10 +27,13 @@ load_dotenv(OFFCHAIN_ROOT / ".env", override=False)
 # Also align process cwd with offchain for any relative-path dependencies
 os.chdir(OFFCHAIN_ROOT)
 
-from api.routes.external_routes import get_title_data
+from config.config import settings
+from data.database.bulk import INSERTED, bulk_upsert
 from data.database.database import AsyncSessionLocal
 from data.models.mapping import Mapping, UpiBackup
 from data.models.models import Property
+from data.services.http_clients import HttpClientRegistry
+from data.services.title_data_cache import TitleDataCache
 
 
 def _clean_upi(value: Any) -> str:
@@ -90,21 +94,6 @@ def _filter_upis_by_type(
     return selected, type_counts, skipped_by_prefix
 
 
-def _parse_response_json(result: Any) -> dict:
-    if hasattr(result, "body") and result.body is not None:
-        try:
-            if isinstance(result.body, (bytes, bytearray)):
-                return json.loads(result.body.decode("utf-8"))
-            return json.loads(result.body)
-        except Exception:
-            return {}
-
-    if isinstance(result, dict):
-        return result
-
-    return {}
-
-
 def _is_not_found_payload(payload: dict) -> bool:
     if not payload:
         return True
@@ -127,7 +116,7 @@ def _is_not_found_payload(payload: dict) -> bool:
     return False
 
 
-async def _save_skip_to_upi_backup(db, upi: str, reason: str, payload: dict | None = None) -> None:
+def _skip_backup_body(upi: str, reason: str, payload: dict | None = None) -> dict:
     backup_body = {
         "upi": upi,
         "status": "skipped",
@@ -137,27 +126,16 @@ async def _save_skip_to_upi_backup(db, upi: str, reason: str, payload: dict | No
     }
     if payload:
         backup_body["provider_response"] = payload
-
-    stmt = pg_insert(UpiBackup).values(
-        upi=upi,
-        upi_info=backup_body,
-    ).on_conflict_do_update(
-        index_elements=["upi"],
-        set_={"upi_info": backup_body},
-    )
-    await db.execute(stmt)
+    return backup_body
 
 
-async def _upsert_mapping_from_title_data(db, upi: str, title_payload: dict) -> str:
+def _mapping_fields(upi: str, title_payload: dict) -> dict:
     data = title_payload.get("data") or {}
     details = data.get("parcelDetails") or {}
 
     canonical_upi = _clean_upi(details.get("upi") or upi)
 
-    prop_result = await db.execute(select(Property).where(Property.upi == canonical_upi))
-    prop = prop_result.scalar_one_or_none()
-
-    mapping_fields = dict(
+    return dict(
         upi=canonical_upi,
         official_registry_polygon=details.get("parcelPolygon", {}).get("polygon"),
         document_detected_polygon=None,
@@ -188,22 +166,147 @@ async def _upsert_mapping_from_title_data(db, upi: str, title_payload: dict) ->
         registration_date=None,
         approval_date=details.get("approvalDate"),
         year_of_record=datetime.now().year,
-        property_id=prop.id if prop else None,
+        property_id=None,
         uploaded_by="bulk_csv_import",
         for_sale=False,
         price=0,
     )
 
-    existing_result = await db.execute(select(Mapping).where(Mapping.upi == canonical_upi))
-    existing_mapping = existing_result.scalar_one_or_none()
 
-    if existing_mapping:
-        for key, value in mapping_fields.items():
-            setattr(existing_mapping, key, value)
-        return "updated"
+@dataclass
+class FetchedUpi:
+    upi: str
+    status: str  # ok | not_found | failed
+    payload: dict | None = None
+    error: str | None = None
+
+
+class Checkpoint:
+    """Append-only file of UPIs whose batch has been committed."""
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.done: set[str] = set()
+        if path and path.exists():
+            self.done = {line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+    def record(self, upis: list[str]) -> None:
+        if not self.path or not upis:
+            return
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write("".join(f"{upi}\n" for upi in upis))
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.done.update(upis)
+
+
+class Progress:
+    def __init__(self, total: int, report_every: float):
+        self.total = total
+        self.report_every = report_every
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.counts = {"created": 0, "changed": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+
+    @property
+    def processed(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, key: str, n: int = 1) -> None:
+        self.counts[key] += n
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_every:
+            self.last_report = now
+            self.report()
+
+    def report(self) -> None:
+        elapsed = time.perf_counter() - self.started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.processed
+        eta = f"{remaining / rate:.0f}s" if rate > 0 else "-"
+        print(f"  ... {self.processed}/{self.total} UPIs, {rate:.1f} UPI/s, ETA {eta}")
+
+
+async def _fetch_title_payload(upi: str, dry_run: bool = False) -> FetchedUpi:
+    try:
+        async with AsyncSessionLocal() as session:
+            # Stale rows are fetched here, under --concurrency, not by background tasks
+            result = await TitleDataCache.get(
+                upi, "english", session, background_refresh=False, store=not dry_run
+            )
+        payload = result.json() or {}
+    except Exception as exc:
+        return FetchedUpi(upi=upi, status="failed", error=f"{type(exc).__name__}: {exc}")
+    if _is_not_found_payload(payload):
+        return FetchedUpi(upi=upi, status="not_found", payload=payload)
+    return FetchedUpi(upi=upi, status="ok", payload=payload)
+
+
+async def _write_batch(db, batch: list[FetchedUpi]) -> dict[str, int]:
+    """Apply one batch in the current transaction. Returns per-outcome counts."""
+    counts = {"created": 0, "changed": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+    fields_by_upi: dict[str, dict] = {}
+    skip_rows: list[dict] = []
+    for item in batch:
+        if item.status == "ok":
+            fields = _mapping_fields(item.upi, item.payload)
+            fields_by_upi[fields["upi"]] = fields
+        elif item.status == "not_found":
+            skip_rows.append({"upi": item.upi, "upi_info": _skip_backup_body(item.upi, "external_title_data_not_found", item.payload)})
+            counts["skipped"] += 1
+        else:
+            reason = f"exception: {item.error.split(':', 1)[0]}"
+            skip_rows.append({"upi": item.upi, "upi_info": _skip_backup_body(item.upi, reason, {"error": item.error})})
+            counts["failed"] += 1
+
+    await bulk_upsert(db, UpiBackup, skip_rows, update_columns=["upi_info"])
+
+    if fields_by_upi:
+        upis = list(fields_by_upi)
+        property_ids = dict((await db.execute(select(Property.upi, Property.id).where(Property.upi.in_(upis)))).all())
+        for upi, fields in fields_by_upi.items():
+            fields["property_id"] = property_ids.get(upi)
+        # year_of_record is stamped with the current year; it is not a registry change
+        written = await bulk_upsert(
+            db, Mapping, fields_by_upi.values(),
+            returning=[Mapping.upi, INSERTED],
+            skip_unchanged=True,
+            fingerprint_exclude=("year_of_record",),
+        )
+        for row in written:
+            counts["created" if row.inserted else "changed"] += 1
+        counts["unchanged"] += len(fields_by_upi) - len(written)
+    return counts
 
-    db.add(Mapping(**mapping_fields))
-    return "created"
+
+async def _commit_batch(batch: list[FetchedUpi], dry_run: bool, checkpoint: Checkpoint, progress: Progress) -> None:
+    async with AsyncSessionLocal() as db:
+        try:
+            counts = await _write_batch(db, batch)
+            if dry_run:
+                await db.rollback()
+            else:
+                await db.commit()
+        except Exception as exc:
+            await db.rollback()
+            if len(batch) == 1:
+                item = batch[0]
+                print(f"FAIL   {item.upi} -> {exc}")
+                progress.add("failed")
+                return
+            # Isolate the offending row(s) instead of losing the whole batch
+            print(f"Batch of {len(batch)} failed ({exc}); retrying row by row")
+            for item in batch:
+                await _commit_batch([item], dry_run, checkpoint, progress)
+            return
+
+        if not dry_run:
+            # Failed fetches are retried on the next run
+            checkpoint.record([item.upi for item in batch if item.status != "failed"])
+
+    for key, n in counts.items():
+        if n:
+            progress.add(key, n)
 
 
 async def run(
@@ -213,6 +316,11 @@ async def run(
     dry_run: bool = False,
     skip_prefixes: set[str] | None = None,
     per_type_limit: int = 200,
+    concurrency: int = 8,
+    batch_size: int = 200,
+    checkpoint_path: Path | None = None,
+    restart: bool = False,
+    report_every: float = 10.0,
 ) -> None:
     skip_prefixes = skip_prefixes or {"5"}
     upis = _load_unique_upis(csv_path, upi_column)
@@ -224,68 +332,80 @@ async def run(
     if limit is not None and limit > 0:
         upis = upis[:limit]
 
-    total = len(upis)
-    created = 0
-    updated = 0
-    skipped = 0
-    failed = 0
+    if restart and checkpoint_path and checkpoint_path.exists() and not dry_run:
+        checkpoint_path.unlink()
+    checkpoint = Checkpoint(None if dry_run else checkpoint_path)
+    resumed = len([u for u in upis if u in checkpoint.done])
+    upis = [u for u in upis if u not in checkpoint.done]
 
-    print(f"Found {total} selected UPIs in {csv_path}")
+    print(f"Found {len(upis) + resumed} selected UPIs in {csv_path}")
     print(f"Skipped by prefix {sorted(skip_prefixes)}: {skipped_by_prefix}")
     if selected_type_counts:
         print("Selected per type:", ", ".join(f"{k}:{v}" for k, v in sorted(selected_type_counts.items())))
+    if resumed:
+        print(f"Resuming: {resumed} UPI(s) already imported per {checkpoint_path}")
+    print(f"Fetching with {concurrency} concurrent request(s), writing in batches of {batch_size}"
+          + (" (dry run)" if dry_run else ""))
 
-    async with AsyncSessionLocal() as db:
-        for idx, upi in enumerate(upis, start=1):
-            try:
-                result = await get_title_data(upi=upi, language="english", db=db)
-                payload = _parse_response_json(result)
-
-                if _is_not_found_payload(payload):
-                    skipped += 1
-                    await _save_skip_to_upi_backup(
-                        db,
-                        upi=upi,
-                        reason="external_title_data_not_found",
-                        payload=payload,
-                    )
-                    print(f"[{idx}/{total}] SKIP   {upi} (not found)")
-                    if not dry_run:
-                        await db.commit()
-                    else:
-                        await db.rollback()
-                    continue
-
-                action = await _upsert_mapping_from_title_data(db, upi=upi, title_payload=payload)
-                if action == "created":
-                    created += 1
-                else:
-                    updated += 1
-
-                print(f"[{idx}/{total}] OK     {upi} ({action}, for_sale=false)")
-                if not dry_run:
-                    await db.commit()
-                else:
-                    await db.rollback()
-
-            except Exception as exc:
-                failed += 1
-                await db.rollback()
-                await _save_skip_to_upi_backup(
-                    db,
-                    upi=upi,
-                    reason=f"exception: {type(exc).__name__}",
-                    payload={"error": str(exc)},
-                )
-                await db.commit()
-                print(f"[{idx}/{total}] FAIL   {upi} -> {exc}")
+    progress = Progress(len(upis), report_every)
+    pending: asyncio.Queue = asyncio.Queue()
+    for upi in upis:
+        pending.put_nowait(upi)
+    # Bounded so fetching never runs far ahead of the writer
+    fetched: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 2)
 
+    async def fetcher() -> None:
+        while True:
+            try:
+                upi = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await fetched.put(await _fetch_title_payload(upi, dry_run))
+
+    async def writer() -> None:
+        batch: list[FetchedUpi] = []
+        while True:
+            item = await fetched.get()
+            if item is None:
+                break
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await _commit_batch(batch, dry_run, checkpoint, progress)
+                batch = []
+        if batch:
+            await _commit_batch(batch, dry_run, checkpoint, progress)
+
+    async def fetch_all() -> None:
+        await asyncio.gather(*(fetcher() for _ in range(max(1, concurrency))))
+        await fetched.put(None)
+
+    fetch_task = asyncio.create_task(fetch_all())
+    writer_task = asyncio.create_task(writer())
+    tasks = {fetch_task, writer_task}
+    try:
+        # A failing writer must not leave the fetchers blocked on the bounded queue
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+        await writer_task
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await HttpClientRegistry.close()
+
+    elapsed = time.perf_counter() - progress.started
+    counts = progress.counts
     print("\nImport summary")
-    print(f"  total   : {total}")
-    print(f"  created : {created}")
-    print(f"  updated : {updated}")
-    print(f"  skipped : {skipped}")
-    print(f"  failed  : {failed}")
+    print(f"  total     : {len(upis) + resumed}")
+    print(f"  resumed   : {resumed}")
+    print(f"  new       : {counts['created']}")
+    print(f"  changed   : {counts['changed']}")
+    print(f"  unchanged : {counts['unchanged']}")
+    print(f"  skipped   : {counts['skipped']}")
+    print(f"  failed    : {counts['failed']}")
+    print(f"  elapsed   : {elapsed:.1f}s ({progress.processed / elapsed if elapsed > 0 else 0:.1f} UPI/s)")
 
 
 def main() -> None:
@@ -325,6 +445,35 @@ def main() -> None:
         default=200,
         help="Max UPIs to process per non-skipped prefix type (default: 200).",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.NLA_MAX_CONCURRENCY,
+        help=f"Concurrent NLA fetches (default: NLA_MAX_CONCURRENCY={settings.NLA_MAX_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=200,
+        help="UPIs written per database transaction (default: 200).",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="File of committed UPIs used to resume interrupted runs (default: <csv>.checkpoint).",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore and clear an existing checkpoint.",
+    )
+    parser.add_argument(
+        "--report-every",
+        type=float,
+        default=10.0,
+        help="Seconds between throughput reports (default: 10).",
+    )
 
     args = parser.parse_args()
 
@@ -345,6 +494,11 @@ def main() -> None:
             dry_run=args.dry_run,
             skip_prefixes=skip_prefixes,
             per_type_limit=args.per_type_limit,
+            concurrency=max(1, args.concurrency),
+            batch_size=max(1, args.batch_size),
+            checkpoint_path=args.checkpoint or args.csv.with_name(args.csv.name + ".checkpoint"),
+            restart=args.restart,
+            report_every=args.report_every,
         )
     )
 
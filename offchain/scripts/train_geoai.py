@@ -0,0 +1,114 @@
+"""
+GeoAI training worker
+
+Runs one training job out of the API process: trains every model from the
+latest feature snapshot (rebuilt from SQL only when missing or older than
+GEOAI_SNAPSHOT_MAX_AGE_SECONDS), reloads them, re-scores all parcels into
+geoai_scores and records the outcome on the training_jobs row.
+
+The API starts it for POST /api/geoai/retrain. It can also run by hand or
+from cron; without --job-id it creates its own job (and exits with code 2 if
+another job is already active).
+
+Usage:
+    python scripts/train_geoai.py [--job-id N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Allow running this script from either offchain/ or offchain/scripts/
+OFFCHAIN_ROOT = Path(__file__).resolve().parents[1]
+if str(OFFCHAIN_ROOT) not in sys.path:
+    sys.path.insert(0, str(OFFCHAIN_ROOT))
+
+# Always load backend .env (independent of where this script is launched from)
+from dotenv import load_dotenv
+load_dotenv(OFFCHAIN_ROOT / ".env", override=False)
+# Models and snapshots use paths relative to offchain
+os.chdir(OFFCHAIN_ROOT)
+
+from sqlalchemy import update
+
+from api.ml.geo_ai.jobs import TrainingJobs, fail_job
+from api.ml.geo_ai.model_registry import ModelRegistry
+from api.ml.geo_ai.scoring import score_parcels
+from api.ml.geo_ai.train import train_all_models
+from data.database.database import AsyncSessionLocal, close_db
+from data.models.geoai import JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, TrainingJob
+
+logger = logging.getLogger("train_geoai")
+
+
+async def run(job_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        started = await db.execute(
+            update(TrainingJob)
+            .where(TrainingJob.id == job_id, TrainingJob.status == JOB_QUEUED)
+            .values(status=JOB_RUNNING, pid=os.getpid(), started_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+        if started.rowcount != 1:
+            logger.error(f"Training job {job_id} is not queued; nothing to do")
+            return 1
+
+        t0 = time.monotonic()
+        metrics = {}
+        try:
+            await train_all_models(db, metrics)
+            bundle = ModelRegistry.reload_models()
+            metrics["parcels_scored"] = await score_parcels(db)
+        except Exception as e:
+            logger.exception(f"Training job {job_id} failed")
+            await db.rollback()
+            await db.execute(
+                update(TrainingJob).where(TrainingJob.id == job_id)
+                .values(duration_seconds=round(time.monotonic() - t0, 3))
+            )
+            await fail_job(db, job_id, str(e) or type(e).__name__, only_active=False)
+            return 1
+
+        await db.execute(
+            update(TrainingJob).where(TrainingJob.id == job_id).values(
+                status=JOB_SUCCEEDED,
+                finished_at=datetime.now(timezone.utc),
+                duration_seconds=round(time.monotonic() - t0, 3),
+                metrics=metrics,
+                model_version=bundle.version,
+            )
+        )
+        await db.commit()
+        logger.info(f"Training job {job_id} succeeded ({bundle.version}): {metrics}")
+        return 0
+
+
+async def main_async(job_id: int = None) -> int:
+    try:
+        if job_id is None:
+            async with AsyncSessionLocal() as db:
+                job, created = await TrainingJobs.create(db)
+            if not created:
+                logger.error(f"Training job {job.id} is already {job.status}")
+                return 2
+            job_id = job.id
+        return await run(job_id)
+    finally:
+        await close_db()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Run a GeoAI training job")
+    parser.add_argument("--job-id", type=int, default=None, help="queued training_jobs row to run (default: create one)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args.job_id)))
+
+
+if __name__ == "__main__":
+    main()